@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Benchmark suite for rw_fetch.py.
+
+Times the conversion, cache and display paths on a sample of the real images
+in rsc/ and on generated caches of 10k and 100k entries, writes the results
+as JSON and compares them with a stored baseline:
+
+    ./benchmark.py --save-baseline            # on the reference commit
+    ./benchmark.py                            # later: compare, exit 1 on regressions
+
+Every benchmark is repeated and its fastest run is what gets compared.
+Timings are machine specific, so only compare results from the same machine.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import config
+import rw_fetch
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "rw_fetch") # Outside the checkout
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "bench_results.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "bench_baseline.json")
+SUPPORTED = ('.gif', '.png', '.jpg', '.jpeg', '.bmp', '.webp')
+
+
+# --- Timing ---
+def measure(fn, repeat):
+    """Runs fn once to warm up (lazy imports, file cache), then repeat times. Returns {"min_s", "median_s", "runs"}."""
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"min_s": min(times), "median_s": statistics.median(times), "runs": repeat}
+
+
+class Suite:
+    def __init__(self, repeat, quiet=False):
+        self.repeat, self.quiet, self.results = repeat, quiet, {}
+
+    def run(self, name, fn, repeat=None, **info):
+        result = measure(fn, repeat or self.repeat)
+        result.update(info)
+        self.results[name] = result
+        if not self.quiet: print(f"  {name:<40} {result['min_s'] * 1000:10.2f} ms  (median {result['median_s'] * 1000:.2f} ms)")
+
+
+# --- Inputs ---
+def sample_images(rsc_dir, count, seed):
+    files = sorted(os.path.join(rsc_dir, f) for f in os.listdir(rsc_dir) if f.lower().endswith(SUPPORTED))
+    random.Random(seed).shuffle(files)
+    return files[:count]
+
+
+def synthetic_row(rng, palette, width):
+    """Runs of one color, like real pixel art, so the art is about as dense as a converted image."""
+    row = []
+    while len(row) < width: row += [rng.choice(palette)] * rng.randint(1, 8)
+    return row[:width]
+
+
+def synthetic_cache(entries, width, height, seed):
+    """A cache of `entries` generated entries sharing a pool of random art, spread over the categories."""
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(64):
+        rows = height + rng.randint(-height // 2, height)
+        palette = [rng.randrange(1 << 24) for _ in range(8)] + [-1]
+        fg = [synthetic_row(rng, palette, width) for _ in range(rows)]
+        bg = [synthetic_row(rng, palette, width) for _ in range(rows)]
+        art = "\n".join(rw_fetch.cells_to_ansi(f, b) + rw_fetch.reset_ansi() for f, b in zip(fg, bg))
+        category, num_lines = rw_fetch.classify_image(art)
+        pool.append({"ansi_art": art, "category": category, "num_lines": num_lines, "n_frames": 1,
+                     "source": {"size": 0, "mtime_ns": 0, "sha256": "0" * 64},
+                     "converter_version": rw_fetch.CONVERTER_VERSION, "art_width": width})
+    return {f"/synthetic/{i:06d}.gif": dict(pool[i % len(pool)]) for i in range(entries)}
+
+
+def stub_shell_commands():
+    """Makes fallback shell commands return a fixed string, so sysinfo timings don't depend on the machine's tools."""
+    rw_fetch.fetch_shell_command = lambda command: "stub"
+    config.SYS_INFO_CACHE_FILE = None # Always fetch, never serve from (or write) the sysinfo cache
+
+
+# --- Benchmarks ---
+def bench_conversion(suite, files):
+    from PIL import Image
+    frames = []
+    for path in files:
+        with Image.open(path) as img: img.load(); frames.append(img.convert("RGBA"))
+    suite.run("image_to_ansi", lambda: [rw_fetch.image_to_ansi(frame) for frame in frames], images=len(frames))
+    suite.run("process_image", lambda: [rw_fetch.process_image(path) for path in files], images=len(files))
+
+
+def bench_cache(suite, label, cache, work_dir):
+    """load_cache/save_cache in both formats and --random selection (in-process and end to end) for one cache."""
+    for fmt, suffix in (("json", ".json"), ("binary", rw_fetch.binary_cache.BINARY_CACHE_SUFFIX)):
+        path = os.path.join(work_dir, f"{label}{suffix}")
+        suite.run(f"{label}.save_cache.{fmt}", lambda: rw_fetch.save_cache(cache, path), repeat=max(1, suite.repeat // 2), entries=len(cache))
+        suite.run(f"{label}.load_cache.{fmt}", lambda: rw_fetch.load_cache(path), entries=len(cache), size_bytes=os.path.getsize(path))
+        loaded = rw_fetch.load_cache(path)
+
+        def select():
+            keys = [k for cat, entries in rw_fetch.cache_category_index(loaded).items() if cat != "invalid" for k, _ in entries]
+            key = random.choice(keys)
+            data = loaded.entry(key, with_meta=False) if isinstance(loaded, rw_fetch.binary_cache.IndexedCache) else loaded[key]
+            return rw_fetch.entry_art(data)
+        suite.run(f"{label}.random_select.{fmt}", select, entries=len(cache))
+        suite.run(f"{label}.cli_random.{fmt}", lambda: subprocess.run(
+            [sys.executable, os.path.join(SCRIPT_DIR, "rw_fetch.py"), "--cache", path, "--random", "--silent"],
+            stdout=subprocess.DEVNULL, check=True), entries=len(cache))
+
+
+def bench_display(suite, cache, sys_info_lines):
+    entries = [cache[k] for k in sorted(cache)[:50]]
+    arts = [(rw_fetch.entry_art(data), data.get("art_width")) for data in entries]
+    suite.run("display.with_art_width", lambda: [rw_fetch.render_art_and_info(art, sys_info_lines, width) for art, width in arts], entries=len(arts))
+    suite.run("display.scan_width", lambda: [rw_fetch.render_art_and_info(art, sys_info_lines) for art, _ in arts], entries=len(arts))
+
+
+# --- Baseline comparison ---
+def compare(results, baseline, threshold):
+    """Prints current vs. baseline per benchmark, returns the names that got slower than threshold."""
+    regressions = []
+    print(f"\n{'benchmark':<40} {'baseline':>12} {'current':>12} {'ratio':>7}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base: print(f"{name:<40} {'-':>12} {result['min_s'] * 1000:10.2f}ms {'new':>7}"); continue
+        inputs = lambda r: {k: v for k, v in r.items() if k in ("images", "entries")}
+        if inputs(base) != inputs(result): print(f"{name:<40} {'-':>12} {result['min_s'] * 1000:10.2f}ms {'inputs changed':>7}"); continue
+        ratio = result["min_s"] / base["min_s"] if base["min_s"] else float("inf")
+        flag = " REGRESSION" if ratio > threshold else ""
+        print(f"{name:<40} {base['min_s'] * 1000:10.2f}ms {result['min_s'] * 1000:10.2f}ms {ratio:6.2f}x{flag}")
+        if flag: regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rw_fetch.py and compare against a stored baseline.",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--rsc-dir", default=config.DEFAULT_RSC_DIR, help="Directory with the real images.")
+    parser.add_argument("--images", type=int, default=50, help="Number of images from --rsc-dir to convert (0 skips the real corpus).")
+    parser.add_argument("--sizes", default="10000,100000", help="Comma separated entry counts of the synthetic caches ('' for none).")
+    parser.add_argument("--art-size", default="24x12", help="Cells (WIDTHxHEIGHT) of the synthetic art.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for image sampling and synthetic caches.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the results JSON.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results JSON to compare with.")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the results to --baseline.")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio (current / baseline) reported as a regression.")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    stub_shell_commands()
+    suite = Suite(max(1, args.repeat))
+    work_dir = tempfile.mkdtemp(prefix="rw_fetch_bench_")
+    try:
+        print("System info (stubbed shell commands):")
+        suite.run("get_formatted_system_info", rw_fetch.get_formatted_system_info)
+        sys_info_lines = rw_fetch.get_formatted_system_info()
+
+        if args.images and os.path.isdir(args.rsc_dir):
+            files = sample_images(args.rsc_dir, args.images, args.seed)
+            print(f"Real images ({len(files)} from {args.rsc_dir}):")
+            bench_conversion(suite, files)
+            corpus = {os.path.abspath(path): data for path in files if (data := rw_fetch.process_image(path))}
+            bench_cache(suite, "rsc", corpus, work_dir)
+            bench_display(suite, corpus, sys_info_lines)
+        elif args.images: print(f"Warning: {args.rsc_dir} not found, skipping the real corpus.", file=sys.stderr)
+
+        width, height = (int(v) for v in args.art_size.lower().split("x"))
+        for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+            print(f"Synthetic cache ({size} entries):")
+            bench_cache(suite, f"synthetic_{size}", synthetic_cache(size, width, height, args.seed), work_dir)
+    finally: shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {"meta": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+                       "numpy": rw_fetch.numpy_available(), "json": rw_fetch.get_json_lib().__name__,
+                       "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": suite.repeat},
+              "results": suite.results}
+    for path in (args.output, args.baseline if args.save_baseline else None):
+        if path and os.path.dirname(path): os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(args.output, "w") as f: json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f: json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline): print(f"No baseline at {args.baseline} (create one with --save-baseline)."); return
+    with open(args.baseline) as f: baseline = json.load(f).get("results", {})
+    regressions = compare(suite.results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than {args.threshold:.2f}x the baseline: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""Indexed binary cache format for rw_fetch.py.
+
+A JSON cache has to be parsed in full even though --random only ever prints one
+entry. This format puts a small per-category index in front of the art blobs so
+a reader can mmap the file, parse just the index and slice out the one blob it
+needs.
+
+Layout (all integers little-endian):
+
+    magic      8 bytes   b"RWFCACHE"
+    version    u32       FORMAT_VERSION
+    index_len  u32       length of the index that follows
+    index      text      one line per entry, tab separated:
+                         category, key, offset, art_len, num_lines, meta_len, art_codec, art_size, art_dict, art_width,
+                         meta_offset
+    blobs      bytes     UTF-8 ansi_art blobs and meta_len byte JSON blobs
+
+The index is plain text so reading it needs no JSON parser (and none of the
+imports that come with one) on the --random path. Tabs, newlines and "%" in
+keys are percent-encoded. Offsets are relative to the start of the blob
+section. The meta JSON holds any entry fields not in the index (source
+signature, converter version, animation frames, ...) and is omitted
+(meta_len 0) when there are none.
+
+Art blobs are content-addressed: entries with byte-identical art (duplicate
+or copied images) point at the same offset, so it is stored once. Each
+entry's meta is its own blob at meta_offset. Version 1 files (JSON index),
+version 2 files (no art_width column) and version 3 files (no meta_offset
+column, meta right after the art) are still read.
+
+Entries stored compressed (see CACHE_COMPRESSION in config.py) have a non-empty
+art_codec and their blob is the compressed art. Such entries come back as
+{"ansi_art_z": bytes, "art_codec", "art_size", ...} and are only decompressed
+by rw_fetch.py when they are printed.
+
+Entries whose art was evicted (see CACHE_MAX_BYTES in config.py) have the
+art_codec NO_ART and an empty blob. They come back with their category,
+num_lines and meta, but without ansi_art.
+
+Files ending in BINARY_CACHE_SUFFIX are written in this format; readers detect
+it from the magic bytes regardless of the file name. Use
+`rw_fetch.py --cache <src> --convert-cache <dest>` to convert either way.
+"""
+import os
+import sys
+import mmap
+import struct
+from collections.abc import MutableMapping
+
+MAGIC = b"RWFCACHE"
+FORMAT_VERSION = 4
+BINARY_CACHE_SUFFIX = ".rwc"
+NO_ART = "-"
+_HEADER = struct.Struct("<8sII")
+_CORE_FIELDS = ("ansi_art", "category", "num_lines", "ansi_art_z", "art_codec", "art_size", "art_dict", "art_width")
+
+
+def _dumps(obj):
+    import json # Only needed for entry metadata, kept off the --random import path
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data):
+    import json
+    return json.loads(data)
+
+
+def _encode_key(key):
+    if "%" not in key and "\t" not in key and "\n" not in key: return key
+    return key.replace("%", "%25").replace("\t", "%09").replace("\n", "%0A")
+
+
+def _decode_key(key):
+    if "%" not in key: return key
+    return key.replace("%0A", "\n").replace("%09", "\t").replace("%25", "%")
+
+
+def is_binary_cache(cache_file):
+    """True if cache_file exists and starts with the binary cache magic."""
+    try:
+        with open(cache_file, "rb") as f: return f.read(len(MAGIC)) == MAGIC
+    except OSError: return False
+
+
+def is_binary_cache_path(cache_file):
+    """True if a cache saved to cache_file should use the binary format."""
+    return cache_file.endswith(BINARY_CACHE_SUFFIX)
+
+
+def _parse_index(raw_index):
+    index = {}
+    for line in raw_index.decode("utf-8").split("\n"):
+        if not line: continue
+        fields = line.split("\t")
+        category, key, offset, art_len, num_lines, meta_len, codec, art_size, art_dict = fields[:9]
+        art_width = fields[9] if len(fields) > 9 else "" # Version 2 has no art_width column
+        offset, art_len = int(offset), int(art_len)
+        meta_offset = int(fields[10]) if len(fields) > 10 else offset + art_len # Versions 2/3 store meta after the art
+        index[_decode_key(key)] = (category, offset, art_len, int(num_lines), int(meta_len), codec or None,
+                                   int(art_size or art_len), int(art_dict) if art_dict else None, int(art_width) if art_width else None,
+                                   meta_offset)
+    return index
+
+
+def _parse_index_v1(raw_index):
+    index = {}
+    for category, rows in _loads(raw_index).get("categories", {}).items():
+        for row in rows:
+            key, offset, art_len, num_lines, meta_len = row[:5]
+            codec, art_size = row[5:7] if len(row) >= 7 else (None, art_len)
+            index[key] = (category, offset, art_len, num_lines, meta_len, codec, art_size, None, None, offset + art_len) # art_dict lives in meta
+    return index
+
+
+class IndexedCache(MutableMapping):
+    """Dict-like view over a memory-mapped binary cache.
+
+    Only the index is parsed on open. Entries are decoded from the mapping on first
+    access and then kept, so in-place edits (as done by validate_cache_entry) stick.
+    Assigned and deleted keys live in memory until the cache is written back.
+    """
+
+    def __init__(self, cache_file):
+        self.path = cache_file
+        self._file = open(cache_file, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, index_len = _HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC: raise ValueError("not a binary cache file")
+            raw_index = self._mm[_HEADER.size:_HEADER.size + index_len]
+            # key -> (category, offset, art_len, num_lines, meta_len, art_codec, art_size, art_dict, art_width, meta_offset)
+            if version in (2, 3, FORMAT_VERSION): self._index = _parse_index(raw_index)
+            elif version == 1: self._index = _parse_index_v1(raw_index)
+            else: raise ValueError(f"unsupported binary cache version {version}")
+        except Exception:
+            self.close(); raise
+        self._data_start = _HEADER.size + index_len
+        self._loaded = {}
+        self._deleted = set()
+
+    def close(self):
+        mm = getattr(self, "_mm", None)
+        if mm is not None: mm.close(); self._mm = None
+        if self._file is not None: self._file.close(); self._file = None
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+    # --- Raw access (no art decoding) ---
+    def peek(self, key):
+        """Returns {"category", "num_lines"[, "art_codec", "art_size"]} for key without reading its art."""
+        if key in self._loaded:
+            data = self._loaded[key]
+            if not isinstance(data, dict): return data
+            info = {"category": data.get("category"), "num_lines": data.get("num_lines")}
+            if "ansi_art_z" in data: info["art_codec"], info["art_size"] = data.get("art_codec"), data.get("art_size")
+            return info
+        if key in self._deleted or key not in self._index: raise KeyError(key)
+        category, _, _, num_lines, _, codec, art_size, _, _, _ = self._index[key]
+        info = {"category": category, "num_lines": num_lines}
+        if codec and codec != NO_ART: info["art_codec"], info["art_size"] = codec, art_size
+        return info
+
+    def category_index(self):
+        """Returns {category: [(key, num_lines), ...]} without touching any art blob."""
+        categories = {}
+        for key in self:
+            info = self.peek(key)
+            if isinstance(info, dict) and "category" in info:
+                categories.setdefault(info["category"], []).append((key, info.get("num_lines")))
+            else: categories.setdefault("invalid", []).append((key, None))
+        return categories
+
+    def storage_sizes(self):
+        """Returns (stored_art_bytes, uncompressed_art_bytes) for on-disk entries, from the index alone.
+
+        Art shared by several entries counts once towards the stored size, and for each entry towards the uncompressed one.
+        """
+        stored = uncompressed = 0
+        offsets = set()
+        for key, (_, offset, art_len, _, _, _, art_size, _, _, _) in self._index.items():
+            if key in self._deleted: continue
+            if offset not in offsets: offsets.add(offset); stored += art_len
+            uncompressed += art_size
+        return stored, uncompressed
+
+    def art_sharing(self):
+        """Returns (entries, distinct art blobs, bytes saved by sharing them) for on-disk entries, from the index alone."""
+        blobs, saved = {}, 0
+        for key, (_, offset, art_len, _, _, _, _, _, _, _) in self._index.items():
+            if key in self._deleted: continue
+            if offset in blobs: saved += art_len
+            else: blobs[offset] = art_len
+        return len(self._index) - len(self._deleted), len(blobs), saved
+
+    def stored_size(self, key):
+        """Returns the bytes an on-disk entry takes in the blob section (art plus meta), from the index alone."""
+        if key in self._deleted or key not in self._index: return None
+        _, _, art_len, _, meta_len, _, _, _, _, _ = self._index[key]
+        return art_len + meta_len
+
+    def stored_art(self, key):
+        """Whether an entry has art (see NO_ART). Reads only the index for entries not loaded."""
+        if key in self._loaded:
+            data = self._loaded[key]
+            return isinstance(data, dict) and ("ansi_art" in data or "ansi_art_z" in data)
+        if key in self._deleted or key not in self._index: raise KeyError(key)
+        return self._index[key][5] != NO_ART
+
+    def raw_blob(self, key):
+        """Returns the untouched (art bytes, meta bytes) of an on-disk entry, or None if it was modified."""
+        if key in self._loaded or key in self._deleted or key not in self._index: return None
+        _, offset, art_len, _, meta_len, _, _, _, _, meta_offset = self._index[key]
+        start, meta_start = self._data_start + offset, self._data_start + meta_offset
+        return self._mm[start:start + art_len], self._mm[meta_start:meta_start + meta_len]
+
+    def entry(self, key, with_meta=True):
+        """Like cache[key], but with_meta=False skips decoding the meta JSON.
+
+        Entries read without meta are not kept, so edits must still go through cache[key].
+        """
+        if with_meta or key in self._loaded: return self[key]
+        if key in self._deleted or key not in self._index: raise KeyError(key)
+        return self._decode(key, with_meta=False)
+
+    def _decode(self, key, with_meta=True):
+        category, offset, art_len, num_lines, meta_len, codec, art_size, art_dict, art_width, meta_offset = self._index[key]
+        start = self._data_start + offset
+        if codec == NO_ART: data = {"category": category, "num_lines": num_lines}
+        elif codec:
+            data = {"ansi_art_z": self._mm[start:start + art_len], "art_codec": codec, "art_size": art_size,
+                    "category": category, "num_lines": num_lines}
+            if art_dict is not None: data["art_dict"] = art_dict
+        else:
+            data = {"ansi_art": self._mm[start:start + art_len].decode("utf-8"),
+                    "category": category, "num_lines": num_lines}
+        if art_width is not None: data["art_width"] = art_width
+        if with_meta and meta_len:
+            meta_start = self._data_start + meta_offset
+            data.update(_loads(self._mm[meta_start:meta_start + meta_len]))
+        return data
+
+    # --- MutableMapping ---
+    def __getitem__(self, key):
+        if key in self._loaded: return self._loaded[key]
+        if key in self._deleted or key not in self._index: raise KeyError(key)
+        data = self._loaded[key] = self._decode(key)
+        return data
+
+    def __setitem__(self, key, value):
+        self._deleted.discard(key)
+        self._loaded[key] = value
+
+    def __delitem__(self, key):
+        if key not in self: raise KeyError(key)
+        self._loaded.pop(key, None)
+        if key in self._index: self._deleted.add(key)
+
+    def __contains__(self, key):
+        return key in self._loaded or (key in self._index and key not in self._deleted)
+
+    def __iter__(self):
+        for key in self._index:
+            if key not in self._deleted: yield key
+        for key in self._loaded:
+            if key not in self._index: yield key
+
+    def __len__(self):
+        return len(self._index) - len(self._deleted) + sum(1 for k in self._loaded if k not in self._index)
+
+
+def _encode_entry(data):
+    if "ansi_art_z" in data:
+        art = data["ansi_art_z"]
+        if isinstance(art, str): import base64; art = base64.b64decode(art) # Compressed art loaded from a JSON cache
+    else: art = data.get("ansi_art", "").encode("utf-8")
+    meta = {k: v for k, v in data.items() if k not in _CORE_FIELDS}
+    return art, (_dumps(meta) if meta else b"")
+
+
+def write_cache(cache, cache_file):
+    """Writes cache (a dict or IndexedCache) in the binary format.
+
+    Byte-identical art is written once and shared. The file is written to a
+    temporary sibling and moved into place with os.replace, so an IndexedCache
+    mapped from cache_file stays readable while its replacement is being written.
+    """
+    lines = []
+    blobs = []
+    offset = 0
+    art_offsets = {} # art bytes -> offset of the blob already written
+    for key in cache:
+        raw = cache.raw_blob(key) if isinstance(cache, IndexedCache) else None
+        if raw is not None:
+            art, meta = raw
+            category, _, _, num_lines, _, codec, art_size, art_dict, art_width, _ = cache._index[key]
+        else:
+            info = cache[key]
+            if not isinstance(info, dict) or "category" not in info:
+                print(f"Warning: Skipping invalid cache entry for key '{key}' (binary format).", file=sys.stderr)
+                continue
+            art, meta = _encode_entry(info)
+            category, num_lines = info["category"], info.get("num_lines", 0)
+            codec, art_size, art_dict = info.get("art_codec"), info.get("art_size", len(art)), info.get("art_dict")
+            if "ansi_art" not in info and "ansi_art_z" not in info: codec = NO_ART
+            art_width = info.get("art_width")
+        art_offset = art_offsets.get(art)
+        if art_offset is None:
+            art_offset = art_offsets[art] = offset
+            blobs.append(art); offset += len(art)
+        lines.append("\t".join((category, _encode_key(key), str(art_offset), str(len(art)), str(num_lines), str(len(meta)),
+                                codec or "", str(art_size) if codec else "", "" if art_dict is None else str(art_dict),
+                                "" if art_width is None else str(art_width), str(offset))))
+        blobs.append(meta); offset += len(meta)
+
+    index = "\n".join(lines).encode("utf-8")
+    cache_dir = os.path.dirname(cache_file)
+    if cache_dir and not os.path.exists(cache_dir): os.makedirs(cache_dir, exist_ok=True)
+    tmp_file = f"{cache_file}.tmp{os.getpid()}"
+    try:
+        with open(tmp_file, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(index)))
+            f.write(index)
+            f.writelines(blobs)
+        os.replace(tmp_file, cache_file)
+    finally:
+        if os.path.exists(tmp_file): os.remove(tmp_file)
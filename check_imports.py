@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Import budget check for the rw_fetch.py --random fast path.
+
+Runs `rw_fetch.py --random` under `python -X importtime` and fails if the
+imports it pulls in take longer than the budget, or if any module that should
+only be loaded on demand (Pillow, numpy, psutil, argparse, ...) shows up.
+Run it after touching imports in rw_fetch.py, binary_cache.py or config.py.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+import binary_cache
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules the --random path must not import (top-level package names)
+FORBIDDEN_MODULES = ("PIL", "numpy", "psutil", "orjson", "zstandard", "argparse", "subprocess",
+                     "concurrent", "multiprocessing", "threading", "json", "re", "hashlib", "lzma", "zlib")
+JSON_CACHE_MODULES = ("json", "orjson", "re") # A JSON cache has to be parsed, only the binary format avoids these
+
+
+def run_importtime(cache_file, extra_args, sysinfo=False):
+    """Runs rw_fetch.py --random under -X importtime, returns [(module, self_us, cumulative_us, depth)]."""
+    cmd = [sys.executable, "-X", "importtime", os.path.join(SCRIPT_DIR, "rw_fetch.py"),
+           "--cache", cache_file, "--random", "--silent"] + extra_args
+    if sysinfo: cmd.append("--fetch-system")
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        errors = [l for l in result.stderr.splitlines() if not l.startswith("import time:")]
+        print(f"Error: rw_fetch.py exited with {result.returncode}:\n" + "\n".join(errors), file=sys.stderr)
+        sys.exit(2)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line: continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append((name.strip(), int(self_us), int(cumulative_us), (len(name) - len(name.lstrip()) - 1) // 2))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time budget of rw_fetch.py --random.",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--cache", default=os.path.join(SCRIPT_DIR, "cache.json"), help="Cache file to run --random against.")
+    parser.add_argument("--budget-ms", type=float, default=15.0, help="Maximum total import time, excluding interpreter startup (site, encodings, ...).")
+    parser.add_argument("--top", type=int, default=10, help="Number of heaviest imports to list.")
+    parser.add_argument("--runs", type=int, default=3, help="Runs to take the best total from (import times are noisy).")
+    parser.add_argument("--sysinfo", action="store_true", help="Also pass --fetch-system (forbidden list is not checked).")
+    args, extra = parser.parse_known_args()
+
+    if not os.path.exists(args.cache):
+        print(f"Error: Cache file '{args.cache}' not found. Build one first.", file=sys.stderr); sys.exit(2)
+
+    startup = {"site", "encodings", "zipimport", "_frozen_importlib_external", "codecs", "io", "abc", "time"}
+    best = None
+    for _ in range(max(1, args.runs)):
+        imports = run_importtime(args.cache, extra, args.sysinfo)
+        total_us = sum(cum for name, _, cum, depth in imports if depth == 0 and name not in startup)
+        if best is None or total_us < best[0]: best = (total_us, imports)
+    total_us, imports = best
+
+    print(f"Import time (excluding startup): {total_us / 1000:.1f} ms (budget {args.budget_ms:.1f} ms, best of {max(1, args.runs)})")
+    print("Heaviest imports (self time):")
+    for name, self_us, cum_us, _ in sorted(imports, key=lambda i: i[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:7.2f} ms  (cumulative {cum_us / 1000:7.2f} ms)  {name}")
+
+    failed = False
+    if not args.sysinfo:
+        forbidden = set(FORBIDDEN_MODULES)
+        if not binary_cache.is_binary_cache(args.cache): forbidden -= set(JSON_CACHE_MODULES)
+        loaded = sorted({name.split(".")[0] for name, _, _, _ in imports} & forbidden)
+        if loaded: print(f"FAIL: --random imported on-demand modules: {', '.join(loaded)}"); failed = True
+    if total_us / 1000 > args.budget_ms:
+        print("FAIL: import time over budget"); failed = True
+    if not failed: print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
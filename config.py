@@ -1,11 +1,66 @@
 # config.py
 import os
+import sys
 
 # --- Script Paths ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_RSC_DIR = os.path.join(SCRIPT_DIR, "rsc")
 DEFAULT_CACHE_FILE = os.path.join(SCRIPT_DIR, "cache.json")
 
+# --- Cache Storage ---
+# Compress each cached art entry independently: None, "zlib", "lzma" or "zstd".
+# None leaves entries stored as they are (--compression none decompresses them).
+# "zstd" needs the 'zstandard' package and shares a dictionary trained on the
+# cache itself (stored next to the cache as <cache>.zdict); falls back to zlib.
+CACHE_COMPRESSION = None
+
+# While the cache is being built, new entries are appended to <cache>.journal as they
+# are converted, and the cache file is rewritten (atomically) after this many entries
+# or seconds. A run that is killed loses at most the image it was converting.
+CACHE_CHECKPOINT_EVERY = 100
+CACHE_CHECKPOINT_SECONDS = 60
+
+# Upper bound (bytes) for the art stored in the cache, None for no limit. Saving the
+# cache evicts the art of the images --random showed least recently (as logged in
+# <cache>.lru) until the rest fits. Their category and size are kept, and --random
+# converts them again from the source when it picks one.
+CACHE_MAX_BYTES = None
+
+# --- Output Encoding ---
+# How art is printed: "truecolor" (as converted), "combined" (fg and bg in one escape,
+# same colors), "256" or "16" (nearest xterm colors; much smaller, good over SSH/tmux).
+# OUTPUT_PALETTE quantizes each image to that many colors first (None = off).
+# CACHE_ENCODINGS are stored next to the truecolor art whenever the cache is built,
+# written "<encoding>" or "<encoding>/<colors>", e.g. ["256", "16/8"]. Encodings that
+# aren't cached are derived from the truecolor art when printed.
+OUTPUT_ENCODING = "truecolor"
+OUTPUT_PALETTE = None
+CACHE_ENCODINGS = []
+
+# --- Graphics Protocols ---
+# Draw still images with the terminal's graphics protocol instead of half blocks:
+# "kitty" (kitty, WezTerm, Ghostty), "sixel" (foot, mlterm, xterm -ti vt340, ...),
+# "auto" (guessed from $TERM) or "none". --graphics overrides it. CACHE_GRAPHICS
+# payloads are stored with the art whenever the cache is built.
+GRAPHICS_PROTOCOL = "none"
+CACHE_GRAPHICS = []
+SIXEL_SCALE = 4 # Screen pixels per image pixel (kitty fills the cells the half-block art would take)
+GRAPHICS_CELL_SIZE = (8, 16) # Cell size in pixels, for terminals that don't report it
+KITTY_REUSE_IDS = True # Send each image once per terminal session, then only place it again
+
+# --- Scaled Variants ---
+# Each image is also cached reduced by these factors (2 = half the width and height).
+# When the art and the sysinfo panel are wider than the terminal, the largest variant
+# that fits is printed instead, e.g. [2, 4]. [] caches full-size art only.
+ART_SCALES = []
+FIT_TO_TERMINAL = True
+
+# Keep every frame of every cached image as palette-indexed pixels in <cache>.atlas,
+# so --frame/--scale (and the daemon's frame=/scale=) render without decoding images.
+# Same as passing --atlas to every directory run. Needs numpy.
+PIXEL_ATLAS = False
+ATLAS_RENDER_CACHE = 64 # Rendered (image, frame, scale, encoding) arts kept in memory
+
 # --- Image Categorization Thresholds ---
 SMALL_THRESHOLD = 20
 MEDIUM_THRESHOLD = 40
@@ -21,26 +76,56 @@ SYSTEM_INFO_ORDER = [
     {"label": "OS"},
     {"label": "Kernel"},
     {"label": "Uptime"},
-    # {"label": "Packages"},        # Uses shell command, tends to timeout
+    # Read from the package databases on Linux. Elsewhere only the shell command can count them, and it tends to timeout
+    *([{"label": "Packages"}] if sys.platform.startswith("linux") else []),
     {"label": "Shell"},
-    {"label": "Resolution"},      # Still uses shell command
-    {"label": "WM"},              # Still uses shell command
-    {"label": "Theme"},           # Still uses shell command
-    {"label": "Icons"},           # Still uses shell command
+    {"label": "Resolution"},      # /sys/class/drm on Linux, xrandr & co. otherwise
+    {"label": "WM"},
+    {"label": "Theme"},           # GTK settings.ini / kdeglobals, gsettings otherwise
+    {"label": "Icons"},           # GTK settings.ini / kdeglobals, gsettings otherwise
     {"label": "Terminal"},
     {"label": "Terminal Font"},   # Still uses shell command (very unreliable)
     {"separator": True},
     {"separator": "Hardware"},
     {"label": "CPU"},
-    {"label": "GPU"},             # Still uses shell command
+    {"label": "GPU"},             # /sys/bus/pci + pci.ids on Linux, lspci otherwise
     {"label": "Memory"},
     {"separator": True},
     {"label": "Color Palette"}
 ]
 
+# --- System Information Cache ---
+# Fields listed here are cached in SYS_INFO_CACHE_FILE for the given number of
+# seconds instead of being fetched on every run. Expired fields are still shown
+# while a detached background process refreshes them. Fields not listed
+# (Uptime, Memory, Shell, Terminal, ...) are always fetched live. The cache lives in
+# $XDG_CACHE_HOME/rw_fetch (~/.cache/rw_fetch). Set SYS_INFO_CACHE_FILE to None to disable.
+SYS_INFO_CACHE_FILE = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "rw_fetch", "sysinfo_cache.json")
+SYS_INFO_TTL = {
+    "User@Host": 86400,
+    "OS": 86400,
+    "Kernel": 3600,
+    "CPU": 86400,
+    "GPU": 86400,
+    "Packages": 3600,
+    "Resolution": 600,
+    "WM": 3600,
+    "Theme": 3600,
+    "Icons": 3600,
+    "Terminal Font": 3600,
+}
+
+# --- Native Fetchers (Linux) ---
+# GPU, Resolution, Packages, Theme, Icons, Uptime and Memory (without psutil) are read
+# from files under SYS_ROOT (/proc, /sys, package databases, desktop settings) before
+# any shell command runs. Point SYS_ROOT at a copy of those trees to try them out.
+SYS_ROOT = "/"
+PCI_IDS_FILES = ["/usr/share/hwdata/pci.ids", "/usr/share/misc/pci.ids", "/usr/share/pci.ids"] # GPU names
+
 # --- Fallback Shell Commands ---
 # For information difficult to get reliably via pure Python APIs.
-# The main script will use subprocess for these keys if Python methods fail or aren't implemented.
+# The main script will use subprocess for these keys if Python methods fail or aren't implemented
+# (the last resort for the native fetchers above).
 FALLBACK_COMMANDS = {
     "Packages": r"""
         pkgs=''; updated=0
@@ -108,6 +193,21 @@ FALLBACK_COMMANDS = {
 }
 
 
+# --- System Info Fetching ---
+# All fields are fetched concurrently. SYS_INFO_DEADLINE (seconds) bounds the whole
+# fetch; fields still running by then are shown as "Timeout". Each fallback shell
+# command is additionally limited to SYS_INFO_COMMAND_TIMEOUT.
+SYS_INFO_DEADLINE = 10
+SYS_INFO_COMMAND_TIMEOUT = 10
+
+# With PROGRESSIVE_SYSINFO (or --progressive), --random --sysinfo prints the art at once
+# and fills in each field in place as it arrives. Fields still missing after
+# PROGRESSIVE_BUDGET seconds keep PROGRESSIVE_PLACEHOLDER (cached ones with a TTL are
+# refetched in the background, so the next run has them).
+PROGRESSIVE_SYSINFO = False
+PROGRESSIVE_BUDGET = 0.05
+PROGRESSIVE_PLACEHOLDER = "…"
+
 # --- System Info Display Formatting ---
 SYS_INFO_LABEL_COLOR = "\033[1;34m"
 SYS_INFO_VALUE_COLOR = "\033[0;37m"
@@ -118,4 +218,35 @@ SYS_INFO_WARN_COLOR = "\033[0;33m" # Yellow for warnings like missing psutil
 RESET_COLOR = "\033[0m"
 
 # --- Image/Info Layout ---
-IMAGE_INFO_SEPARATOR = "  │  "
\ No newline at end of file
+IMAGE_INFO_SEPARATOR = "  │  "
+
+# --- Resident Daemon (--serve) ---
+# `rw_fetch.py --serve` keeps the cache and warm system info in memory and answers
+# `--random --via-daemon` over this UNIX socket. Clients that get no answer within
+# DAEMON_TIMEOUT seconds render in-process instead. Live fields (Uptime, Memory, ...)
+# are refetched by the daemon every DAEMON_SYSINFO_REFRESH seconds.
+DAEMON_SOCKET = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or "/tmp",
+                             f"rw_fetch-{os.getuid()}.sock" if hasattr(os, "getuid") else "rw_fetch.sock")
+DAEMON_TIMEOUT = 0.5
+DAEMON_SYSINFO_REFRESH = 5
+
+# --- Concurrent Launches ---
+# When several shells start at once (a tmux session opening a dozen panes), the first
+# one fetches the system info fields and decodes a JSON cache for --random. The others
+# wait for it (at most SINGLE_FLIGHT_WAIT seconds), so it leaves the results in
+# SINGLE_FLIGHT_DIR, and they reuse them while they are younger than SINGLE_FLIGHT_TTL
+# seconds (0 disables this). A shell starting on its own writes nothing there. Fields
+# in SINGLE_FLIGHT_LOCAL_FIELDS depend on the launching shell, so every process
+# fetches them itself. Files there that belong to another user are ignored.
+SINGLE_FLIGHT_DIR = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+SINGLE_FLIGHT_TTL = 2
+SINGLE_FLIGHT_WAIT = SYS_INFO_DEADLINE + 1
+SINGLE_FLIGHT_LOCAL_FIELDS = ["Shell", "Terminal"]
+
+# --- Pre-rendered Outputs (--prerender / --emit-next) ---
+# `--emit-next` prints one of the outputs written ahead of time by `--prerender N`
+# to <cache>.ring, and reruns that --prerender in the background once fewer than
+# PRERENDER_LOW are left. With PRERENDER_LIVE_FIELDS, fields without a TTL in
+# SYS_INFO_TTL are refetched when printed instead of showing their prerendered values.
+PRERENDER_LOW = 3
+PRERENDER_LIVE_FIELDS = True
@@ -0,0 +1,122 @@
+"""Memory-mapped pixel atlas for rw_fetch.py.
+
+The cache only holds finished ANSI art, so rendering an image at another scale,
+in another encoding or from another frame means decoding it with Pillow again.
+The atlas keeps every cropped frame of every cached image as a palette-indexed
+pixel array, so rw_fetch.py can render those variations from memory instead.
+
+Layout (all integers little-endian):
+
+    magic      8 bytes   b"RWFATLAS"
+    version    u32       FORMAT_VERSION
+    index_len  u32       length of the index that follows
+    index      text      one line per frame, tab separated:
+                         key, sha256, frame, offset, width, height, colors, duration_ms
+    blobs      bytes     per frame: colors int32 pixel keys (the palette), then
+                         width * height palette indices (uint8, or uint16 above 256 colors)
+
+Pixel keys are the ones rw_fetch.py renders from: packed 0xRRGGBB, or -1 for a
+pixel with alpha < 128. sha256 is the hash of the source image, so an atlas can
+be updated by copying the frames of unchanged images. Keys are percent-encoded
+like in binary_cache.py. Reading frames needs numpy; the index does not.
+"""
+import os
+import mmap
+import struct
+
+from binary_cache import _encode_key, _decode_key
+
+MAGIC = b"RWFATLAS"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sII")
+
+
+def _index_dtype(colors): return "<u1" if colors <= 256 else "<u2"
+
+
+def encode_frame(keys):
+    """Returns (blob, colors) for a 2D numpy array of pixel keys."""
+    import numpy as np
+    palette, indices = np.unique(keys, return_inverse=True)
+    return palette.astype("<i4").tobytes() + indices.astype(_index_dtype(len(palette))).tobytes(), len(palette)
+
+
+class PixelAtlas:
+    """Read-only view over a memory-mapped atlas file. Only the index is parsed on open."""
+
+    def __init__(self, atlas_file):
+        self.path = atlas_file
+        self._file = open(atlas_file, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, index_len = _HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC: raise ValueError("not a pixel atlas file")
+            if version != FORMAT_VERSION: raise ValueError(f"unsupported pixel atlas version {version}")
+            raw_index = self._mm[_HEADER.size:_HEADER.size + index_len]
+        except Exception:
+            self.close(); raise
+        self._data_start = _HEADER.size + index_len
+        # key -> (sha256, [(offset, width, height, colors, duration_ms), ...] in frame order)
+        self._index = {}
+        for line in raw_index.decode("utf-8").split("\n"):
+            if not line: continue
+            key, sha256, _, offset, width, height, colors, duration = line.split("\t")
+            frames = self._index.setdefault(_decode_key(key), (sha256, []))[1]
+            frames.append((int(offset), int(width), int(height), int(colors), int(duration)))
+
+    def close(self):
+        mm = getattr(self, "_mm", None)
+        if mm is not None: mm.close(); self._mm = None
+        if self._file is not None: self._file.close(); self._file = None
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+    def __contains__(self, key): return key in self._index
+    def __iter__(self): return iter(self._index)
+    def __len__(self): return len(self._index)
+
+    def source_hash(self, key): return self._index[key][0]
+    def frame_count(self, key): return len(self._index[key][1])
+    def durations(self, key): return [frame[4] for frame in self._index[key][1]]
+
+    def frame_keys(self, key, frame=0):
+        """Returns the (height, width) array of pixel keys of a frame. The palette lookup is the only copy made."""
+        import numpy as np
+        offset, width, height, colors, _ = self._index[key][1][frame]
+        start = self._data_start + offset
+        palette = np.frombuffer(self._mm, dtype="<i4", count=colors, offset=start)
+        indices = np.frombuffer(self._mm, dtype=_index_dtype(colors), count=width * height, offset=start + 4 * colors)
+        return palette[indices].reshape(height, width)
+
+    def raw_frames(self, key):
+        """Returns [(blob, width, height, colors, duration_ms), ...] of an image, for copying into a new atlas."""
+        frames = []
+        for offset, width, height, colors, duration in self._index[key][1]:
+            start = self._data_start + offset
+            size = 4 * colors + width * height * (1 if colors <= 256 else 2)
+            frames.append((self._mm[start:start + size], width, height, colors, duration))
+        return frames
+
+
+def write_atlas(images, atlas_file):
+    """Writes images ({key: (sha256, [(blob, width, height, colors, duration_ms), ...])}) as an atlas.
+
+    Written to a temporary sibling and moved into place with os.replace, so a
+    PixelAtlas mapped from atlas_file stays readable meanwhile.
+    """
+    lines, blobs, offset = [], [], 0
+    for key, (sha256, frames) in images.items():
+        for number, (blob, width, height, colors, duration) in enumerate(frames):
+            lines.append("\t".join((_encode_key(key), sha256, str(number), str(offset), str(width), str(height),
+                                    str(colors), str(duration))))
+            blobs.append(blob); offset += len(blob)
+    index = "\n".join(lines).encode("utf-8")
+    tmp_file = f"{atlas_file}.tmp{os.getpid()}"
+    try:
+        with open(tmp_file, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(index)))
+            f.write(index)
+            f.writelines(blobs)
+        os.replace(tmp_file, atlas_file)
+    finally:
+        if os.path.exists(tmp_file): os.remove(tmp_file)
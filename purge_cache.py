@@ -2,7 +2,8 @@
 import argparse
 import os
 import sys
-import shutil # For backup
+import base64
+import fnmatch
 
 # --- Try importing orjson ---
 try:
@@ -13,6 +14,8 @@ except ImportError:
     JSON_LIB_NAME = 'json'
     # print("orjson not found, using standard json library.", file=sys.stderr)
 
+import binary_cache # Indexed binary cache format shared with rw_fetch.py
+
 
 # --- Cache Loading/Saving Functions (adapted from rw_fetch.py) ---
 
@@ -25,6 +28,12 @@ def load_cache(cache_file):
     if os.path.getsize(cache_file) == 0:
         print(f"Warning: Cache file '{cache_file}' is empty.", file=sys.stderr)
         return {}
+    if binary_cache.is_binary_cache(cache_file):
+        try:
+            return binary_cache.IndexedCache(cache_file)
+        except (IOError, ValueError) as e:
+            print(f"Error: Failed to load binary cache file '{cache_file}': {e}", file=sys.stderr)
+            return None # Signal error
 
     mode = "rb" if JSON_LIB_NAME == 'orjson' else "r"
     try:
@@ -40,22 +49,70 @@ def load_cache(cache_file):
         print(f"Error: An unexpected error occurred while loading cache: {e}", file=sys.stderr)
         return None # Signal error
 
+def lock_cache(cache_file):
+    """Takes the advisory lock rw_fetch.py holds while it updates the cache (see CacheJournal there).
+
+    Returns the open lock file (closing it releases the lock), or None where fcntl is unavailable.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return None
+    lock_file = open(f"{cache_file}.lock", "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        print(f"Waiting for rw_fetch.py to finish updating '{cache_file}'...", file=sys.stderr)
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+    return lock_file
+
+def replay_journal(cache, cache_file):
+    """Applies the entries an interrupted rw_fetch.py run left in <cache>.journal. Returns True if there was one."""
+    try:
+        with open(f"{cache_file}.journal", "rb") as f:
+            lines = f.read().split(b"\n")
+    except OSError:
+        return False
+    for line in lines:
+        if not line: continue
+        try:
+            key, data = json_lib.loads(line)
+        except (ValueError, TypeError):
+            continue # Cut short by the crash
+        if data is None: cache.pop(key, None)
+        else: cache[key] = data
+    return True
+
+def json_default(obj):
+    """Compressed art read from a binary cache is raw bytes; JSON caches store it as base64."""
+    if isinstance(obj, (bytes, bytearray)):
+        return base64.b64encode(obj).decode("ascii")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
 def save_cache(cache, cache_file):
-    """Saves the cache file, handling potential errors."""
+    """Saves the cache file atomically: written to a temporary sibling, then moved into place with os.replace."""
     try:
+        if binary_cache.is_binary_cache_path(cache_file):
+            binary_cache.write_cache(cache, cache_file) # Copies untouched entries as raw blobs, already atomic
+            return True # Signal success
+        if isinstance(cache, binary_cache.IndexedCache):
+            cache = dict(cache.items()) # JSON needs every entry decoded
         cache_dir = os.path.dirname(cache_file)
         if cache_dir and not os.path.exists(cache_dir):
             os.makedirs(cache_dir, exist_ok=True)
 
+        tmp_file = f"{cache_file}.tmp{os.getpid()}"
         mode = "wb" if JSON_LIB_NAME == 'orjson' else "w"
-        with open(cache_file, mode) as f:
-            if JSON_LIB_NAME == 'orjson':
-                # Use OPT_INDENT_2 for pretty printing with orjson
-                options = json_lib.OPT_INDENT_2 | json_lib.OPT_SORT_KEYS
-                f.write(json_lib.dumps(cache, option=options))
-            else:
-                # Standard json uses indent argument
-                json_lib.dump(cache, f, indent=2, sort_keys=True)
+        try:
+            with open(tmp_file, mode) as f:
+                if JSON_LIB_NAME == 'orjson':
+                    # Same layout as rw_fetch.py writes (no key sorting, it only costs time)
+                    f.write(json_lib.dumps(cache, option=json_lib.OPT_INDENT_2, default=json_default))
+                else:
+                    json_lib.dump(cache, f, indent=2, default=json_default)
+            os.replace(tmp_file, cache_file)
+        finally:
+            if os.path.exists(tmp_file): os.remove(tmp_file)
         return True # Signal success
     except IOError as e:
         print(f"Error: Could not save cache file '{cache_file}': {e}", file=sys.stderr)
@@ -64,101 +121,177 @@ def save_cache(cache, cache_file):
         print(f"Error: An unexpected error occurred while saving cache: {e}", file=sys.stderr)
         return False # Signal error
 
+
+# --- Predicates ---
+# Each one looks only at the key and the category/num_lines of an entry, which binary
+# caches answer from their index, so deciding what to purge never touches the art.
+
+def entry_info(cache, key):
+    """Returns (category, num_lines, stored_bytes) of an entry, or None if it is invalid.
+
+    stored_bytes is what the entry takes in a binary cache (art plus meta), also for JSON caches.
+    """
+    if isinstance(cache, binary_cache.IndexedCache):
+        info = cache.peek(key)
+        size = cache.stored_size(key)
+    else:
+        info = cache[key]
+        size = None
+    if not isinstance(info, dict) or "category" not in info:
+        return None
+    if size is None: # JSON (or modified) entry: encode it like the binary format would (UTF-8 art, raw compressed bytes)
+        art, meta = binary_cache._encode_entry(cache[key] if isinstance(cache, binary_cache.IndexedCache) else info)
+        size = len(art) + len(meta)
+    return str(info["category"]).lower(), info.get("num_lines"), size
+
+def path_matches(key, pattern):
+    """Patterns with a '/' match the whole cached path, anything else just the file name."""
+    return fnmatch.fnmatchcase(key if "/" in pattern else os.path.basename(key), pattern)
+
+def build_predicates(args):
+    """Returns [(name, fn(key, category, num_lines) -> bool)] for the predicates given on the command line."""
+    predicates = []
+    if args.categories:
+        categories = {c.lower() for c in args.categories} # Make comparison case-insensitive
+        predicates.append((f"category in {sorted(categories)}", lambda key, cat, lines: cat in categories))
+    if args.path:
+        predicates.append((f"path matches {args.path}", lambda key, cat, lines: any(path_matches(key, p) for p in args.path)))
+    if args.min_lines is not None or args.max_lines is not None:
+        low = args.min_lines if args.min_lines is not None else float("-inf")
+        high = args.max_lines if args.max_lines is not None else float("inf")
+        predicates.append((f"num_lines in [{'' if args.min_lines is None else args.min_lines}, {'' if args.max_lines is None else args.max_lines}]",
+                           lambda key, cat, lines: isinstance(lines, int) and low <= lines <= high))
+    if args.missing_source:
+        predicates.append(("source file missing", lambda key, cat, lines: not os.path.isfile(key)))
+    return predicates
+
+def select_purge(cache, predicates, match_all):
+    """One pass over the cache. Returns (purge_keys, per-predicate hit counts, {category: (count, bytes)}, kept_bytes)."""
+    purge_keys = []
+    hits = [0] * len(predicates)
+    purged_by_category = {}
+    kept_bytes = 0
+    combine = all if match_all else any
+    for key in cache:
+        info = entry_info(cache, key)
+        if info is None:
+            # Keep invalid/unexpected entries, rw_fetch.py reprocesses them anyway
+            print(f"Warning: Skipping invalid cache entry for key '{key}' (no category).", file=sys.stderr)
+            continue
+        category, num_lines, size = info
+        results = [fn(key, category, num_lines) for _, fn in predicates]
+        for i, hit in enumerate(results): hits[i] += hit
+        if combine(results):
+            purge_keys.append(key)
+            count, total = purged_by_category.get(category, (0, 0))
+            purged_by_category[category] = (count + 1, total + size)
+        else:
+            kept_bytes += size
+    return purge_keys, hits, purged_by_category, kept_bytes
+
+def print_summary(original_count, predicates, hits, purged_by_category, kept_bytes, match_all):
+    purged_count = sum(count for count, _ in purged_by_category.values())
+    purged_bytes = sum(size for _, size in purged_by_category.values())
+    print("\n--- Purge Summary ---")
+    print(f"Original entries: {original_count}")
+    print(f"Predicates (entries matching {'all' if match_all else 'any'}):")
+    for (name, _), count in zip(predicates, hits): print(f"  - {name}: {count}")
+    print(f"Entries purged: {purged_count} ({purged_bytes / 1024:.2f} KB stored)")
+    for category, (count, size) in sorted(purged_by_category.items()):
+        print(f"  - {category}: {count} ({size / 1024:.2f} KB)")
+    print(f"Remaining entries: {original_count - purged_count} ({kept_bytes / 1024:.2f} KB stored)")
+    print("---------------------")
+
+
 def main():
     parser = argparse.ArgumentParser(
-        description="Purge all entries of a specific category from the cache file.",
+        description="Purge cache entries matching any (or, with --all, every) of the given predicates, "
+                    "in one pass, and rewrite the cache atomically.",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter
     )
     parser.add_argument(
-        "category",
-        help="The category to purge (e.g., small, medium, large, extra-large)."
+        "categories", nargs="*",
+        help="Categories to purge (e.g., small, medium, large, extra-large)."
     )
     parser.add_argument(
         "--cache",
         default="cache.json",
-        help="Path to the JSON cache file."
-    )
-    parser.add_argument(
-        "--no-backup",
-        action="store_true",
-        help="Do not create a backup of the original cache file."
+        help="Path to the cache file (JSON or binary)."
     )
+    parser.add_argument("--path", action="append", metavar="GLOB",
+                        help="Purge entries whose path matches GLOB (repeatable). Without a '/' only the file name is matched.")
+    parser.add_argument("--min-lines", type=int, metavar="N", help="Purge entries with at least N lines (combine with --max-lines for a range).")
+    parser.add_argument("--max-lines", type=int, metavar="N", help="Purge entries with at most N lines.")
+    parser.add_argument("--missing-source", action="store_true", help="Purge entries whose source image no longer exists.")
+    parser.add_argument("--all", dest="match_all", action="store_true", help="Only purge entries matching every given predicate.")
+    parser.add_argument("--dry-run", "-n", action="store_true", help="Only print what would be purged.")
+    parser.add_argument("--backup", action="store_true",
+                        help="Keep the previous cache as <cache>.bak (a hard link to the old file, not a copy).")
+    parser.add_argument("--no-backup", action="store_true", help=argparse.SUPPRESS) # No backup is the default now
 
     args = parser.parse_args()
-
     cache_file = args.cache
-    category_to_purge = args.category.lower() # Make comparison case-insensitive
+
+    predicates = build_predicates(args)
+    if not predicates:
+        parser.error("give at least one predicate: categories, --path, --min-lines/--max-lines or --missing-source")
 
     # --- Load Cache ---
+    lock_file = None if args.dry_run else lock_cache(cache_file) # Held until exit
     print(f"Loading cache from '{cache_file}'...")
     cache = load_cache(cache_file)
 
     if cache is None:
         # Loading failed, error already printed by load_cache
         sys.exit(1)
+    has_journal = replay_journal(cache, cache_file)
 
     original_count = len(cache)
     if original_count == 0:
         print("Cache is empty. Nothing to purge.")
         sys.exit(0)
 
-    # --- Filter Cache ---
-    print(f"Filtering out entries with category '{category_to_purge}'...")
-    new_cache = {}
-    purged_count = 0
-
-    for key, data in cache.items():
-        # Check if data is a dict and has the 'category' key before accessing
-        if isinstance(data, dict):
-            entry_category = data.get("category", "").lower() # Safely get category, default to "", lowercase
-            if entry_category == category_to_purge:
-                purged_count += 1
-                # print(f"  - Removing: {key}") # Uncomment for verbose output
-            else:
-                new_cache[key] = data # Keep this entry
-        else:
-            # Keep invalid/unexpected entries? Or discard? Let's keep them for now.
-            print(f"Warning: Skipping invalid cache entry for key '{key}' (not a dictionary).", file=sys.stderr)
-            new_cache[key] = data
-
+    # --- Select Entries (single pass, no art decoded for binary caches) ---
+    purge_keys, hits, purged_by_category, kept_bytes = select_purge(cache, predicates, args.match_all)
+    if args.dry_run:
+        print_summary(original_count, predicates, hits, purged_by_category, kept_bytes, args.match_all)
+        print("Dry run: cache not modified.")
+        sys.exit(0)
 
-    if purged_count == 0:
-        print(f"\nNo entries found matching category '{category_to_purge}'. Cache remains unchanged.")
+    if not purge_keys:
+        print("\nNo entries matched. Cache remains unchanged.")
         sys.exit(0)
 
+    for key in purge_keys:
+        del cache[key]
+
     # --- Backup Cache (Optional) ---
     backup_file = f"{cache_file}.bak"
-    if not args.no_backup:
+    if args.backup:
         try:
-            print(f"Creating backup: '{backup_file}'...")
-            shutil.copy2(cache_file, backup_file) # copy2 preserves metadata
-        except FileNotFoundError:
-             print(f"Warning: Original cache file '{cache_file}' not found for backup (might have been empty initially).")
-        except Exception as e:
+            # The old file is replaced, not overwritten, so a second link to it is a full backup
+            if os.path.exists(backup_file): os.remove(backup_file)
+            os.link(cache_file, backup_file)
+        except OSError as e:
             print(f"Error: Failed to create backup file '{backup_file}': {e}", file=sys.stderr)
-            print("Aborting save to prevent data loss.")
+            print("Aborting save.")
             sys.exit(1)
 
     # --- Save New Cache ---
-    remaining_count = len(new_cache)
-    print(f"Saving updated cache with {remaining_count} entries back to '{cache_file}'...")
-
-    if save_cache(new_cache, cache_file):
-        print("\n--- Purge Summary ---")
-        print(f"Original entries: {original_count}")
-        print(f"Entries purged ({category_to_purge}): {purged_count}")
-        print(f"Remaining entries: {remaining_count}")
-        if not args.no_backup and os.path.exists(backup_file):
-             print(f"Backup created at: {backup_file}")
-        print("---------------------")
+    print(f"Saving updated cache with {len(cache)} entries back to '{cache_file}'...")
+
+    saved = save_cache(cache, cache_file)
+    if saved and has_journal: os.remove(f"{cache_file}.journal") # Its entries are in the saved cache now
+    if lock_file is not None: lock_file.close()
+    if saved:
+        print_summary(original_count, predicates, hits, purged_by_category, kept_bytes, args.match_all)
+        if args.backup: print(f"Backup created at: {backup_file}")
         sys.exit(0)
     else:
-        # Saving failed, error already printed
-        print("\nError occurred during saving. The original cache might be lost if backup failed.")
-        if not args.no_backup and os.path.exists(backup_file):
-             print(f"A backup *might* exist at '{backup_file}'.")
+        # Saving failed, error already printed. The temporary file is gone and the original untouched.
+        print("\nError occurred during saving. The original cache was left unchanged.")
         sys.exit(1)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
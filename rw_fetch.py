@@ -1,32 +1,28 @@
 #!/usr/bin/env python3
 import sys
 import random
-import argparse
 import os
-import json
-import subprocess # Still needed for fallback commands
-import shutil
-import math
-import re
-import platform
-import getpass
-import socket
 import time
-import datetime
-from pathlib import Path
-from PIL import Image
+import importlib
 from itertools import zip_longest
+_PROCESS_START = time.perf_counter()
 
-# --- Try importing psutil (Recommended Dependency) ---
-try:
-    import psutil
-    PSUTIL_AVAILABLE = True
-except ImportError:
-    psutil = None # Assign None if not available
-    PSUTIL_AVAILABLE = False
-    # Optionally print a warning only once
-    # print("Warning: 'psutil' library not found. Some system info (CPU%, Memory, Uptime) will be limited or unavailable.", file=sys.stderr)
-    # print("Install it via: pip install psutil", file=sys.stderr)
+# --- Deferred Imports ---
+# Only what every invocation needs is imported above. PIL, numpy, psutil,
+# subprocess, platform, socket, ... are imported by the code paths that use
+# them, so `--random` without --fetch-system pays for little more than the
+# cache reader. Run ./check_imports.py to see the import budget.
+_optional_modules = {}
+
+def optional_import(name):
+    """Imports an optional dependency (psutil, numpy, zstandard) on first use. Returns None if missing."""
+    if name not in _optional_modules:
+        try: _optional_modules[name] = importlib.import_module(name)
+        except ImportError: _optional_modules[name] = None
+    return _optional_modules[name]
+
+def psutil_available(): return optional_import("psutil") is not None # Recommended dependency
+def numpy_available(): return optional_import("numpy") is not None # Vectorized image conversion
 
 # Import configuration variables
 try:
@@ -35,6 +31,65 @@ except ImportError:
     print("Error: config.py not found. Please ensure it exists in the same directory.")
     sys.exit(1)
 
+import binary_cache # Indexed, memory-mapped cache format (alternative to JSON)
+
+# --- Timing Instrumentation ---
+# With --timings (or RW_FETCH_TIMINGS set, e.g. in a shell rc file) one JSON record
+# per run is written to stderr or appended to a file on exit: per-phase durations,
+# per-field sysinfo latency and timeouts, fallback command times, bytes written to
+# the terminal and peak RSS. When off, every hook is a single `is None` check.
+_timings = None
+_timings_target = None # "-" for stderr, otherwise a file path
+
+def start_timings(target):
+    """Enables the --timings record. target: "-"/"1"/"stderr" for stderr, a path, or None/""/"0" for off."""
+    global _timings, _timings_target
+    if not target or target == "0": return
+    _timings_target = "-" if target in ("-", "1", "stderr") else target
+    _timings = {"argv": sys.argv[1:], "phases": {"imports": time.perf_counter() - _PROCESS_START},
+                "fetchers": {}, "commands": [], "bytes_written": 0}
+    import atexit
+    atexit.register(emit_timings)
+
+def record_phase(name, seconds):
+    if _timings is not None: _timings["phases"][name] = _timings["phases"].get(name, 0) + seconds
+
+def record_bytes(count):
+    if _timings is not None: _timings["bytes_written"] += count
+
+class timed_phase:
+    """Adds the time spent in a with block, or in calls to a decorated function, to a --timings phase."""
+
+    def __init__(self, name): self.name = name
+    def __enter__(self): self.start = time.perf_counter(); return self
+    def __exit__(self, *exc): record_phase(self.name, time.perf_counter() - self.start)
+
+    def __call__(self, fn):
+        name = self.name
+        def wrapper(*args, **kwargs):
+            if _timings is None: return fn(*args, **kwargs)
+            with timed_phase(name): return fn(*args, **kwargs)
+        wrapper.__name__ = wrapper.__qualname__ = fn.__name__ # Keeps it picklable for the worker pool
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+
+def emit_timings():
+    record = dict(_timings, total_s=time.perf_counter() - _PROCESS_START, time=time.time())
+    try:
+        import resource # Unix only
+        scale = 1 if sys.platform == "darwin" else 1024 # ru_maxrss is bytes on macOS, KiB on Linux
+        record["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+        if children: record["peak_rss_children_bytes"] = children # --jobs workers, shell fallbacks
+    except ImportError: pass
+    line = get_json_lib().dumps(record)
+    line = (line.decode("utf-8") if isinstance(line, bytes) else line) + "\n"
+    try:
+        if _timings_target == "-": sys.stderr.write(line); sys.stderr.flush()
+        else:
+            with open(_timings_target, "a") as f: f.write(line)
+    except OSError as e: print(f"Warning: Could not write timings to {_timings_target}: {e}", file=sys.stderr)
+
 # --- ANSI Color Functions ---
 # (Keep these functions as they were)
 def rgb_to_ansi_fg(r, g, b, a):
@@ -50,13 +105,15 @@ def reset_ansi(): return config.RESET_COLOR
 # --- Image Processing Functions ---
 # (Keep crop_transparent_borders and image_to_ansi as they were)
 def crop_transparent_borders(image):
+    from PIL import Image
     image = image.convert("RGBA")
     try: bbox = image.getbbox()
     except Exception: bbox = None
     if bbox: return image.crop(bbox)
     else: return Image.new('RGBA', (1, 1), (0, 0, 0, 0))
 
-def image_to_ansi(image):
+def image_to_ansi_scalar(image):
+    from PIL import Image
     image = image.convert("RGBA")
     image = crop_transparent_borders(image)
     width, height = image.size
@@ -86,19 +143,760 @@ def image_to_ansi(image):
     elif not ansi_lines: return ""
     return "\n".join(ansi_lines)
 
+def pixel_keys_numpy(image):
+    """Per-pixel key array of an RGBA image: packed 0xRRGGBB, or -1 when alpha < 128."""
+    import numpy as np
+    pixels = np.asarray(image, dtype=np.uint8)
+    rgb = pixels[..., :3].astype(np.int32)
+    packed = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+    return np.where(pixels[..., 3] >= 128, packed, -1)
+
+def split_cell_keys(keys):
+    """Splits a pixel key array into per-cell (fg, bg) arrays: even rows on top, odd rows below."""
+    import numpy as np
+    if keys.shape[0] % 2 != 0: keys = np.concatenate((keys, np.full((1, keys.shape[1]), -1, dtype=keys.dtype)), axis=0)
+    return keys[0::2], keys[1::2]
+
+def _cell_keys_numpy(image):
+    """Per-cell (fg, bg) key arrays of an RGBA image: packed 0xRRGGBB, or -1 when alpha < 128."""
+    return split_cell_keys(pixel_keys_numpy(image))
+
+def image_cell_keys(image):
+    """Like _cell_keys_numpy, but as lists of rows and with a pure-Python fallback."""
+    image = image.convert("RGBA")
+    if numpy_available():
+        fg_keys, bg_keys = _cell_keys_numpy(image)
+        return fg_keys.tolist(), bg_keys.tolist()
+    width, height = image.size
+    def key(x, y):
+        if y >= height: return -1
+        r, g, b, a = image.getpixel((x, y))
+        return (r << 16) | (g << 8) | b if a >= 128 else -1
+    fg_keys = [[key(x, y) for x in range(width)] for y in range(0, height, 2)]
+    bg_keys = [[key(x, y + 1) for x in range(width)] for y in range(0, height, 2)]
+    return fg_keys, bg_keys
+
+def cells_to_ansi(fg_keys, bg_keys):
+    """Renders one run of cells with the same SGR rules as image_to_ansi (no trailing reset)."""
+    parts = []
+    last_fg = last_bg = None
+    for fk, bk in zip(fg_keys, bg_keys):
+        if bk != last_bg:
+            parts.append("\033[49m" if bk < 0 else f"\033[48;2;{bk >> 16};{(bk >> 8) & 255};{bk & 255}m"); last_bg = bk
+        if fk != last_fg:
+            parts.append("\033[39m" if fk < 0 else f"\033[38;2;{fk >> 16};{(fk >> 8) & 255};{fk & 255}m"); last_fg = fk
+        parts.append("▀" if fk >= 0 else " ")
+    return "".join(parts)
+
+def image_to_ansi_numpy(image):
+    """Vectorized image_to_ansi. Produces byte-identical output to the scalar path.
+
+    Each half-block cell gets an integer key per layer (packed 0xRRGGBB, or -1
+    when alpha < 128). The scalar loop only emits an SGR when that key differs
+    from the previous cell in the same row, so the change points are computed
+    for all row pairs at once and each line is built from runs between them.
+    """
+    return cell_keys_to_ansi_numpy(*_cell_keys_numpy(crop_transparent_borders(image.convert("RGBA"))))
+
+def cell_keys_to_ansi_numpy(fg_keys, bg_keys):
+    """The rendering half of image_to_ansi_numpy, for cell key arrays that are already cropped."""
+    import numpy as np
+    width = fg_keys.shape[1]
+
+    # First cell of every row always differs from the (None) previous state
+    fg_changed = np.ones(fg_keys.shape, dtype=bool)
+    fg_changed[:, 1:] = fg_keys[:, 1:] != fg_keys[:, :-1]
+    bg_changed = np.ones(bg_keys.shape, dtype=bool)
+    bg_changed[:, 1:] = bg_keys[:, 1:] != bg_keys[:, :-1]
+
+    rows, cols = np.nonzero(fg_changed | bg_changed)
+    # Run length of each change point: distance to the next one in the same row
+    ends = np.empty_like(cols)
+    ends[:-1] = cols[1:]
+    ends[-1] = width
+    row_last = np.ones(rows.shape, dtype=bool)
+    row_last[:-1] = rows[1:] != rows[:-1]
+    ends[row_last] = width
+    runs = ends - cols
+
+    fg_esc, bg_esc = {-1: "\033[39m"}, {-1: "\033[49m"}
+    def esc(cache, key, prefix):
+        s = cache.get(key)
+        if s is None: s = cache[key] = f"\033[{prefix};{key >> 16};{(key >> 8) & 255};{key & 255}m"
+        return s
+
+    reset = reset_ansi()
+    ansi_lines = []
+    parts = []
+    last_row = rows[0] if len(rows) else 0
+    for row, col, run, fk, bk, fc, bc in zip(rows.tolist(), cols.tolist(), runs.tolist(),
+                                              fg_keys[rows, cols].tolist(), bg_keys[rows, cols].tolist(),
+                                              fg_changed[rows, cols].tolist(), bg_changed[rows, cols].tolist()):
+        if row != last_row:
+            parts.append(reset); ansi_lines.append("".join(parts)); parts = []; last_row = row
+        if bc: parts.append(esc(bg_esc, bk, "48;2"))
+        if fc: parts.append(esc(fg_esc, fk, "38;2"))
+        parts.append(("▀" if fk >= 0 else " ") * run)
+    parts.append(reset); ansi_lines.append("".join(parts))
+    return "\n".join(ansi_lines)
+
+def image_to_ansi(image):
+    if numpy_available(): return image_to_ansi_numpy(image)
+    return image_to_ansi_scalar(image)
+
+# --- Output Encodings ---
+# "truecolor" is the art as converted: separate 24-bit fg and bg escapes. The other
+# encodings are derived from the same cell keys. "combined" puts fg and bg changes in
+# one SGR, while "256" and "16" map every cell to the nearest xterm-256 / 16-color entry,
+# which also merges near-identical neighbours into fewer color changes. All derived
+# encodings skip fg changes on cells that don't show the fg, and can quantize the image
+# to a per-image palette of N colors first. They are cached per entry under
+# "encodings", keyed "<encoding>" or "<encoding>/<N>" (see encoding_key).
+OUTPUT_ENCODINGS = ("truecolor", "combined", "256", "16")
+CUBE_LEVELS = (0, 95, 135, 175, 215, 255) # xterm-256 color cube channel values
+ANSI16_RGB = ((0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0), (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229),
+              (127, 127, 127), (255, 0, 0), (0, 255, 0), (255, 255, 0), (92, 92, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255))
+
+def encoding_key(encoding, palette=None):
+    return f"{encoding}/{palette}" if palette else encoding
+
+def parse_encoding_key(key):
+    """Inverse of encoding_key: "256/16" -> ("256", 16). Raises ValueError for unknown encodings."""
+    encoding, _, palette = key.partition("/")
+    if encoding not in OUTPUT_ENCODINGS: raise ValueError(f"unknown encoding '{encoding}' (choose from {', '.join(OUTPUT_ENCODINGS)})")
+    return encoding, int(palette) if palette else None
+
+def quantize_cell_keys(fg_keys, bg_keys, colors):
+    """Reduces the opaque cells of an image to a palette of at most `colors` colors (Pillow median cut)."""
+    from PIL import Image
+    opaque = [k for rows in (fg_keys, bg_keys) for row in rows for k in row if k >= 0]
+    if len(set(opaque)) <= colors: return fg_keys, bg_keys
+    image = Image.new("RGB", (len(opaque), 1))
+    image.putdata([(k >> 16, (k >> 8) & 255, k & 255) for k in opaque])
+    quantized = image.quantize(colors=colors, method=Image.Quantize.MEDIANCUT).convert("RGB").tobytes()
+    mapping = {k: (r << 16) | (g << 8) | b for k, r, g, b in zip(opaque, quantized[0::3], quantized[1::3], quantized[2::3])}
+    remap = lambda rows: [[mapping.get(k, k) for k in row] for row in rows]
+    return remap(fg_keys), remap(bg_keys)
+
+def _nearest_256(key):
+    r, g, b = key >> 16, (key >> 8) & 255, key & 255
+    levels = [min(range(6), key=lambda i: abs(CUBE_LEVELS[i] - c)) for c in (r, g, b)]
+    cube_dist = sum((CUBE_LEVELS[i] - c) ** 2 for i, c in zip(levels, (r, g, b)))
+    gray = min(23, max(0, round(((r + g + b) / 3 - 8) / 10)))
+    gray_dist = sum((8 + 10 * gray - c) ** 2 for c in (r, g, b))
+    return 232 + gray if gray_dist < cube_dist else 16 + 36 * levels[0] + 6 * levels[1] + levels[2]
+
+def _nearest_16(key):
+    r, g, b = key >> 16, (key >> 8) & 255, key & 255
+    return min(range(16), key=lambda i: (ANSI16_RGB[i][0] - r) ** 2 + (ANSI16_RGB[i][1] - g) ** 2 + (ANSI16_RGB[i][2] - b) ** 2)
+
+def _nearest_colors_numpy(keys, encoding):
+    """Vectorized _nearest_256 / _nearest_16 over an array of distinct opaque keys."""
+    import numpy as np
+    rgb = np.stack(((keys >> 16) & 255, (keys >> 8) & 255, keys & 255), axis=-1).astype(np.int32)
+    if encoding == "16":
+        distances = ((rgb[:, None, :] - np.array(ANSI16_RGB, dtype=np.int32)[None, :, :]) ** 2).sum(axis=-1)
+        return distances.argmin(axis=1)
+    levels = np.array(CUBE_LEVELS, dtype=np.int32)
+    level_index = np.abs(rgb[..., None] - levels).argmin(axis=-1) # First (lowest) level wins ties, like _nearest_256
+    cube_dist = ((levels[level_index] - rgb) ** 2).sum(axis=-1)
+    gray = np.clip(np.round((rgb.sum(axis=-1) / 3 - 8) / 10), 0, 23).astype(np.int32)
+    gray_dist = (((8 + 10 * gray)[:, None] - rgb) ** 2).sum(axis=-1)
+    cube = 16 + 36 * level_index[:, 0] + 6 * level_index[:, 1] + level_index[:, 2]
+    return np.where(gray_dist < cube_dist, 232 + gray, cube)
+
+def map_cell_keys(fg_keys, bg_keys, encoding):
+    """Maps opaque cell keys to color indices of a 256/16-color encoding (transparent stays -1)."""
+    if encoding not in ("256", "16"): return fg_keys, bg_keys
+    colors = {k for rows in (fg_keys, bg_keys) for row in rows for k in row if k >= 0}
+    if numpy_available():
+        import numpy as np
+        distinct = np.fromiter(colors, dtype=np.int64, count=len(colors))
+        mapping = dict(zip(distinct.tolist(), _nearest_colors_numpy(distinct, encoding).tolist()))
+    else:
+        nearest = _nearest_16 if encoding == "16" else _nearest_256
+        mapping = {k: nearest(k) for k in colors}
+    mapping[-1] = -1
+    return [[mapping[k] for k in row] for row in fg_keys], [[mapping[k] for k in row] for row in bg_keys]
+
+def _sgr_codes(encoding):
+    """(fg_code, bg_code) functions turning a (mapped) opaque key into SGR parameters."""
+    if encoding == "256": return (lambda k: f"38;5;{k}"), (lambda k: f"48;5;{k}")
+    if encoding == "16": return (lambda k: str(30 + k if k < 8 else 82 + k)), (lambda k: str(40 + k if k < 8 else 92 + k))
+    return (lambda k: f"38;2;{k >> 16};{(k >> 8) & 255};{k & 255}"), (lambda k: f"48;2;{k >> 16};{(k >> 8) & 255};{k & 255}")
+
+def encode_cell_keys(fg_keys, bg_keys, encoding, palette=None):
+    """Renders cell keys in a derived encoding (see Output Encodings). Same cells and widths as image_to_ansi."""
+    if palette: fg_keys, bg_keys = quantize_cell_keys(fg_keys, bg_keys, palette)
+    fg_keys, bg_keys = map_cell_keys(fg_keys, bg_keys, encoding)
+    fg_code, bg_code = _sgr_codes(encoding)
+    fg_cache, bg_cache = {}, {-1: "49"}
+    reset = reset_ansi()
+    lines = []
+    for fg_row, bg_row in zip(fg_keys, bg_keys):
+        parts = []
+        last_fg = last_bg = None
+        for fk, bk in zip(fg_row, bg_row):
+            codes = None
+            if bk != last_bg:
+                codes = bg_cache.get(bk) or bg_cache.setdefault(bk, bg_code(bk)); last_bg = bk
+            if fk < 0 or fk == bk: char = " " # Only the bg shows: leave the fg as it is
+            else:
+                char = "▀"
+                if fk != last_fg:
+                    code = fg_cache.get(fk) or fg_cache.setdefault(fk, fg_code(fk)); last_fg = fk
+                    codes = f"{codes};{code}" if codes else code
+            if codes: parts.append(f"\033[{codes}m")
+            parts.append(char)
+        parts.append(reset)
+        lines.append("".join(parts))
+    if not lines: return config.RESET_COLOR
+    return "\n".join(lines)
+
+def art_to_cell_keys(ansi_art):
+    """Recovers the cell keys of truecolor art (as made by image_to_ansi), so encodings can be derived without the image."""
+    fg_keys, bg_keys = [], []
+    for line in ansi_art.split("\n"):
+        fg_row, bg_row = [], []
+        fg = bg = -1
+        for part in line.split("\x1b["):
+            code, sep, text = part.partition("m")
+            if not sep: text = code # Leading text before the first escape
+            elif code == "39": fg = -1
+            elif code == "49": bg = -1
+            elif code == "0": fg = bg = -1
+            elif code.startswith("38;2;"): _, _, r, g, b = code.split(";"); fg = (int(r) << 16) | (int(g) << 8) | int(b)
+            elif code.startswith("48;2;"): _, _, r, g, b = code.split(";"); bg = (int(r) << 16) | (int(g) << 8) | int(b)
+            for char in text:
+                fg_row.append(fg if char == "▀" else -1); bg_row.append(bg)
+        if fg_row: fg_keys.append(fg_row); bg_keys.append(bg_row)
+    return fg_keys, bg_keys
+
+def entry_encoded_art(data, encoding_name):
+    """Returns the art of a cache entry in the encoding named by an encoding_key, deriving it if it isn't cached."""
+    if encoding_name == "truecolor": return entry_art(data)
+    cached = data.get("encodings", {}).get(encoding_name)
+    if cached is not None: return cached
+    encoding, palette = parse_encoding_key(encoding_name)
+    return encode_cell_keys(*art_to_cell_keys(entry_art(data)), encoding, palette)
+
+def add_entry_encodings(data, encoding_names, cell_keys=None):
+    """Caches the named encodings in data["encodings"] and in those of its scaled variants. Returns True if any was added.
+
+    Graphics protocols among the names (see Graphics Protocols) are cached in data["graphics"].
+    """
+    missing = [name for name in encoding_names if name != "truecolor" and name not in GRAPHICS_PROTOCOLS
+               and name not in data.get("encodings", {})]
+    missing_graphics = [name for name in encoding_names if name in GRAPHICS_PROTOCOLS and stale_graphics(data, name)]
+    if missing or missing_graphics:
+        if cell_keys is None: cell_keys = art_to_cell_keys(entry_art(data))
+        if missing:
+            encodings = data.setdefault("encodings", {})
+            for name in missing: encodings[name] = encode_cell_keys(*cell_keys, *parse_encoding_key(name))
+        for name in missing_graphics: data.setdefault("graphics", {})[name] = graphics_payload(name, cell_keys)
+    added = bool(missing or missing_graphics)
+    for variant in data.get("variants", ()): added = add_entry_encodings(variant, encoding_names) or added
+    return added
+
+# --- Scaled Variants ---
+# Besides the full-size art, every entry caches the image reduced by each factor in
+# ART_SCALES (Pillow's reduce, a box filter) as data["variants"]: a list of
+# {"scale", "ansi_art", "num_lines", "art_width"[, "encodings"]}, largest first.
+# When the art and the sysinfo panel don't fit the terminal, the largest variant
+# that does is printed instead, so nothing is decoded or resized at display time.
+def cell_keys_image(fg_keys, bg_keys):
+    """The RGBA image cell keys were read from (alpha thresholded), so variants can be built from cached art."""
+    from PIL import Image
+    pixels = bytearray()
+    for fg_row, bg_row in zip(fg_keys, bg_keys):
+        for row in (fg_row, bg_row):
+            for k in row: pixels += b"\0\0\0\0" if k < 0 else bytes((k >> 16, (k >> 8) & 255, k & 255, 255))
+    return Image.frombytes("RGBA", (len(fg_keys[0]) if fg_keys else 0, 2 * len(fg_keys)), bytes(pixels))
+
+def scaled_variants(image, scales):
+    """Converts image reduced by each factor in scales. Variants no narrower than the previous one are skipped."""
+    image = crop_transparent_borders(image)
+    premultiplied = image.convert("RGBa") # So transparent pixels don't darken the edges they're averaged into
+    variants, last_width = [], image.width
+    for scale in sorted(set(scales)):
+        if scale < 2 or image.width // scale < 1 or image.height // scale < 1: continue
+        ansi_art = image_to_ansi(premultiplied.reduce(scale).convert("RGBA"))
+        if not ansi_art or ansi_art.isspace(): continue
+        art_width = art_layout(ansi_art)
+        if art_width is None or art_width >= last_width: continue
+        variants.append({"scale": scale, "ansi_art": ansi_art, "num_lines": classify_image(ansi_art)[1], "art_width": art_width})
+        last_width = art_width
+    return variants
+
+def update_art_variants(data, image=None):
+    """Brings data["variants"] in line with ART_SCALES, from image or else from the cached art. Returns True if changed."""
+    scales = sorted(set(config.ART_SCALES))
+    if not scales:
+        changed = "variants" in data or "art_scales" in data
+        data.pop("variants", None); data.pop("art_scales", None)
+        return changed
+    if data.get("art_scales") == scales: return False
+    if image is None: image = cell_keys_image(*art_to_cell_keys(entry_art(data)))
+    variants = scaled_variants(image, scales)
+    data["art_scales"] = scales
+    if variants: data["variants"] = variants
+    else: data.pop("variants", None)
+    return True
+
+def terminal_columns():
+    """Columns of the terminal on stdout, or None if stdout isn't one. $COLUMNS wins, like shutil.get_terminal_size."""
+    try: columns = int(os.environ.get("COLUMNS", 0))
+    except ValueError: columns = 0
+    if columns > 0: return columns
+    try: return os.get_terminal_size(sys.__stdout__.fileno()).columns or None
+    except (AttributeError, ValueError, OSError): return None
+
+def max_art_width(sys_info_lines, columns):
+    """Columns left for the art once sys_info_lines and the separator are placed beside it (None = no limit)."""
+    if not columns: return None
+    if not sys_info_lines: return columns
+    return columns - visible_width(config.IMAGE_INFO_SEPARATOR) - max(visible_width(line) for line in sys_info_lines)
+
+def needs_variant(data, max_width):
+    """True if the full-size art of data is known to be wider than max_width."""
+    art_width = data.get("art_width")
+    return max_width is not None and art_width is not None and art_width > max_width
+
+def fitting_variant(data, max_width):
+    """Returns data, or its largest scaled variant no wider than max_width (the smallest one if none is)."""
+    if not needs_variant(data, max_width): return data
+    variants = data.get("variants")
+    if not variants: return data
+    return next((variant for variant in variants if variant["art_width"] <= max_width), variants[-1])
+
+# --- Graphics Protocols (--graphics) ---
+# Terminals with a graphics protocol are sent the cropped frame itself instead of half
+# blocks: kitty (a PNG the terminal scales into the cells the half-block art would take)
+# or Sixel (drawn at SIXEL_SCALE screen pixels per image pixel). Payloads are cached per
+# entry and variant as data["graphics"][protocol] = {"data", "width", "height"[, "id"]
+# [, "scale"]} when the cache is built with --graphics (or CACHE_GRAPHICS), and derived
+# from the cached art otherwise. The cells under the image are reserved as blank art,
+# so the sysinfo panel is laid out beside it as usual.
+GRAPHICS_PROTOCOLS = ("kitty", "sixel")
+_SIXEL_CHARS = bytes(range(63, 127)) + bytes(192) # Translation table: 6-bit column -> sixel character
+
+def detect_graphics():
+    """Guesses the graphics protocol of the terminal on stdout from the environment ("none" if unknown)."""
+    if not sys.stdout.isatty(): return "none"
+    term, program = os.environ.get("TERM", ""), os.environ.get("TERM_PROGRAM", "")
+    if "KITTY_WINDOW_ID" in os.environ or term in ("xterm-kitty", "xterm-ghostty") or program in ("WezTerm", "ghostty"): return "kitty"
+    if term.startswith(("foot", "mlterm")) or "sixel" in term: return "sixel"
+    return "none"
+
+def kitty_payload(image):
+    """PNG payload of an RGBA image, with an image id derived from its content."""
+    import base64
+    import hashlib
+    import io
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    png = buffer.getvalue()
+    image_id = int.from_bytes(hashlib.sha256(png).digest()[:4], "big") & 0x7FFFFFFF or 1
+    return {"data": base64.b64encode(png).decode("ascii"), "width": image.width, "height": image.height, "id": image_id}
+
+def sixel_payload(fg_keys, bg_keys, scale=1):
+    """Sixel payload of cell keys, every pixel drawn scale x scale. Transparent pixels leave the background as it is."""
+    import re
+    rows = [row for pair in zip(fg_keys, bg_keys) for row in pair]
+    if len({k for row in rows for k in row if k >= 0}) > 256: rows, _ = quantize_cell_keys(rows, [], 256) # Color registers
+    palette = {k: i for i, k in enumerate(sorted({k for row in rows for k in row if k >= 0}))}
+    if scale > 1: rows = [[k for k in row for _ in range(scale)] for row in rows for _ in range(scale)]
+    width, height = (len(rows[0]) if rows else 0), len(rows)
+    out = [f'\x1bP0;1;0q"1;1;{width};{height}']
+    out += [f"#{i};2;{round((k >> 16) * 100 / 255)};{round(((k >> 8) & 255) * 100 / 255)};{round((k & 255) * 100 / 255)}"
+            for k, i in palette.items()]
+    repeat = re.compile(r"(.)\1{3,}")
+    for top in range(0, height, 6): # One band of six pixel rows, one pass per color in it
+        planes = {}
+        for bit, row in enumerate(rows[top:top + 6]):
+            for x, k in enumerate(row):
+                if k < 0: continue
+                plane = planes.get(k)
+                if plane is None: plane = planes[k] = bytearray(width)
+                plane[x] |= 1 << bit
+        passes = [f"#{palette[k]}" + repeat.sub(lambda m: f"!{len(m.group())}{m.group(1)}", plane.rstrip(b"\0").translate(_SIXEL_CHARS).decode("ascii"))
+                  for k, plane in planes.items()]
+        out.append("$".join(passes) + "-")
+    out.append("\x1b\\")
+    return {"data": "".join(out), "width": width, "height": height, "scale": scale}
+
+def graphics_payload(protocol, cell_keys):
+    if protocol == "kitty": return kitty_payload(cell_keys_image(*cell_keys))
+    return sixel_payload(*cell_keys, config.SIXEL_SCALE)
+
+def stale_graphics(data, protocol):
+    """True if data has no cached payload for protocol (or a Sixel one drawn at another SIXEL_SCALE)."""
+    payload = data.get("graphics", {}).get(protocol)
+    return payload is None or (protocol == "sixel" and payload.get("scale") != config.SIXEL_SCALE)
+
+def entry_graphics(data, protocol):
+    """Returns the graphics payload of a cache entry, deriving it from the art if it isn't cached."""
+    if not stale_graphics(data, protocol): return data["graphics"][protocol]
+    return graphics_payload(protocol, art_to_cell_keys(entry_art(data)))
+
+def terminal_cell_size():
+    """(width, height) of a cell in pixels of the terminal on stdout, or GRAPHICS_CELL_SIZE if it doesn't say."""
+    try:
+        import fcntl
+        import struct
+        import termios
+        rows, columns, x_pixels, y_pixels = struct.unpack("HHHH", fcntl.ioctl(sys.__stdout__.fileno(), termios.TIOCGWINSZ, bytes(8)))
+        if rows and columns and x_pixels and y_pixels: return x_pixels // columns, y_pixels // rows
+    except (ImportError, AttributeError, OSError, ValueError): pass
+    return tuple(config.GRAPHICS_CELL_SIZE)
+
+def graphics_session():
+    """Names the terminal session on stdout (its tty and session id), or None if stdout isn't a terminal."""
+    try: return f"{os.ttyname(sys.__stdout__.fileno()).strip('/').replace('/', '-')}-{os.getsid(0)}"
+    except (AttributeError, OSError, ValueError): return None
+
+def kitty_session_path(session):
+    return os.path.join(os.environ.get("XDG_RUNTIME_DIR") or "/tmp", f"rw_fetch-{os.getuid()}-kitty-{session}.ids")
+
+_kitty_sent = {} # Session -> ids of the kitty images already transmitted to it
+
+def kitty_sent_ids(session):
+    """Ids of the images transmitted in a session, from its file in the runtime directory (read once)."""
+    sent = _kitty_sent.get(session)
+    if sent is None:
+        try:
+            with open(kitty_session_path(session), encoding="utf-8") as f: sent = set(f.read().split())
+        except OSError: sent = set()
+        _kitty_sent[session] = sent
+    return sent
+
+def kitty_escape(payload, columns, rows, session=None):
+    """kitty graphics escapes showing payload over columns x rows cells, leaving the cursor where it is.
+
+    The image is transmitted once per session and placed again by id after that (every time with session=None).
+    """
+    image_id = payload["id"]
+    place = f"i={image_id},c={columns},r={rows},C=1,q=2"
+    sent = kitty_sent_ids(session) if session and config.KITTY_REUSE_IDS else None
+    if sent is not None and str(image_id) in sent: return f"\x1b_Ga=p,{place}\x1b\\"
+    data = payload["data"]
+    chunks = [data[i:i + 4096] for i in range(0, len(data), 4096)] # The protocol's limit per escape
+    escapes = "".join(f"\x1b_G{f'a=T,f=100,{place},' if i == 0 else ''}m={int(i < len(chunks) - 1)};{chunk}\x1b\\"
+                      for i, chunk in enumerate(chunks))
+    if sent is not None:
+        sent.add(str(image_id))
+        try:
+            with open(kitty_session_path(session), "a", encoding="utf-8") as f: f.write(f"{image_id}\n")
+        except OSError: pass
+    return escapes
+
+def render_graphics(data, sys_info_lines, protocol, session=None, cell_size=None):
+    """Returns data drawn with a graphics protocol, its cells reserved as blank art so sys_info_lines line up beside it."""
+    payload = entry_graphics(data, protocol)
+    if protocol == "kitty":
+        columns, rows = payload["width"], -(-payload["height"] // 2) # Same cells as the half-block art
+        escape = kitty_escape(payload, columns, rows, session)
+    else:
+        cell_width, cell_height = cell_size or terminal_cell_size()
+        columns, rows = -(-payload["width"] // cell_width), -(-payload["height"] // cell_height)
+        escape = payload["data"]
+    # Scroll the rows into view first, so a frame at the bottom of the screen isn't cut off
+    prefix = "\n" * rows + f"\x1b[{rows}A\x1b7{escape}\x1b8"
+    if sys_info_lines: return prefix + render_art_and_info("\n".join([" " * columns] * rows), sys_info_lines, columns)
+    return prefix + "\n" * rows
+
+# --- Pixel Atlas ---
+# With --atlas (or PIXEL_ATLAS in config.py), a directory run also keeps every cropped
+# frame of every cached image in <cache>.atlas (see pixel_atlas.py). --frame and --scale
+# then render straight from those pixel arrays: no image is decoded, and rendered art
+# is memoized per (image, frame, scale, encoding) in an LRU of ATLAS_RENDER_CACHE entries,
+# which the --serve daemon keeps warm.
+def atlas_path(cache_file): return f"{cache_file}.atlas"
+
+def image_atlas_frames(img):
+    """Returns [(blob, width, height, colors, duration_ms), ...] for every frame of img, each cropped on its own."""
+    import pixel_atlas
+    frames = []
+    for index in range(getattr(img, "n_frames", 1) if getattr(img, "is_animated", False) else 1):
+        img.seek(index); img.load()
+        frame = crop_transparent_borders(img.convert("RGBA"))
+        blob, colors = pixel_atlas.encode_frame(pixel_keys_numpy(frame))
+        frames.append((blob, frame.width, frame.height, colors, img.info.get("duration") or 100))
+    return frames
+
+@timed_phase("atlas")
+def update_atlas(cache_file, cache, silent=False):
+    """Writes <cache>.atlas for the entries of cache, copying the frames of images whose content didn't change."""
+    import pixel_atlas
+    from PIL import Image
+    if not numpy_available(): print("Warning: The pixel atlas needs numpy (`pip install numpy`), skipping it.", file=sys.stderr); return
+    path = atlas_path(cache_file)
+    try: old = pixel_atlas.PixelAtlas(path) if os.path.exists(path) else None
+    except (OSError, ValueError) as e: print(f"Warning: Rebuilding pixel atlas {path}: {e}", file=sys.stderr); old = None
+    images, converted = {}, 0
+    for key in cache:
+        source = cache[key].get("source") if has_art(cache[key]) or is_evicted(cache[key]) else None
+        sha256 = source.get("sha256") if isinstance(source, dict) else None
+        if not sha256: continue
+        if old is not None and key in old and old.source_hash(key) == sha256: images[key] = (sha256, old.raw_frames(key)); continue
+        try:
+            with Image.open(key) as img: images[key] = (sha256, image_atlas_frames(img))
+            converted += 1
+        except Exception as e: print(f"Warning: Leaving {key} out of the pixel atlas: {e}", file=sys.stderr)
+    if old is not None and not converted and len(images) == len(old): old.close(); return # Nothing changed
+    pixel_atlas.write_atlas(images, path)
+    if old is not None: old.close()
+    if not silent: print(f"Pixel atlas: {len(images)} images ({converted} decoded) in {path}")
+
+_atlases = {}
+
+def get_atlas(cache_file):
+    """Returns the PixelAtlas next to cache_file (reopened when the file is replaced), or None if there is none."""
+    import pixel_atlas
+    path = atlas_path(cache_file)
+    try: st = os.stat(path)
+    except OSError: return None
+    stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+    cached = _atlases.get(path)
+    if cached is None or cached[0] != stamp: _atlases[path] = cached = (stamp, pixel_atlas.PixelAtlas(path))
+    return cached[1]
+
+def render_pixel_keys(keys, scale=1, encoding_name="truecolor"):
+    """Renders a (cropped) pixel key array reduced by scale, in the encoding named by an encoding_key."""
+    import numpy as np
+    if scale > 1:
+        from PIL import Image
+        rgba = np.zeros(keys.shape + (4,), dtype=np.uint8)
+        rgba[..., 0], rgba[..., 1], rgba[..., 2] = (keys >> 16) & 255, (keys >> 8) & 255, keys & 255
+        rgba[..., 3] = np.where(keys >= 0, 255, 0)
+        reduced = Image.fromarray(rgba, "RGBA").convert("RGBa").reduce(scale).convert("RGBA") # As in scaled_variants
+        keys = pixel_keys_numpy(crop_transparent_borders(reduced))
+    fg_keys, bg_keys = split_cell_keys(keys)
+    if encoding_name == "truecolor": return cell_keys_to_ansi_numpy(fg_keys, bg_keys)
+    return encode_cell_keys(fg_keys.tolist(), bg_keys.tolist(), *parse_encoding_key(encoding_name))
+
+def _render_atlas_frame(atlas, key, frame, scale, encoding_name):
+    return render_pixel_keys(atlas.frame_keys(key, frame), scale, encoding_name)
+
+def atlas_entry(cache_file, key, frame=0, scale=1, encoding_name="truecolor"):
+    """Returns a cache-entry-like dict with key's art rendered from the atlas, or None if the atlas doesn't have it.
+
+    frame wraps around the image's frame count.
+    """
+    global _render_atlas_frame
+    atlas = get_atlas(cache_file)
+    if atlas is None or key not in atlas: return None
+    if not hasattr(_render_atlas_frame, "cache_info"): # Memoize on first use, so functools stays off the --random path
+        import functools
+        _render_atlas_frame = functools.lru_cache(maxsize=config.ATLAS_RENDER_CACHE)(_render_atlas_frame)
+    ansi_art = _render_atlas_frame(atlas, key, frame % atlas.frame_count(key), max(1, scale), encoding_name)
+    category, num_lines = classify_image(ansi_art)
+    data = {"ansi_art": ansi_art, "category": category, "num_lines": num_lines, "encodings": {encoding_name: ansi_art}}
+    art_width = art_layout(ansi_art)
+    if art_width is not None: data["art_width"] = art_width
+    return data
+
+# --- Animation (--animate) ---
+# Frame 0 is stored as full art; every other frame as a delta of only the cells
+# that changed since the previous frame. Deltas are position independent: each
+# changed run starts with DECRC (restore the cursor saved at the art's top-left)
+# followed by relative moves, so playback just saves the cursor once and writes
+# deltas verbatim. deltas[0] goes from the last frame back to frame 0 (looping).
+ANIMATION_MERGE_GAP = 4 # Unchanged cells this short between two runs are cheaper to repaint than to skip
+
+def frame_delta(prev_fg, prev_bg, fg_keys, bg_keys):
+    parts = []
+    reset = reset_ansi()
+    for row, (pf, pb, cf, cb) in enumerate(zip(prev_fg, prev_bg, fg_keys, bg_keys)):
+        changed = [x for x in range(len(cf)) if cf[x] != pf[x] or cb[x] != pb[x]]
+        if not changed: continue
+        runs = [[changed[0], changed[0]]]
+        for x in changed[1:]:
+            if x - runs[-1][1] <= ANIMATION_MERGE_GAP + 1: runs[-1][1] = x
+            else: runs.append([x, x])
+        for start, end in runs:
+            parts.append("\0338")
+            if row: parts.append(f"\033[{row}B")
+            if start: parts.append(f"\033[{start}C")
+            parts.append(cells_to_ansi(cf[start:end + 1], cb[start:end + 1]))
+            parts.append(reset)
+    return "".join(parts)
+
+def build_animation(img):
+    """Converts every frame of an animated image into {"first", "deltas", "durations"}."""
+    frames, durations, bbox = [], [], None
+    for index in range(img.n_frames):
+        img.seek(index); img.load()
+        frame = img.convert("RGBA")
+        frames.append(frame)
+        durations.append(img.info.get("duration") or 100)
+        box = frame.getbbox()
+        if box: bbox = box if bbox is None else (min(bbox[0], box[0]), min(bbox[1], box[1]), max(bbox[2], box[2]), max(bbox[3], box[3]))
+    # Crop every frame to the union of their boxes so cells line up across frames
+    keys = [image_cell_keys(frame.crop(bbox) if bbox else frame) for frame in frames]
+    first = "\n".join(cells_to_ansi(fg_row, bg_row) + reset_ansi() for fg_row, bg_row in zip(*keys[0]))
+    deltas = [frame_delta(*keys[i - 1], *keys[i]) for i in range(len(keys))] # i=0 diffs against the last frame
+    return {"first": first, "deltas": deltas, "durations": durations, "art_width": art_layout(first)}
+
+def play_animation(animation, sys_info_lines=None, loops=1):
+    """Prints frame 0 (optionally beside sysinfo), then repaints changed cells in place.
+
+    loops=0 plays until interrupted. If stdout isn't a terminal, or the art and
+    sysinfo are taller than it (their top has scrolled off and can't be
+    repainted), frame 0 stays.
+    """
+    first = animation["first"]
+    if sys_info_lines: display_art_and_info(first, sys_info_lines, animation.get("art_width"))
+    else: write_frame(first + "\n")
+    deltas, durations = animation["deltas"], animation["durations"]
+    if len(deltas) < 2: return
+    total_lines = max(first.count("\n") + 1, len(sys_info_lines or ()))
+    rows = terminal_lines()
+    if not rows or total_lines >= rows: return # Cursor-up stops at the top row, the deltas would land too low
+    out = sys.stdout
+    # Back to the art's top-left, remember it, hide the cursor while drawing
+    out.write(f"\033[{total_lines}A\r\0337\033[?25l"); out.flush()
+    try:
+        deadline = time.monotonic()
+        played = 0
+        while loops == 0 or played < loops:
+            for index in range(len(deltas)):
+                if index or played: # Frame 0 starts on screen
+                    out.write(deltas[index]); out.flush(); record_bytes(len(deltas[index].encode("utf-8")))
+                deadline += max(durations[index], 20) / 1000
+                delay = deadline - time.monotonic()
+                if delay > 0: time.sleep(delay)
+            played += 1
+    except KeyboardInterrupt: pass
+    finally:
+        out.write(f"\0338\033[{total_lines}B\r\033[?25h"); out.flush()
+
 # --- Classification and Caching ---
 # (Keep classify_image, load_cache, save_cache, process_image as they were,
 #  but consider adding orjson for load/save if desired)
-# --- Add orjson attempt ---
-try:
-    import orjson as json_lib
-    # print("Using orjson for faster JSON handling.", file=sys.stderr)
-except ImportError:
-    import json as json_lib # Fallback to standard json
-    # print("orjson not found, using standard json library.", file=sys.stderr)
+# --- orjson (imported on first use, falls back to the standard json module) ---
+def get_json_lib(): return optional_import("orjson") or importlib.import_module("json")
+
+# --- Art Compression (opt-in, see CACHE_COMPRESSION in config.py) ---
+# Compressed entries keep {"ansi_art_z", "art_codec", "art_size"} instead of "ansi_art"
+# and are only decompressed by entry_art() when something is actually printed.
+# In JSON caches ansi_art_z is base64 text; in binary caches it is the raw blob.
+ART_CODECS = ("zlib", "lzma", "zstd")
+_COMPRESSED_FIELDS = ("ansi_art", "ansi_art_z", "art_codec", "art_size", "art_dict")
+
+_zstd_dict_file = None # Shared dictionary sidecar of the cache being used, set by load_cache/save_cache
+_zstd_dict = None
+
+def zstd_dict_path(cache_file): return cache_file + ".zdict"
+
+def get_zstd_dict():
+    global _zstd_dict
+    if _zstd_dict is None and _zstd_dict_file and os.path.exists(_zstd_dict_file):
+        zstandard = optional_import("zstandard")
+        if zstandard is None: return None
+        with open(_zstd_dict_file, "rb") as f: _zstd_dict = zstandard.ZstdCompressionDict(f.read())
+    return _zstd_dict
+
+def train_zstd_dict(arts, dict_size=112 * 1024, max_samples=2000):
+    """Trains and stores a shared dictionary from sample arts. Returns None if training isn't possible."""
+    global _zstd_dict
+    zstandard = optional_import("zstandard")
+    samples = [a.encode("utf-8") for a in arts[:max_samples]]
+    try: zdict = zstandard.train_dictionary(dict_size, samples)
+    except Exception: return None # Too few/too small samples
+    with open(_zstd_dict_file, "wb") as f: f.write(zdict.as_bytes())
+    _zstd_dict = zdict
+    return zdict
+
+def compress_art(art, codec, zdict=None):
+    raw = art.encode("utf-8")
+    if codec == "zlib": import zlib; return zlib.compress(raw, 9)
+    if codec == "lzma": import lzma; return lzma.compress(raw, preset=6)
+    if codec == "zstd": return optional_import("zstandard").ZstdCompressor(level=19, dict_data=zdict).compress(raw)
+    raise ValueError(f"Unknown art codec: {codec}")
+
+def decompress_art(data):
+    blob, codec = data["ansi_art_z"], data.get("art_codec")
+    if isinstance(blob, str): import base64; blob = base64.b64decode(blob)
+    if codec == "zlib": import zlib; raw = zlib.decompress(blob)
+    elif codec == "lzma": import lzma; raw = lzma.decompress(blob)
+    elif codec == "zstd":
+        zstandard = optional_import("zstandard")
+        if zstandard is None: raise ValueError("art compressed with zstd but 'zstandard' is not installed")
+        zdict = get_zstd_dict() if "art_dict" in data else None
+        if "art_dict" in data and (zdict is None or zdict.dict_id() != data["art_dict"]):
+            raise ValueError(f"zstd dictionary {data['art_dict']} not found ({_zstd_dict_file}); rebuild with --refresh")
+        raw = zstandard.ZstdDecompressor(dict_data=zdict).decompress(blob)
+    else: raise ValueError(f"Unknown art codec: {codec}")
+    return raw.decode("utf-8")
+
+def entry_art(data):
+    """Returns the ANSI art of a cache entry, decompressing it if needed."""
+    if "ansi_art" in data: return data["ansi_art"]
+    return decompress_art(data)
 
+def has_art(data): return isinstance(data, dict) and ("ansi_art" in data or "ansi_art_z" in data)
+def is_evicted(data): return isinstance(data, dict) and "category" in data and not has_art(data) # See CACHE_MAX_BYTES
+
+def resolve_art_codec(codec, warn=False):
+    """codec, or zlib for zstd when 'zstandard' isn't installed."""
+    if codec == "zstd" and optional_import("zstandard") is None:
+        if warn: print("Warning: 'zstandard' not installed, compressing art with zlib instead.", file=sys.stderr)
+        return "zlib"
+    return codec
+
+def art_codec_differs(cache, codec):
+    """True if an entry with art is stored other than with codec (None = uncompressed). Binary caches answer from their index."""
+    codec = resolve_art_codec(codec)
+    indexed = isinstance(cache, binary_cache.IndexedCache)
+    for key in cache:
+        if indexed:
+            if not cache.stored_art(key): continue
+            stored = cache.peek(key).get("art_codec")
+        elif has_art(cache[key]): stored = cache[key].get("art_codec")
+        else: continue
+        if (stored or None) != codec: return True
+    return False
+
+def apply_art_compression(cache, codec):
+    """Re-encodes every entry whose storage differs from codec (None = uncompressed)."""
+    codec = resolve_art_codec(codec, warn=True)
+    pending = [k for k in cache if has_art(cache[k]) and (cache[k].get("art_codec") or None) != codec]
+    if not pending: return
+    zdict = None
+    if codec == "zstd":
+        zdict = get_zstd_dict() or train_zstd_dict([entry_art(cache[k]) for k in pending])
+    for key in pending:
+        data = cache[key]
+        art = entry_art(data)
+        new_data = {k: v for k, v in data.items() if k not in _COMPRESSED_FIELDS}
+        if codec:
+            new_data.update(ansi_art_z=compress_art(art, codec, zdict), art_codec=codec, art_size=len(art.encode("utf-8")))
+            if zdict is not None: new_data["art_dict"] = zdict.dict_id()
+        else: new_data["ansi_art"] = art
+        cache[key] = new_data
+
+def _json_default(obj):
+    if isinstance(obj, (bytes, bytearray)): import base64; return base64.b64encode(obj).decode("ascii")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+@timed_phase("load_cache")
 def load_cache(cache_file):
+    """Loads the cache with the entries of an unfinished run's journal (see CacheJournal) applied."""
+    cache = _read_cache_file(cache_file)
+    if os.path.exists(journal_path(cache_file)): replay_journal(cache, cache_file)
+    return cache
+
+def _read_cache_file(cache_file):
+    global _zstd_dict_file, _zstd_dict
+    _zstd_dict_file, _zstd_dict = zstd_dict_path(cache_file), None
+    if binary_cache.is_binary_cache(cache_file):
+        try: return binary_cache.IndexedCache(cache_file)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Error loading cache file {cache_file}: {e}", file=sys.stderr)
+            return {}
     if os.path.exists(cache_file):
+        json_lib = get_json_lib()
         mode = "rb" if json_lib.__name__ == 'orjson' else "r"
         try:
             with open(cache_file, mode) as f:
@@ -110,42 +908,442 @@ def load_cache(cache_file):
             return {}
     return {}
 
-def save_cache(cache, cache_file):
+@timed_phase("save_cache")
+def save_cache(cache, cache_file, compression="keep"):
+    """Writes the cache atomically (temporary file + os.replace). Returns False if it couldn't be saved.
+
+    compression is the codec to store the art with (None = uncompressed); "keep"
+    leaves every entry stored the way it already is.
+    """
+    global _zstd_dict_file, _zstd_dict
+    if isinstance(cache, binary_cache.IndexedCache) and not binary_cache.is_binary_cache_path(cache_file):
+        cache = dict(cache.items()) # JSON needs every entry decoded
     try:
+        if zstd_dict_path(cache_file) != _zstd_dict_file:
+            # Saving to another file (--convert-cache): entries tied to the source's zstd
+            # dictionary are decoded with it before switching to the destination's
+            if any(isinstance(d, dict) and "art_dict" in d for d in cache.values()): apply_art_compression(cache, None)
+            _zstd_dict_file, _zstd_dict = zstd_dict_path(cache_file), None
+        if compression != "keep": apply_art_compression(cache, compression)
+        if binary_cache.is_binary_cache_path(cache_file): binary_cache.write_cache(cache, cache_file); return True
         cache_dir = os.path.dirname(cache_file)
         if cache_dir and not os.path.exists(cache_dir): os.makedirs(cache_dir, exist_ok=True)
+        json_lib = get_json_lib()
         mode = "wb" if json_lib.__name__ == 'orjson' else "w"
-        with open(cache_file, mode) as f:
-            if json_lib.__name__ == 'orjson':
-                # Use OPT_INDENT_2 for pretty printing with orjson
-                f.write(json_lib.dumps(cache, option=json_lib.OPT_INDENT_2))
-            else:
-                # Standard json uses indent argument
-                json_lib.dump(cache, f, indent=2)
+        tmp_file = f"{cache_file}.tmp{os.getpid()}" # Readers never see a half-written cache
+        try:
+            with open(tmp_file, mode) as f:
+                if json_lib.__name__ == 'orjson':
+                    # Use OPT_INDENT_2 for pretty printing with orjson
+                    f.write(json_lib.dumps(cache, option=json_lib.OPT_INDENT_2, default=_json_default))
+                else:
+                    # Standard json uses indent argument
+                    json_lib.dump(cache, f, indent=2, default=_json_default)
+            os.replace(tmp_file, cache_file)
+        finally:
+            if os.path.exists(tmp_file): os.remove(tmp_file)
+        return True
     except IOError as e: print(f"Error: Could not save cache file {cache_file}: {e}", file=sys.stderr)
     except Exception as e: print(f"An unexpected error occurred while saving cache: {e}", file=sys.stderr)
+    return False
+
+# --- Cache Journal ---
+# A run that updates the cache holds an advisory lock (<cache>.lock) for its whole
+# duration, so two shells rebuilding at once take turns instead of interleaving writes.
+# Each new or changed entry is appended to <cache>.journal as one JSON line
+# ([key, entry], or [key, null] for a removal) as soon as it is converted. Every
+# CACHE_CHECKPOINT_EVERY entries (or CACHE_CHECKPOINT_SECONDS) the cache file is
+# rewritten atomically and the journal dropped. load_cache replays a journal left
+# behind by a crashed or interrupted run, so at most the image being converted is lost.
+def journal_path(cache_file): return f"{cache_file}.journal"
+def refresh_progress_path(cache_file): return f"{cache_file}.refresh"
+
+def journal_line(key, data):
+    line = get_json_lib().dumps([key, data], default=_json_default)
+    return (line if isinstance(line, bytes) else line.encode("utf-8")) + b"\n"
+
+def append_journal(cache_file, key, data):
+    """Journals cache[key] = data without taking the cache lock, for runs that only read the cache (--random).
+
+    load_cache replays it and the next run that updates the cache folds it in. A run
+    holding the lock meanwhile may drop it when it checkpoints, which only means the
+    image gets converted again later.
+    """
+    try:
+        fd = os.open(journal_path(cache_file), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try: os.write(fd, journal_line(key, data)) # One write, so concurrent appends don't interleave
+        finally: os.close(fd)
+    except OSError: pass
+
+def replay_journal(cache, cache_file):
+    """Applies the entries of <cache>.journal to cache. A last line cut short by a crash is skipped."""
+    json_lib = get_json_lib()
+    try:
+        with open(journal_path(cache_file), "rb") as f: lines = f.read().split(b"\n")
+    except OSError: return
+    for line in lines:
+        if not line: continue
+        try: key, data = json_lib.loads(line)
+        except (ValueError, TypeError): continue
+        if data is None: cache.pop(key, None)
+        else: cache[key] = data
+
+def lock_cache(cache_file, silent=False):
+    """Takes the exclusive advisory lock of cache_file, waiting for another run holding it.
+
+    Returns the open lock file (closing it releases the lock), or None where fcntl is unavailable.
+    """
+    fcntl = optional_import("fcntl")
+    if fcntl is None: return None
+    cache_dir = os.path.dirname(cache_file)
+    if cache_dir and not os.path.exists(cache_dir): os.makedirs(cache_dir, exist_ok=True)
+    lock_file = open(f"{cache_file}.lock", "a")
+    try: fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        if not silent: print(f"Waiting for another run to finish updating {cache_file}...", file=sys.stderr)
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+    return lock_file
+
+class CacheJournal:
+    """Records the cache updates of one run as they happen and checkpoints them into the cache file.
+
+    Holds the cache lock from creation until close(), so create it before loading the
+    cache. Keys converted by --refresh are also appended to <cache>.refresh, which
+    close() removes once the run completes: an interrupted --refresh picks them up
+    from there with refreshed_keys() and only converts the rest.
+    """
+
+    def __init__(self, cache_file, compression="keep", silent=False):
+        self.cache_file, self.compression, self.silent = cache_file, compression, silent
+        self.lock_file = lock_cache(cache_file, silent)
+        self.journal = self.progress = None
+        # Holding the lock, any temporary file next to the cache was left by a run that died while saving
+        cache_dir, prefix = os.path.dirname(cache_file) or ".", os.path.basename(cache_file) + ".tmp"
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix):
+                try: os.remove(os.path.join(cache_dir, name))
+                except OSError: pass
+        self.pending, self.last_checkpoint = 0, time.monotonic()
+
+    def refreshed_keys(self):
+        try:
+            with open(refresh_progress_path(self.cache_file), encoding="utf-8") as f: return set(f.read().split("\n")) - {""}
+        except OSError: return set()
+
+    def record(self, cache, key, data, refreshed=False):
+        """Sets cache[key] = data (data None removes the key) and journals it."""
+        if self.journal is None: self.journal = open(journal_path(self.cache_file), "ab")
+        self.journal.write(journal_line(key, data))
+        self.journal.flush()
+        if data is None: cache.pop(key, None)
+        else: cache[key] = data
+        if refreshed:
+            if self.progress is None: self.progress = open(refresh_progress_path(self.cache_file), "a", encoding="utf-8")
+            self.progress.write(key + "\n"); self.progress.flush()
+        self.pending += 1
+        if self.pending >= config.CACHE_CHECKPOINT_EVERY or time.monotonic() - self.last_checkpoint >= config.CACHE_CHECKPOINT_SECONDS:
+            self.checkpoint(cache)
+
+    def checkpoint(self, cache):
+        """Saves the cache and drops the journal. The journal is kept if the save fails."""
+        evicted = evict_art(cache, self.cache_file) # Even with nothing recorded: CACHE_MAX_BYTES may have been lowered
+        if evicted and not self.silent: print(f"Evicted the art of {evicted} least recently shown entries (CACHE_MAX_BYTES).")
+        # Nothing recorded, but a journal replayed by load_cache still has to be folded in,
+        # or the art is stored with another codec than the one asked for
+        if not evicted and not self.pending and not os.path.exists(journal_path(self.cache_file)) and not self.recompresses(cache): return True
+        if not save_cache(cache, self.cache_file, self.compression): return False
+        if self.journal is not None: self.journal.close(); self.journal = None
+        try: os.remove(journal_path(self.cache_file))
+        except FileNotFoundError: pass
+        self.pending, self.last_checkpoint = 0, time.monotonic()
+        return True
+
+    def recompresses(self, cache):
+        """True if saving re-encodes art stored with another codec than --compression (CACHE_COMPRESSION)."""
+        return self.compression != "keep" and art_codec_differs(cache, self.compression)
+
+    def close(self, cache, completed=True):
+        """Checkpoints what is left, forgets --refresh progress if the run completed and releases the lock."""
+        saved = self.checkpoint(cache)
+        if self.progress is not None: self.progress.close(); self.progress = None
+        if completed and saved:
+            try: os.remove(refresh_progress_path(self.cache_file))
+            except FileNotFoundError: pass
+        if self.lock_file is not None: self.lock_file.close(); self.lock_file = None
+        return saved
+
+# --- Art Budget (CACHE_MAX_BYTES) ---
+# With CACHE_MAX_BYTES set, every image shown by --random is logged to <cache>.lru,
+# and saving the cache evicts the art (ansi_art and everything derived from it) of the
+# least recently shown entries until the rest fits. Evicted entries keep their
+# metadata, so --random still picks them: it converts them again from their source
+# and puts them back.
+_ART_FIELDS = _COMPRESSED_FIELDS + ("encodings", "variants", "art_scales", "graphics", "animation")
+
+def display_log_path(cache_file): return cache_file + ".lru"
+
+def record_display(cache_file, key):
+    if not config.CACHE_MAX_BYTES: return
+    try:
+        with open(display_log_path(cache_file), "a", encoding="utf-8") as f: f.write(f"{time.time():.3f}\t{binary_cache._encode_key(key)}\n")
+    except OSError: pass
+
+def last_displayed(cache_file):
+    """Returns {key: when it was last shown} from the display log."""
+    shown = {}
+    try:
+        with open(display_log_path(cache_file), encoding="utf-8") as f:
+            for line in f:
+                stamp, _, key = line.rstrip("\n").partition("\t")
+                try: shown[binary_cache._decode_key(key)] = float(stamp)
+                except ValueError: pass
+    except OSError: pass
+    return shown
+
+def entry_has_art(cache, key):
+    """has_art(cache[key]), without decoding the entries of a binary cache."""
+    return cache.stored_art(key) if isinstance(cache, binary_cache.IndexedCache) else has_art(cache[key])
+
+def entry_stored_bytes(cache, key):
+    """Roughly what the art of an entry (with its encodings, variants, payloads and frames) takes in the cache file."""
+    if not entry_has_art(cache, key): return 0
+    if isinstance(cache, binary_cache.IndexedCache) and key not in cache._loaded: return cache.stored_size(key)
+    data = cache[key]
+    art = get_json_lib().dumps({k: data[k] for k in _ART_FIELDS if k in data}, default=_json_default)
+    return len(art)
+
+def evict_art(cache, cache_file):
+    """Evicts the art of the least recently shown entries until the art left fits in CACHE_MAX_BYTES. Returns how many were evicted."""
+    if not config.CACHE_MAX_BYTES: return 0
+    sizes = {key: entry_stored_bytes(cache, key) for key in cache}
+    total = sum(sizes.values())
+    if total <= config.CACHE_MAX_BYTES: return 0
+    shown = last_displayed(cache_file)
+    evicted = 0
+    for key in sorted((key for key, size in sizes.items() if size), key=lambda key: shown.get(key, 0)): # Never shown first
+        if total <= config.CACHE_MAX_BYTES: break
+        cache[key] = {k: v for k, v in cache[key].items() if k not in _ART_FIELDS}
+        total -= sizes[key]; evicted += 1
+    # Keep the log to one line per cached key
+    log_file = display_log_path(cache_file)
+    try:
+        with open(f"{log_file}.tmp{os.getpid()}", "w", encoding="utf-8") as f:
+            f.writelines(f"{stamp}\t{binary_cache._encode_key(key)}\n" for key, stamp in shown.items() if key in sizes)
+        os.replace(f"{log_file}.tmp{os.getpid()}", log_file)
+    except OSError: pass
+    return evicted
+
+def restore_evicted(cache_file, key, animate=False, encodings=()):
+    """Converts the source of an evicted entry again and journals it (see append_journal). Returns the entry, or None if that failed."""
+    if not os.path.isfile(key): return None
+    data = process_image(key, animate, encodings)
+    if data is not None: append_journal(cache_file, key, data)
+    return data
+
+def cache_storage_sizes(cache):
+    """Returns (stored_art_bytes, uncompressed_art_bytes) over all entries."""
+    if isinstance(cache, binary_cache.IndexedCache) and not cache._loaded: return cache.storage_sizes()
+    stored = uncompressed = 0
+    for data in cache.values():
+        if not has_art(data): continue
+        if "ansi_art_z" in data:
+            blob = data["ansi_art_z"]
+            stored += len(blob) * 3 // 4 - blob.count("=") if isinstance(blob, str) else len(blob)
+            uncompressed += data.get("art_size", 0)
+        else:
+            size = len(data["ansi_art"].encode("utf-8"))
+            stored += size; uncompressed += size
+    return stored, uncompressed
+
+def cache_encoding_sizes(cache):
+    """Returns {encoding: (entries, encoded_bytes, truecolor_bytes)} over the derived encodings and graphics payloads in the cache."""
+    sizes = {}
+    for key in cache:
+        data = cache[key]
+        if not has_art(data) or not (data.get("encodings") or data.get("graphics")): continue
+        truecolor = data["art_size"] if "ansi_art_z" in data else len(data["ansi_art"].encode("utf-8"))
+        arts = list(data.get("encodings", {}).items()) + [(name, payload["data"]) for name, payload in data.get("graphics", {}).items()]
+        for name, art in arts:
+            count, size, base = sizes.get(name, (0, 0, 0))
+            sizes[name] = (count + 1, size + len(art.encode("utf-8")), base + truecolor)
+    return sizes
+
+def cache_variant_sizes(cache):
+    """Returns {scale: (entries, art_bytes)} over the cached scaled variants."""
+    sizes = {}
+    for key in cache:
+        data = cache[key]
+        if not has_art(data): continue
+        for variant in data.get("variants", ()):
+            count, size = sizes.get(variant["scale"], (0, 0))
+            sizes[variant["scale"]] = (count + 1, size + len(variant["ansi_art"].encode("utf-8")))
+    return sizes
+
+def cache_source_counts(cache):
+    """Returns (entries with a source hash, distinct source hashes) over all entries."""
+    hashes = []
+    for key in cache:
+        source = cache[key].get("source") if isinstance(cache[key], dict) else None
+        if isinstance(source, dict) and source.get("sha256"): hashes.append(source["sha256"])
+    return len(hashes), len(set(hashes))
+
+def cache_category_index(cache):
+    """Returns {category: [(key, num_lines), ...]}. Reads only the index for binary caches."""
+    if isinstance(cache, binary_cache.IndexedCache): return cache.category_index()
+    categories = {}
+    for key, data in cache.items():
+        if isinstance(data, dict) and "category" in data:
+            categories.setdefault(data["category"], []).append((key, data.get("num_lines")))
+        else: categories.setdefault("invalid", []).append((key, None))
+    return categories
+
+def category_for_lines(num_lines):
+    if num_lines < config.SMALL_THRESHOLD: return "small"
+    elif num_lines < config.MEDIUM_THRESHOLD: return "medium"
+    elif num_lines < config.LARGE_THRESHOLD: return "large"
+    else: return "extra-large"
 
 def classify_image(ansi_art):
     lines = ansi_art.strip('\n').split("\n")
     num_lines = len(lines)
-    if num_lines < config.SMALL_THRESHOLD: category = "small"
-    elif num_lines < config.MEDIUM_THRESHOLD: category = "medium"
-    elif num_lines < config.LARGE_THRESHOLD: category = "large"
-    else: category = "extra-large"
-    return category, num_lines
-
-def process_image(file_path):
-    try: img = Image.open(file_path)
+    return category_for_lines(num_lines), num_lines
+
+# --- Cache Invalidation ---
+# Bump whenever image_to_ansi/process_image output changes so stale entries get reconverted.
+# Category thresholds are deliberately not part of this: entries are recategorized from num_lines.
+CONVERTER_VERSION = 1
+
+def hash_file(file_path, chunk_size=1 << 20):
+    import hashlib
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""): digest.update(chunk)
+    return digest.hexdigest()
+
+def file_signature(file_path):
+    st = os.stat(file_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": hash_file(file_path)}
+
+@timed_phase("validate")
+def source_unchanged(data, file_path):
+    """Checks a cache entry's source signature against its image.
+
+    Returns (unchanged, updated). A touched image with the same content (or an entry
+    from before signatures existed) is unchanged, and its stat info is refreshed in
+    place (updated).
+    """
+    try: st = os.stat(file_path)
+    except OSError: return False, False
+    source = data.get("source")
+    if isinstance(source, dict) and source.get("mtime_ns") == st.st_mtime_ns and source.get("size") == st.st_size: return True, False
+    if isinstance(source, dict) and source.get("size") != st.st_size: return False, False
+    try: digest = hash_file(file_path)
+    except OSError: return False, False
+    if isinstance(source, dict) and source.get("sha256") != digest: return False, False
+    data["source"] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+    data["converter_version"] = CONVERTER_VERSION
+    return True, True
+
+def evicted_up_to_date(data, file_path):
+    """Like source_unchanged, for an entry whose art was evicted (CACHE_MAX_BYTES).
+
+    A directory run skips these instead of converting them again only to evict them
+    once more when it saves. --random restores them when it picks them.
+    """
+    if not (is_evicted(data) and isinstance(data.get("source"), dict)): return False, False
+    if data.get("converter_version", CONVERTER_VERSION) != CONVERTER_VERSION: return False, False
+    return source_unchanged(data, file_path)
+
+def validate_cache_entry(data, file_path, need_animation=False, encodings=()):
+    """Checks a cache entry against its source file.
+
+    Returns (entry, updated). entry is None when the image has to be reconverted.
+    updated is True when the entry was fixed up in place (refreshed stat info after
+    a touch, backfilled signature on a pre-versioning entry, or a new category after
+    a threshold change) and the cache needs saving. With need_animation, animated
+    images cached without their frames count as stale. Missing encodings and
+    scaled variants are derived from the cached art.
+    """
+    if not (has_art(data) and "category" in data): return None, False
+    if need_animation and "animation" not in data and data.get("n_frames") != 1: return None, False
+    if data.get("converter_version", CONVERTER_VERSION) != CONVERTER_VERSION: return None, False
+    unchanged, updated = source_unchanged(data, file_path)
+    if not unchanged: return None, False
+
+    if data["category"] != "empty":
+        num_lines = data.get("num_lines")
+        if not isinstance(num_lines, int): category, num_lines = classify_image(entry_art(data))
+        else: category = category_for_lines(num_lines)
+        if category != data["category"] or num_lines != data.get("num_lines"):
+            data["category"], data["num_lines"] = category, num_lines
+            updated = True
+        if "art_width" not in data:
+            art_width = art_layout(entry_art(data))
+            if art_width is not None: data["art_width"] = art_width; updated = True
+        if update_art_variants(data): updated = True
+        if encodings and add_entry_encodings(data, encodings): updated = True
+    return data, updated
+
+# --- Content Addressing ---
+# Entries are looked up by path first. An image that misses (moved or copied
+# collection, --rsc-dir pointed at a copy, byte-identical duplicate) is looked up by
+# the SHA-256 of its content among the entries already cached, and reuses their art.
+class SourceIndex:
+    """Cached entries by the SHA-256 of their source image, built on the first lookup.
+
+    retired holds entries already removed from the cache (e.g. dropped because their
+    path is gone), so a collection that moved can still be matched against them.
+    Entries converted during the run are add()ed, so duplicates among them are
+    converted once.
+    """
+
+    def __init__(self, cache=None, retired=()):
+        # Without a cache (--refresh) only entries passed to add() are matched
+        self.cache, self.retired, self.by_hash = cache, list(retired), ({} if cache is None else None)
+
+    def add(self, data):
+        source = data.get("source") if isinstance(data, dict) else None
+        if self.by_hash is not None and isinstance(source, dict) and source.get("sha256") and has_art(data):
+            self.by_hash.setdefault(source["sha256"], data)
+
+    def lookup(self, file_path, need_animation=False, encodings=()):
+        """Returns (entry, signature) for file_path. entry is a copy of a cached entry with the same
+        content, brought up to date for file_path, or None if there is none (signature then saves rehashing)."""
+        if self.by_hash is None:
+            self.by_hash = {}
+            for data in self.retired: self.add(data)
+            for key in self.cache: self.add(self.cache[key])
+        try: source = file_signature(file_path)
+        except OSError: return None, None
+        data = self.by_hash.get(source["sha256"])
+        if data is None: return None, source
+        data, _ = validate_cache_entry(dict(data, source=source), file_path, need_animation, encodings)
+        return data, source
+
+@timed_phase("convert")
+def process_image(file_path, animate=False, encodings=()):
+    from PIL import Image
+    try: source, img = file_signature(file_path), Image.open(file_path)
     except FileNotFoundError: print(f"Error: Image file not found: {file_path}", file=sys.stderr); return None
     except Exception as e: print(f"Error opening image {file_path}: {e}", file=sys.stderr); return None
     try:
-        if getattr(img, "is_animated", False) and img.n_frames > 1:
+        n_frames = getattr(img, "n_frames", 1) if getattr(img, "is_animated", False) else 1
+        if n_frames > 1:
             random_frame = random.randint(0, img.n_frames - 1)
             img.seek(random_frame); img.load()
         ansi_art = image_to_ansi(img)
         if not ansi_art or ansi_art.isspace(): category, num_lines = "empty", 0
         else: category, num_lines = classify_image(ansi_art)
-        return {"ansi_art": ansi_art, "category": category, "num_lines": num_lines}
+        data = {"ansi_art": ansi_art, "category": category, "num_lines": num_lines, "n_frames": n_frames,
+                "source": source, "converter_version": CONVERTER_VERSION}
+        art_width = art_layout(ansi_art)
+        if art_width is not None: data["art_width"] = art_width
+        if category != "empty":
+            frame = img.convert("RGBA")
+            update_art_variants(data, frame)
+            if encodings: add_entry_encodings(data, encodings, image_cell_keys(crop_transparent_borders(frame)))
+        if animate and n_frames > 1: data["animation"] = build_animation(img)
+        return data
     except Exception as e:
         frame_info = ""
         try: frame_info = f" (frame {img.tell()})" if getattr(img, "is_animated", False) else ""
@@ -153,29 +1351,58 @@ def process_image(file_path):
         print(f"Error processing image {file_path}{frame_info}: {e}", file=sys.stderr); return None
     finally: img.close()
 
+def process_images_parallel(file_paths, jobs, silent=False, animate=False, encodings=()):
+    """Runs process_image over file_paths in a process pool.
+
+    Results are yielded as (file_path, data) in completion order so the caller
+    can merge them into the cache as they arrive. data is None on failure.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(process_image, path, animate, encodings): path for path in file_paths}
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try: data = future.result()
+            except Exception as e:
+                print(f"Error processing image {file_path} in worker: {e}", file=sys.stderr); data = None
+            if not silent: print(f"Processing: {os.path.basename(file_path)}")
+            yield file_path, data
+
 # --- System Information Fetching (Python API Methods) ---
 
 def format_error(msg): return f"{config.SYS_INFO_ERROR_COLOR}{msg}{config.RESET_COLOR}"
 def format_warn(msg): return f"{config.SYS_INFO_WARN_COLOR}{msg}{config.RESET_COLOR}"
 
 # --- Still needed for specific fallback commands ---
+_fetch_deadlines = {} # Fetcher thread id -> time.monotonic() by which its fetch must be done, see run_fetcher
+
 def fetch_shell_command(command):
     """Executes a single shell command using subprocess."""
+    import subprocess
     if not command: return format_error("No command provided")
+    import threading
+    timeout = config.SYS_INFO_COMMAND_TIMEOUT
+    deadline = _fetch_deadlines.get(threading.get_ident())
+    if deadline is not None: timeout = min(timeout, max(0.01, deadline - time.monotonic()))
+    start, status = time.perf_counter(), "error"
     try:
         result = subprocess.run(
             command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            text=True, check=True, timeout=10
+            text=True, check=True, timeout=timeout
         )
+        status = "ok"
         return result.stdout.strip()
     except FileNotFoundError: return format_error(f"Cmd not found: {command.split()[0]}")
     except subprocess.CalledProcessError as e:
         err = e.stderr.strip() or f"Exit {e.returncode}"; return format_error(f"Cmd Err: {err[:50]}")
-    except subprocess.TimeoutExpired: return format_error("Timeout")
+    except subprocess.TimeoutExpired: status = "timeout"; return format_error("Timeout")
     except Exception as e: return format_error(f"Subprocess Error: {e}")
+    finally:
+        if _timings is not None: _timings["commands"].append({"command": command, "seconds": time.perf_counter() - start, "status": status})
 
 # --- Python API Fetchers ---
 def get_user_host():
+    import getpass, socket
     try: user = getpass.getuser()
     except Exception: user = "N/A"
     try: host = socket.gethostname()
@@ -183,6 +1410,7 @@ def get_user_host():
     return f"{user}@{host}"
 
 def get_os():
+    import platform
     if sys.platform == "darwin":
         try:
             name = platform.mac_ver()[0] or "macOS"
@@ -206,32 +1434,36 @@ def get_os():
     except Exception: return format_error("OS Unknown")
 
 def get_kernel():
+    import platform
     try: return platform.release()
     except Exception: return format_error("Kernel Unknown")
 
+def format_uptime(elapsed_seconds):
+    import datetime
+    td = datetime.timedelta(seconds=elapsed_seconds)
+    days, remainder = divmod(td.seconds, 86400)
+    hours, remainder = divmod(remainder, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    parts = []
+    if td.days > 0: parts.append(f"{td.days} days")
+    if hours > 0: parts.append(f"{hours} hours")
+    if minutes > 0: parts.append(f"{minutes} minutes")
+    if not parts and seconds > 0: parts.append(f"{seconds} seconds") # Show seconds if uptime is very short
+    return ", ".join(parts) if parts else "Just booted"
+
 def get_uptime():
-    if PSUTIL_AVAILABLE:
-        try:
-            boot_time_timestamp = psutil.boot_time()
-            elapsed_seconds = time.time() - boot_time_timestamp
-            # Format timedelta nicely
-            td = datetime.timedelta(seconds=elapsed_seconds)
-            days, remainder = divmod(td.seconds, 86400)
-            hours, remainder = divmod(remainder, 3600)
-            minutes, seconds = divmod(remainder, 60)
-            parts = []
-            if td.days > 0: parts.append(f"{td.days} days")
-            if hours > 0: parts.append(f"{hours} hours")
-            if minutes > 0: parts.append(f"{minutes} minutes")
-            if not parts and seconds > 0: parts.append(f"{seconds} seconds") # Show seconds if uptime is very short
-            return ", ".join(parts) if parts else "Just booted"
+    psutil = optional_import("psutil")
+    if psutil is not None:
+        try: return format_uptime(time.time() - psutil.boot_time())
         except Exception as e: return format_error(f"psutil Uptime Error: {e}")
-    else: # Fallback using uptime command (less precise formatting)
-        return fetch_shell_command("uptime -p | sed 's/^up //'") # Keep simple fallback
+    uptime = linux_uptime()
+    if uptime is not None: return format_uptime(uptime)
+    return fetch_shell_command("uptime -p | sed 's/^up //'") # Last resort, less precise formatting
 
 def get_shell():
     try:
         shell_path = os.environ.get('SHELL', '')
+        from pathlib import Path
         if shell_path: return Path(shell_path).name
         else: return "N/A"
     except Exception: return "N/A"
@@ -261,7 +1493,8 @@ def get_cpu():
     # Use psutil for counts and frequency (more reliable cross-platform)
     cores_logical = "N/A"
     freq_current = "N/A"
-    if PSUTIL_AVAILABLE:
+    psutil = optional_import("psutil")
+    if psutil is not None:
         try: cores_logical = psutil.cpu_count(logical=True)
         except Exception: pass
         try:
@@ -278,24 +1511,25 @@ def get_cpu():
 
     return " ".join(p for p in display_parts if p != "N/A")
 
+def format_bytes(b):
+    """Formats a byte count using powers of 1024."""
+    if b < 1024: return f"{b} B"
+    elif b < 1024**2: return f"{b/1024:.1f} KiB"
+    elif b < 1024**3: return f"{b/1024**2:.1f} MiB"
+    else: return f"{b/1024**3:.1f} GiB"
+
 def get_memory():
-    if PSUTIL_AVAILABLE:
+    psutil = optional_import("psutil")
+    if psutil is not None:
         try:
             mem = psutil.virtual_memory()
-            # Format bytes nicely using powers of 1024
-            def format_bytes(b):
-                if b < 1024: return f"{b} B"
-                elif b < 1024**2: return f"{b/1024:.1f} KiB"
-                elif b < 1024**3: return f"{b/1024**2:.1f} MiB"
-                else: return f"{b/1024**3:.1f} GiB"
-
-            used = format_bytes(mem.used)
-            total = format_bytes(mem.total)
-            percent = mem.percent
-            return f"{used} / {total} ({percent:.0f}%)" # Show percentage too
+            return f"{format_bytes(mem.used)} / {format_bytes(mem.total)} ({mem.percent:.0f}%)" # Show percentage too
         except Exception as e: return format_error(f"psutil Memory Error: {e}")
-    else: # Basic fallback (less informative)
-        return format_warn("N/A (psutil req.)")
+    memory = linux_memory()
+    if memory is not None:
+        used, total = memory
+        return f"{format_bytes(used)} / {format_bytes(total)} ({used / total * 100:.0f}%)"
+    return format_warn("N/A (psutil req.)")
 
 def get_color_palette():
     lines = []
@@ -303,6 +1537,153 @@ def get_color_palette():
     line2 = " " + "".join(f"\033[10{i}m  " for i in range(8)) + "\033[0m"
     return f"{line1}\n{line2}" # Return as single string with newline
 
+# --- Native Linux Fetchers ---
+# Read /proc, /sys and package databases instead of forking a shell. Each returns None
+# when it can't answer (not Linux, file missing, unknown database format), and the
+# caller then falls back to its FALLBACK_COMMANDS entry. Paths are resolved under root
+# (default SYS_ROOT in config.py), so they can be pointed at a fake /proc and /sys tree.
+def root_path(root, path):
+    """path (absolute, ~ expanded) inside root."""
+    return os.path.join(root if root is not None else config.SYS_ROOT, os.path.expanduser(path).lstrip("/"))
+
+def read_text(path):
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f: return f.read()
+    except OSError: return None
+
+def linux_uptime(root=None):
+    """Seconds since boot, from /proc/uptime."""
+    text = read_text(root_path(root, "/proc/uptime"))
+    try: return float(text.split()[0]) if text else None
+    except (ValueError, IndexError): return None
+
+def linux_memory(root=None):
+    """(used, total) bytes from /proc/meminfo, used being total - available like psutil."""
+    text = read_text(root_path(root, "/proc/meminfo"))
+    if not text: return None
+    fields = {}
+    for line in text.splitlines():
+        name, _, rest = line.partition(":")
+        try: fields[name] = int(rest.split()[0]) * 1024 # Values are in kB
+        except (ValueError, IndexError): pass
+    total = fields.get("MemTotal")
+    if not total: return None
+    available = fields.get("MemAvailable", fields.get("MemFree", 0) + fields.get("Buffers", 0) + fields.get("Cached", 0))
+    return total - available, total
+
+def pci_names(vendor, device, root=None):
+    """(vendor name, device name) of a PCI id from pci.ids; None for unknown parts.
+
+    PCI_IDS_FILES are searched in order until one knows the device (an older copy
+    may lack a new GPU that a later one has).
+    """
+    import re
+    found_vendor = None
+    for path in config.PCI_IDS_FILES:
+        try:
+            with open(root_path(root, path), "rb") as f: data = b"\n" + f.read() # Vendor lines are found by their leading newline
+        except OSError: continue
+        start = data.find(f"\n{vendor}  ".encode())
+        if start < 0: continue
+        line_end = data.find(b"\n", start + 1)
+        vendor_name = data[start + len(vendor) + 3:line_end].decode("utf-8", "replace")
+        found_vendor = found_vendor or vendor_name
+        next_vendor = re.compile(rb"\n[^\t#]").search(data, line_end) # Device lines are indented
+        block_end = next_vendor.start() if next_vendor else len(data)
+        start = data.find(f"\n\t{device}  ".encode(), line_end, block_end)
+        if start < 0: continue
+        return vendor_name, data[start + len(device) + 4:data.find(b"\n", start + 1)].decode("utf-8", "replace")
+    return found_vendor, None
+
+def linux_gpu(root=None):
+    """First display controller (PCI class 0x03) in /sys/bus/pci/devices, named from pci.ids like lspci does."""
+    devices_dir = root_path(root, "/sys/bus/pci/devices")
+    try: devices = sorted(os.listdir(devices_dir))
+    except OSError: return None
+    for name in devices:
+        device_dir = os.path.join(devices_dir, name)
+        pci_class = read_text(os.path.join(device_dir, "class"))
+        if not pci_class or not pci_class.strip().startswith("0x03"): continue
+        vendor, device = ((read_text(os.path.join(device_dir, f)) or "").strip().removeprefix("0x") for f in ("vendor", "device"))
+        vendor_name, device_name = pci_names(vendor, device, root)
+        return f"{vendor_name or f'Vendor {vendor}'} {device_name or f'Device {device}'}"
+    return "N/A" if devices else None
+
+def linux_resolution(root=None):
+    """Preferred mode of every connected output in /sys/class/drm, e.g. "2560x1440, 1920x1080"."""
+    drm_dir = root_path(root, "/sys/class/drm")
+    try: connectors = sorted(name for name in os.listdir(drm_dir) if name.startswith("card") and "-" in name)
+    except OSError: return None
+    modes = []
+    for name in connectors:
+        if (read_text(os.path.join(drm_dir, name, "status")) or "").strip() != "connected": continue
+        mode = (read_text(os.path.join(drm_dir, name, "modes")) or "").split("\n")[0].strip()
+        if mode: modes.append(mode)
+    return ", ".join(modes) or None # Nothing connected (e.g. only the X server knows): let xrandr try
+
+def linux_packages(root=None):
+    """Installed package counts, e.g. "apt (1893), flatpak (12)", or None if a database can't be read natively."""
+    counts = []
+    dpkg = root_path(root, "/var/lib/dpkg/status")
+    rpm_dir = root_path(root, "/var/lib/rpm")
+    if os.path.isfile(dpkg):
+        try:
+            with open(dpkg, "rb") as f: counts.append(("apt", f.read().count(b"\nStatus: install ok installed")))
+        except OSError: return None
+    elif os.path.isdir(rpm_dir):
+        rpmdb = os.path.join(rpm_dir, "rpmdb.sqlite")
+        if not os.path.isfile(rpmdb): return None # Berkeley DB or NDB: only rpm reads those
+        import sqlite3
+        try:
+            with sqlite3.connect(f"file:{rpmdb}?mode=ro", uri=True) as db: counts.append(("rpm", db.execute("SELECT COUNT(*) FROM Packages").fetchone()[0]))
+        except sqlite3.Error: return None
+    try: snaps = {name.partition("_")[0] for name in os.listdir(root_path(root, "/var/lib/snapd/snaps")) if name.endswith(".snap")}
+    except OSError: snaps = set()
+    counts.append(("snap", len(snaps)))
+    flatpaks = set()
+    for apps_dir in ("/var/lib/flatpak/app", "~/.local/share/flatpak/app"): # System and user installations
+        try: flatpaks.update(os.listdir(root_path(root, apps_dir)))
+        except OSError: pass
+    counts.append(("flatpak", len(flatpaks)))
+    return ", ".join(f"{name} ({count})" for name, count in counts if count > 0) or "N/A"
+
+def desktop_settings(root=None):
+    """(GTK settings.ini [Settings], kdeglobals) as dicts of section -> {key: value}; empty where missing."""
+    import configparser
+    found = []
+    for paths in (("~/.config/gtk-4.0/settings.ini", "~/.config/gtk-3.0/settings.ini"), ("~/.config/kdeglobals",)):
+        parser = configparser.ConfigParser(interpolation=None, strict=False)
+        parser.optionxform = str
+        try: parser.read([root_path(root, path) for path in paths], encoding="utf-8")
+        except configparser.Error: pass
+        found.append({section: dict(parser[section]) for section in parser.sections()})
+    return found
+
+def linux_theme(root=None):
+    gtk, kde = desktop_settings(root)
+    themes = [f"{name}: {value}" for name, value in (("GTK", gtk.get("Settings", {}).get("gtk-theme-name")),
+                                                     ("Plasma", kde.get("KDE", {}).get("LookAndFeelPackage"))) if value]
+    return ", ".join(themes) or None
+
+def linux_icons(root=None):
+    gtk, kde = desktop_settings(root)
+    return gtk.get("Settings", {}).get("gtk-icon-theme-name") or kde.get("Icons", {}).get("Theme") or None
+
+def fallback_value(label):
+    """Runs the FALLBACK_COMMANDS entry of label."""
+    command = config.FALLBACK_COMMANDS.get(label)
+    return fetch_shell_command(command) if command else format_error(f"No cmd for {label}")
+
+def native_or_fallback(label, fetcher):
+    """A fetcher for label trying fetcher (one of the above, on Linux) before the fallback command."""
+    def fetch():
+        value = fetcher() if sys.platform.startswith("linux") else None
+        return value if value is not None else fallback_value(label)
+    return fetch
+
+def get_wm():
+    return os.environ.get("XDG_CURRENT_DESKTOP") or os.environ.get("DESKTOP_SESSION") or fallback_value("WM")
+
 # --- System Info Orchestrator ---
 # Map labels from config to Python functions or fallback keys
 INFO_FETCHER_MAP = {
@@ -315,32 +1696,337 @@ INFO_FETCHER_MAP = {
     "CPU": get_cpu,
     "Memory": get_memory,
     "Color Palette": get_color_palette,
+    "WM": get_wm,
+    # --- Native where possible, fallback commands otherwise ---
+    "Packages": native_or_fallback("Packages", linux_packages),
+    "Resolution": native_or_fallback("Resolution", linux_resolution),
+    "Theme": native_or_fallback("Theme", linux_theme),
+    "Icons": native_or_fallback("Icons", linux_icons),
+    "GPU": native_or_fallback("GPU", linux_gpu),
     # --- Labels using fallback commands ---
-    "Packages": "Packages",
-    "Resolution": "Resolution",
-    "WM": "WM",
-    "Theme": "Theme",
-    "Icons": "Icons",
     "Terminal Font": "Terminal Font",
-    "GPU": "GPU",
 }
 
+def fetch_info_value(label):
+    """Runs the fetcher mapped to label, recording its latency for --timings."""
+    if _timings is None: return _fetch_info_value(label)
+    start = time.perf_counter()
+    value = _fetch_info_value(label)
+    _timings["fetchers"][label] = {"seconds": time.perf_counter() - start, "timeout": format_warn("Timeout") == value or format_error("Timeout") == value}
+    return value
+
+def _fetch_info_value(label):
+    """Runs the fetcher mapped to label: a Python function or a fallback shell command."""
+    fetcher = INFO_FETCHER_MAP.get(label)
+    if callable(fetcher): # Is it a Python function?
+        try: return fetcher()
+        except Exception as e: return format_error(f"Func Error: {e}")
+    elif isinstance(fetcher, str): return fallback_value(fetcher) # Is it a key for fallback command?
+    else: # No fetcher found
+        return format_error(f"No fetcher for {label}")
+
+def fetch_system_info_values(labels, deadline=None):
+    """Runs the fetchers for labels concurrently and returns {label: value}.
+
+    The slowest field sets the wall time instead of the sum of all of them.
+    Shell fallbacks are killed at the deadline (seconds, default
+    config.SYS_INFO_DEADLINE); anything unfinished by then shows as a timeout.
+    """
+    from concurrent.futures import wait
+    if deadline is None: deadline = config.SYS_INFO_DEADLINE
+    pool, futures = submit_fetchers(labels, deadline)
+    try:
+        wait(futures.values(), timeout=deadline)
+        record_fetch_timeouts(futures, deadline)
+        return {label: future.result() if future.done() else format_warn("Timeout") for label, future in futures.items()}
+    finally: finish_fetchers(pool)
+
+def submit_fetchers(labels, deadline):
+    """Starts the fetchers for labels in a thread pool, shell fallbacks being killed after deadline seconds. Returns (pool, {label: future})."""
+    from concurrent.futures import ThreadPoolExecutor
+    deadline = time.monotonic() + deadline
+    pool = ThreadPoolExecutor(max_workers=max(1, len(labels)))
+    return pool, {label: pool.submit(run_fetcher, label, deadline) for label in labels}
+
+def run_fetcher(label, deadline):
+    """fetch_info_value in a fetcher thread, its shell fallbacks killed at deadline (time.monotonic()).
+
+    The deadline is kept per thread: the --serve daemon runs fetches for its
+    refresh thread and its request threads at the same time.
+    """
+    import threading
+    _fetch_deadlines[threading.get_ident()] = deadline
+    try: return fetch_info_value(label)
+    finally: _fetch_deadlines.pop(threading.get_ident(), None)
+
+def record_fetch_timeouts(futures, deadline):
+    if _timings is None: return # Fetchers still running never record themselves
+    for label, future in futures.items():
+        if not future.done(): _timings["fetchers"][label] = {"seconds": deadline, "timeout": True}
+
+def finish_fetchers(pool):
+    pool.shutdown(wait=False, cancel_futures=True)
+
+# --- Persistent Sysinfo Cache ---
+# Fields with a TTL in config.SYS_INFO_TTL are served from config.SYS_INFO_CACHE_FILE.
+# Expired fields are served stale while a detached `rw_fetch.py --refresh-sysinfo`
+# refetches them; fields without a TTL (Uptime, Memory, ...) are always fetched live.
+def load_sysinfo_cache(cache_file):
+    try:
+        with open(cache_file, "rb") as f: data = get_json_lib().loads(f.read())
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError): return {}
+
+def save_sysinfo_cache(entries, cache_file):
+    tmp_file = f"{cache_file}.tmp{os.getpid()}"
+    try:
+        os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+        with open(tmp_file, "wb") as f:
+            data = get_json_lib().dumps(entries)
+            f.write(data if isinstance(data, bytes) else data.encode("utf-8"))
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        print(f"Warning: Could not save sysinfo cache {cache_file}: {e}", file=sys.stderr)
+        try: os.remove(tmp_file)
+        except OSError: pass
+
+def is_cacheable_value(value):
+    value = str(value)
+    return not (value.startswith(config.SYS_INFO_ERROR_COLOR) or value.startswith(config.SYS_INFO_WARN_COLOR))
+
+def refresh_sysinfo_cache(labels=None):
+    """Refetches the TTL'd fields (those in SYSTEM_INFO_ORDER by default) and stores them. Used by --refresh-sysinfo."""
+    cache_file = config.SYS_INFO_CACHE_FILE
+    if labels is None:
+        labels = [item["label"] for item in config.SYSTEM_INFO_ORDER
+                  if isinstance(item, dict) and item.get("label") in config.SYS_INFO_TTL]
+    entries = load_sysinfo_cache(cache_file)
+    now = time.time()
+    for label, value in fetch_system_info_values(labels).items():
+        if is_cacheable_value(value): entries[label] = {"value": value, "time": now}
+    save_sysinfo_cache(entries, cache_file)
+    try: os.remove(cache_file + ".lock")
+    except OSError: pass
+
+def spawn_sysinfo_refresh():
+    """Starts a detached --refresh-sysinfo unless one started in the last minute is still running."""
+    spawn_background(["--refresh-sysinfo"], config.SYS_INFO_CACHE_FILE + ".lock")
+
+def spawn_background(args, lock_file, env=None, cwd=None):
+    """Starts a detached rw_fetch.py with args unless lock_file (removed by that process when done) is less than a minute old."""
+    try:
+        if time.time() - os.path.getmtime(lock_file) < 60: return
+        os.remove(lock_file)
+    except OSError: pass
+    try: os.close(os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except OSError: return # Another shell won the race
+    import subprocess
+    try:
+        subprocess.Popen([sys.executable, os.path.abspath(__file__)] + args,
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         start_new_session=True, close_fds=True, env=env, cwd=cwd)
+    except OSError:
+        try: os.remove(lock_file)
+        except OSError: pass
+
+def get_system_info_values(labels):
+    """Like fetch_system_info_values, but serves TTL'd fields from the sysinfo cache."""
+    if not config.SYS_INFO_CACHE_FILE: return fetch_system_info_values(labels)
+    values, live, stale = cached_system_info_values(labels)
+    if live: values.update(fetch_system_info_values_shared(live))
+    store_system_info_values(values, live)
+    if stale: spawn_sysinfo_refresh()
+    return values
+
+def cached_system_info_values(labels):
+    """Returns ({label: value} served from the sysinfo cache, [labels to fetch live], whether any served value is stale)."""
+    entries = load_sysinfo_cache(config.SYS_INFO_CACHE_FILE) if config.SYS_INFO_CACHE_FILE else {}
+    now = time.time()
+    values, live, stale = {}, [], False
+    for label in labels:
+        ttl = config.SYS_INFO_TTL.get(label)
+        entry = entries.get(label) if ttl is not None else None
+        if isinstance(entry, dict) and "value" in entry:
+            values[label] = entry["value"]
+            if _timings is not None: _timings["fetchers"][label] = {"cached": True, "age": now - entry.get("time", 0)}
+            if now - entry.get("time", 0) > ttl: stale = True
+        else: live.append(label)
+    return values, live, stale
+
+def store_system_info_values(values, live):
+    """First sight of a TTL'd field: keeps what was just fetched for it (live labels missing from values are skipped)."""
+    cache_file = config.SYS_INFO_CACHE_FILE
+    now = time.time()
+    new_entries = {label: {"value": values[label], "time": now} for label in live
+                   if label in config.SYS_INFO_TTL and label in values and is_cacheable_value(values[label])}
+    if not cache_file or not new_entries: return
+    entries = load_sysinfo_cache(cache_file)
+    entries.update(new_entries)
+    save_sysinfo_cache(entries, cache_file)
+
+# --- Single-flight (concurrent launches) ---
+# A burst of launches (a tmux session opening a dozen panes) would have every process
+# fetch the same system info and decode the same cache. With single_flight, the first
+# process does the work while holding a lock file, and leaves the result in
+# SINGLE_FLIGHT_DIR if others asked for it meanwhile. They reuse it while it is younger
+# than SINGLE_FLIGHT_TTL seconds. A lone launch writes nothing. If anything goes wrong,
+# a process does the work itself.
+def single_flight_path(name):
+    return os.path.join(config.SINGLE_FLIGHT_DIR, f"rw_fetch-{os.getuid()}-{name}" if hasattr(os, "getuid") else f"rw_fetch-{name}")
+
+def owned(path):
+    """True if path belongs to this user, False if to someone else (planted in a shared /tmp), None if it doesn't exist."""
+    try: st = os.stat(path)
+    except OSError: return None
+    return not hasattr(os, "getuid") or st.st_uid == os.getuid()
+
+def fresh_result(path):
+    """Whether path was written by this user less than SINGLE_FLIGHT_TTL seconds ago."""
+    try: st = os.stat(path)
+    except OSError: return False
+    if hasattr(os, "getuid") and st.st_uid != os.getuid(): return False # Planted by someone else in a shared /tmp
+    return time.time() - st.st_mtime < config.SINGLE_FLIGHT_TTL
+
+def lock_holder_alive(lock_file):
+    """Whether the pid in lock_file is a running process of this user."""
+    try:
+        with open(lock_file) as f: pid = int(f.read() or 0)
+    except (OSError, ValueError): return True # Gone (checked again by the caller)
+    if not pid: # Not written yet, unless its holder died right after creating it
+        try: return time.time() - os.path.getmtime(lock_file) < config.SINGLE_FLIGHT_WAIT
+        except OSError: return True
+    try: os.kill(pid, 0)
+    except OSError: return False # No such process, or not ours (PermissionError): it can't be holding our lock
+    return True
+
+def single_flight(result_file, compute, read, write):
+    """Returns read(result_file) if a concurrent process produced it, else compute().
+
+    The process that gets the lock computes the value. Only if others are waiting
+    for it (they create <result_file>.wanted) does it publish it with
+    write(value, result_file), which must replace the file atomically. read
+    returns None for a result it can't use. The others poll for the result while
+    the lock holder is alive, for at most SINGLE_FLIGHT_WAIT seconds.
+    """
+    if not config.SINGLE_FLIGHT_TTL: return compute()
+    lock_file, wanted_file = result_file + ".lock", result_file + ".wanted"
+    start, wanted = time.monotonic(), False
+    while True:
+        if fresh_result(result_file):
+            record_phase("single_flight_wait", time.monotonic() - start)
+            value = read(result_file)
+            return compute() if value is None else value
+        try: fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+        except FileExistsError:
+            lock_owned = owned(lock_file)
+            if lock_owned is None: continue # Released meanwhile
+            if not lock_owned: return compute() # Someone else's file: never wait on it
+            if not lock_holder_alive(lock_file):
+                try: os.remove(lock_file) # Its holder died before publishing
+                except OSError: pass
+                continue
+            if time.monotonic() - start > config.SINGLE_FLIGHT_WAIT: return compute()
+            if not wanted:
+                try: os.close(os.open(wanted_file, os.O_CREAT | os.O_WRONLY, 0o600)); wanted = True
+                except OSError: return compute()
+                if not owned(wanted_file): return compute() # Someone else's: the holder won't publish for it
+            time.sleep(0.005)
+            continue
+        except OSError: return compute() # No usable SINGLE_FLIGHT_DIR
+        break
+    try:
+        os.write(fd, str(os.getpid()).encode("ascii")); os.close(fd)
+        value = compute()
+        if owned(wanted_file):
+            try: write(value, result_file)
+            except (OSError, ValueError): pass # The others compute it themselves
+            try: os.remove(wanted_file)
+            except OSError: pass
+        return value
+    finally:
+        try: os.remove(lock_file)
+        except OSError: pass
+
+def name_hash(*parts):
+    """64-bit FNV-1a of parts as 16 hex digits (hashlib and zlib are kept off the --random path)."""
+    value = 0xcbf29ce484222325
+    for byte in "\0".join(map(str, parts)).encode("utf-8"): value = ((value ^ byte) * 0x100000001b3) & 0xFFFFFFFFFFFFFFFF
+    return f"{value:016x}"
+
+def fetch_system_info_values_shared(labels):
+    """fetch_system_info_values, done once per burst of launches. SINGLE_FLIGHT_LOCAL_FIELDS are always fetched here."""
+    local = [label for label in labels if label in config.SINGLE_FLIGHT_LOCAL_FIELDS]
+    shared = [label for label in labels if label not in local]
+    values = {}
+    if shared:
+        result_file = single_flight_path(f"sysinfo-{name_hash(*shared)}.json")
+        values = single_flight(result_file, lambda: fetch_system_info_values(shared),
+                               lambda path: load_sysinfo_cache(path) or None, save_sysinfo_cache)
+    missing = local + [label for label in shared if label not in values]
+    if missing: values.update(fetch_system_info_values(missing))
+    return values
+
+def load_cache_shared(cache_file):
+    """load_cache, decoding a JSON cache once per burst of launches.
+
+    The first process leaves a binary copy of the cache in SINGLE_FLIGHT_DIR,
+    which the others map instead of parsing the JSON. Only for read-only runs.
+    """
+    try: st = os.stat(cache_file)
+    except OSError: return load_cache(cache_file)
+    if binary_cache.is_binary_cache(cache_file): return load_cache(cache_file) # Mapped, nothing to decode
+    prefix = f"cache-{name_hash(os.path.realpath(cache_file))}-"
+    try: journal = os.stat(journal_path(cache_file)).st_mtime_ns # Replayed by load_cache
+    except OSError: journal = None
+    result_file = single_flight_path(f"{prefix}{name_hash(st.st_size, st.st_mtime_ns, journal)}{binary_cache.BINARY_CACHE_SUFFIX}")
+
+    @timed_phase("load_cache")
+    def read(path):
+        global _zstd_dict_file, _zstd_dict
+        try: cache = binary_cache.IndexedCache(path)
+        except (OSError, ValueError): return None
+        # The entries are copied as they are stored, so zstd ones still need the source's dictionary
+        _zstd_dict_file, _zstd_dict = zstd_dict_path(cache_file), None
+        return cache
+
+    def write(cache, path):
+        if not cache: return
+        binary_cache.write_cache(cache, path)
+        directory, current = os.path.split(path)
+        stale_prefix = os.path.basename(single_flight_path(prefix))
+        for name in os.listdir(directory): # Copies of earlier versions of this cache
+            if name.startswith(stale_prefix) and name.endswith(binary_cache.BINARY_CACHE_SUFFIX) and name != current:
+                try: os.remove(os.path.join(directory, name))
+                except OSError: pass
+
+    return single_flight(result_file, lambda: load_cache(cache_file), read, write)
+
 # Fetch and format using Python APIs where possible
+@timed_phase("sysinfo")
 def get_formatted_system_info():
     """Fetches and formats system information using Python APIs and fallbacks."""
-    info_lines = []
-    max_label_len = 0
-    labels_in_order = []
+    return format_system_info(get_system_info_values(system_info_labels()))
 
-    # Pre-calculate max label length
-    for item in config.SYSTEM_INFO_ORDER:
-        if isinstance(item, dict) and "label" in item:
-            label = item["label"]
-            if label != "Color Palette": # Don't pad for color palette
-                labels_in_order.append(label)
-                max_label_len = max(max_label_len, len(label))
+def info_label_width():
+    """Width the labels of the sysinfo panel are padded to (the color palette isn't padded)."""
+    return max((len(item["label"]) for item in config.SYSTEM_INFO_ORDER
+                if isinstance(item, dict) and "label" in item and item["label"] != "Color Palette"), default=0)
+
+def info_line_prefix(label, max_label_len):
+    """The part of a sysinfo line before its value."""
+    return f"{config.SYS_INFO_LABEL_COLOR}{label.ljust(max_label_len)}{config.RESET_COLOR}{config.SYS_INFO_KV_SEPARATOR} "
+
+def system_info_labels():
+    return [item["label"] for item in config.SYSTEM_INFO_ORDER if isinstance(item, dict) and "label" in item]
+
+def format_system_info(values, positions=None):
+    """Formats values ({label: value}) as the lines of the sysinfo panel, in SYSTEM_INFO_ORDER.
+
+    With positions (a dict), it also gets {label: (line index, column)} of where each value starts.
+    """
+    info_lines = []
+    max_label_len = info_label_width()
 
-    # Fetch data and format lines
     for item in config.SYSTEM_INFO_ORDER:
         if not isinstance(item, dict): continue
 
@@ -356,19 +2042,7 @@ def get_formatted_system_info():
 
         if "label" in item:
             label = item["label"]
-            value = format_error("Fetcher N/A") # Default error
-            fetcher = INFO_FETCHER_MAP.get(label)
-
-            if callable(fetcher): # Is it a Python function?
-                try: value = fetcher()
-                except Exception as e: value = format_error(f"Func Error: {e}")
-            elif isinstance(fetcher, str): # Is it a key for fallback command?
-                command = config.FALLBACK_COMMANDS.get(fetcher)
-                if command: value = fetch_shell_command(command)
-                else: value = format_error(f"No cmd for {fetcher}")
-            else: # No fetcher found
-                 value = format_error(f"No fetcher for {label}")
-
+            value = values.get(label, format_error("Fetcher N/A"))
 
             # Handle multi-line values (like color palette)
             value_lines = str(value).split('\n') # Ensure value is string
@@ -380,17 +2054,13 @@ def get_formatted_system_info():
                 indent = max_label_len + len(config.SYS_INFO_KV_SEPARATOR) + 1
                 for extra in extra_lines: info_lines.append((" " * indent) + extra) # Palette line 2
             else:
-                padded_label = label.ljust(max_label_len)
-                info_lines.append(
-                    f"{config.SYS_INFO_LABEL_COLOR}{padded_label}{config.RESET_COLOR}"
-                    f"{config.SYS_INFO_KV_SEPARATOR} "
-                    f"{config.SYS_INFO_VALUE_COLOR}{value}{config.RESET_COLOR}"
-                )
+                if positions is not None: positions[label] = (len(info_lines), max_label_len + len(config.SYS_INFO_KV_SEPARATOR) + 1)
+                info_lines.append(f"{info_line_prefix(label, max_label_len)}{config.SYS_INFO_VALUE_COLOR}{value}{config.RESET_COLOR}")
                 indent = max_label_len + len(config.SYS_INFO_KV_SEPARATOR) + 1
                 for extra in extra_lines: info_lines.append((" " * indent) + extra)
 
     # Add psutil warning at the end if needed
-    if not PSUTIL_AVAILABLE:
+    if not psutil_available():
         info_lines.append("") # Add a blank line
         info_lines.append(format_warn("Install 'psutil' (`pip install psutil`) for more detailed system info (CPU%, Uptime, Memory)."))
 
@@ -398,24 +2068,130 @@ def get_formatted_system_info():
 
 
 # --- Display Functions ---
-# (Keep display_art_and_info as it was, ensuring it uses config.IMAGE_INFO_SEPARATOR)
-def display_art_and_info(ansi_art, sys_info_lines):
+# Art rows from image_to_ansi all have the same visible width, stored as "art_width"
+# when the entry is converted, so laying art out next to sysinfo needs no scanning.
+# Art without it (older caches, art from elsewhere) is measured with visible_width.
+def visible_width(line):
+    """Length of line without its color (SGR) and erase-line escape sequences, without using re."""
+    if "\x1b" not in line: return len(line)
+    parts = line.split("\x1b[")
+    width = len(parts[0])
+    for part in parts[1:]:
+        rest = part.lstrip("0123456789;")
+        if rest and (rest[0] == "m" or rest[0] == "K"): width += len(rest) - 1
+        else: width += len(part) + 2 # Not a sequence we strip: "\x1b[" counts too
+    return width
+
+def art_layout(ansi_art):
+    """Returns the visible width shared by every line of ansi_art, or None if the lines differ."""
+    widths = {visible_width(line) for line in ansi_art.strip('\n').split('\n')}
+    return widths.pop() if len(widths) == 1 else None
+
+def render_art_and_info(ansi_art, sys_info_lines, art_width=None):
+    """Returns the art with sys_info_lines beside it, as printed by display_art_and_info.
+
+    art_width is the stored width of every art line (see art_layout); without it lines are measured.
+    """
     art_lines = ansi_art.strip('\n').split('\n')
-    max_art_width = 0
-    if art_lines:
-        plain_lines = [re.sub(r'\x1b\[[0-9;]*[mK]', '', line) for line in art_lines]
-        max_art_width = max(len(line) for line in plain_lines if line) if any(plain_lines) else 0
-
-    for art_line, info_line in zip_longest(art_lines, sys_info_lines, fillvalue=""):
-        plain_art_line = re.sub(r'\x1b\[[0-9;]*[mK]', '', art_line)
-        padding_needed = max(0, max_art_width - len(plain_art_line))
-        padded_art_line = art_line + (" " * padding_needed)
-
-        if info_line:
-            print(f"{padded_art_line}{config.IMAGE_INFO_SEPARATOR}{info_line}")
-        else:
-            print(padded_art_line) # Print only padded art line if no corresponding info line
+    if art_width is None:
+        widths = [visible_width(line) for line in art_lines]
+        art_width = max(widths, default=0)
+        art_lines = [line + " " * (art_width - width) for line, width in zip(art_lines, widths)]
+    blank = " " * art_width
+    separator = config.IMAGE_INFO_SEPARATOR
 
+    out = []
+    for art_line, info_line in zip_longest(art_lines, sys_info_lines, fillvalue=None):
+        if art_line is None: art_line = blank
+        out.append(f"{art_line}{separator}{info_line}\n" if info_line else art_line + "\n")
+    return "".join(out)
+
+def write_frame(text):
+    """Writes a rendered frame to stdout in one call."""
+    sys.stdout.flush() # Anything already printed (e.g. the "Random:" header) goes first
+    data = text.encode("utf-8")
+    sys.stdout.buffer.write(data)
+    record_bytes(len(data))
+    sys.stdout.buffer.flush()
+
+def display_art_and_info(ansi_art, sys_info_lines, art_width=None):
+    write_frame(render_art_and_info(ansi_art, sys_info_lines, art_width))
+
+def render_entry(data, sys_info_lines=None, encoding="truecolor", columns=None, graphics=None, session=None, cell_size=None):
+    """Returns what display_entry prints for a still (non-animated) entry, in the encoding named by an encoding_key.
+
+    With columns, the largest scaled variant that fits next to sys_info_lines is used.
+    With graphics (a protocol from GRAPHICS_PROTOCOLS) the image is drawn with it instead, see render_graphics.
+    """
+    data = fitting_variant(data, max_art_width(sys_info_lines, columns))
+    if graphics and data.get("category") != "empty": return render_graphics(data, sys_info_lines, graphics, session, cell_size)
+    art = entry_encoded_art(data, encoding)
+    if sys_info_lines: return render_art_and_info(art, sys_info_lines, data.get("art_width"))
+    return art + "\n"
+
+@timed_phase("display")
+def display_entry(data, sys_info_lines=None, animate=False, loops=1, encoding="truecolor", columns=None, graphics=None):
+    """Prints a cache entry, playing its frames in place (always truecolor, full size) when animate is set and they are cached."""
+    if animate and "animation" in data: play_animation(data["animation"], sys_info_lines, loops)
+    elif graphics: write_frame(render_entry(data, sys_info_lines, encoding, columns, graphics, graphics_session()))
+    else: write_frame(render_entry(data, sys_info_lines, encoding, columns))
+
+# --- Progressive Sysinfo (--progressive) ---
+# The frame goes out at once, with the fields served from the sysinfo cache filled in
+# and PROGRESSIVE_PLACEHOLDER in place of the others. Each value is then written into
+# its row as its fetcher finishes, with cursor movement. Fetchers still running after
+# PROGRESSIVE_BUDGET seconds are given up on and their fields keep the placeholder,
+# so the slowest fetcher no longer decides when the shell gets its prompt.
+def terminal_lines():
+    try: return os.get_terminal_size(sys.__stdout__.fileno()).lines or None
+    except (AttributeError, ValueError, OSError): return None
+
+@timed_phase("display")
+def display_progressive(data, encoding="truecolor", columns=None, graphics=None, budget=None):
+    """Like display_entry with system info, but only waiting budget seconds (default PROGRESSIVE_BUDGET) for it."""
+    from concurrent.futures import FIRST_COMPLETED, wait
+    if budget is None: budget = config.PROGRESSIVE_BUDGET
+    values, live, stale = cached_system_info_values(system_info_labels())
+    if "Color Palette" in live: # Two lines, and nothing to wait for
+        live.remove("Color Palette"); values["Color Palette"] = fetch_info_value("Color Palette")
+    deadline = time.monotonic() + budget
+    pool, futures = submit_fetchers(live, budget)
+    try:
+        positions = {}
+        sys_info_lines = format_system_info(dict({label: config.PROGRESSIVE_PLACEHOLDER for label in live}, **values), positions)
+        session = graphics_session() if graphics else None
+        frame = render_entry(data, sys_info_lines, encoding, columns, graphics, session)
+        layout = frame.rsplit("\x1b8", 1)[-1].split("\n")[:-1] # Graphics frames start with the image, see render_graphics
+        lines = terminal_lines()
+        in_place = lines is None or len(layout) < lines # Rows scrolled off the screen can't be reached
+        if in_place: write_frame(frame)
+        pending = {future: label for label, future in futures.items()}
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0: break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            updates = []
+            for future in done:
+                label = pending.pop(future)
+                value = str(future.result()).split("\n")[0]
+                if value == format_error("Timeout"): continue # Killed at the deadline: keeps the placeholder
+                values[label] = value
+                if not in_place: continue
+                line, column = positions[label]
+                column += visible_width(layout[line]) - visible_width(sys_info_lines[line]) # Art and separator before the panel
+                if columns and "\x1b" not in value: value = value[:max(1, columns - column)] # A wrapped row would shift the others
+                up = len(layout) - line
+                updates.append(f"\x1b[{up}A\r\x1b[{column}C{config.SYS_INFO_VALUE_COLOR}{value}{config.RESET_COLOR}\x1b[K\x1b[{up}B\r")
+            if updates: write_frame("".join(updates))
+        record_fetch_timeouts(futures, budget)
+    finally: finish_fetchers(pool)
+    if not in_place: # Printed once the budget is up instead, with what arrived by then
+        write_frame(render_entry(data, format_system_info(dict({label: config.PROGRESSIVE_PLACEHOLDER for label in live}, **values)),
+                                 encoding, columns, graphics, session))
+    store_system_info_values(values, live)
+    # Fields that missed the budget are fetched in the background, for the next run
+    if config.SYS_INFO_CACHE_FILE and (stale or any(label in config.SYS_INFO_TTL and label not in values for label in live)):
+        spawn_sysinfo_refresh()
 
 # (Keep get_cache_info as it was)
 def get_cache_info(cache_file, cache):
@@ -425,45 +2201,368 @@ def get_cache_info(cache_file, cache):
     except FileNotFoundError: print("File size: N/A (Cache file not found or empty)"); file_size = 0
     except Exception as e: print(f"File size: Error calculating ({e})")
     total_entries = len(cache)
-    category_counts = {}
-    if total_entries > 0:
-        for key, data in cache.items():
-            if isinstance(data, dict) and "category" in data:
-                 category = data.get("category", "unknown")
-                 category_counts[category] = category_counts.get(category, 0) + 1
-            else: category_counts["invalid"] = category_counts.get("invalid", 0) + 1
+    category_counts = {cat: len(keys) for cat, keys in cache_category_index(cache).items()}
+    print(f"Cache format: {'indexed binary' if isinstance(cache, binary_cache.IndexedCache) else 'JSON'}")
     print(f"Total cached entries: {total_entries}")
+    stored, uncompressed = cache_storage_sizes(cache)
+    if uncompressed:
+        print(f"Art size: {stored / 1024:.2f} KB stored, {uncompressed / 1024:.2f} KB uncompressed ({stored / uncompressed:.1%})")
+    encoding_sizes = cache_encoding_sizes(cache)
+    if encoding_sizes:
+        print("Cached encodings (size vs. truecolor art of the same entries):")
+        for name, (count, size, truecolor) in sorted(encoding_sizes.items()):
+            savings = f" ({size / truecolor:.1%}, saves {(truecolor - size) / 1024:.2f} KB)" if truecolor else ""
+            print(f"  - {name}: {count} entries, {size / 1024:.2f} KB vs {truecolor / 1024:.2f} KB{savings}")
+    evicted = sum(1 for key in cache if not entry_has_art(cache, key))
+    if config.CACHE_MAX_BYTES or evicted:
+        budget = f"{config.CACHE_MAX_BYTES / 1024:.2f} KB" if config.CACHE_MAX_BYTES else "none"
+        print(f"Art budget (CACHE_MAX_BYTES): {budget}, art evicted from {evicted} entries")
+    hashed, unique = cache_source_counts(cache)
+    if hashed: print(f"Distinct source images: {unique} of {hashed} entries (dedup ratio {hashed / unique:.2f}x)")
+    if isinstance(cache, binary_cache.IndexedCache):
+        entries, blobs, saved = cache.art_sharing()
+        if entries: print(f"Stored art blobs: {blobs} for {entries} entries (sharing saves {saved / 1024:.2f} KB)")
+    variant_sizes = cache_variant_sizes(cache)
+    if variant_sizes:
+        print("Scaled variants:")
+        for scale, (count, size) in sorted(variant_sizes.items()): print(f"  - 1/{scale}: {count} entries, {size / 1024:.2f} KB")
     if category_counts:
         print("Entries per category:"); [print(f"  - {cat}: {cnt}") for cat, cnt in sorted(category_counts.items())]
     else: print("No valid entries found to categorize.")
     print("==================\n")
 
+# --- Pre-rendered Ring (--prerender / --emit-next) ---
+# `--prerender N` renders N complete --random outputs ahead of time into <cache>.ring,
+# one file per frame, numbered in the order they are shown. `--emit-next` prints the
+# oldest one and deletes it, so a shell start costs one file read. Fields with a TTL
+# in SYS_INFO_TTL stay as they were rendered; live ones (Uptime, Memory, ...) are
+# refetched and patched in (PRERENDER_LIVE_FIELDS). Once fewer than PRERENDER_LOW
+# frames are left, a detached process reruns the last --prerender to top the ring up.
+RING_SUFFIX = ".ans"
+
+def ring_path(cache_file): return cache_file + ".ring"
+
+def ring_frames(ring):
+    """Names of the frames in the ring directory, oldest first."""
+    try: return sorted(name for name in os.listdir(ring) if name.endswith(RING_SUFFIX))
+    except OSError: return []
+
+def prerender(cache_file, cache, keys, count, fetch_system=False, silent=False, encoding="truecolor", columns=None, graphics=None):
+    """Adds frames for random keys to the ring of cache_file until it holds count of them. Returns how many were added."""
+    ring = ring_path(cache_file)
+    os.makedirs(ring, exist_ok=True)
+    names = ring_frames(ring)
+    missing = count - len(names)
+    if missing <= 0 or not keys: return 0
+    sys_info_lines = get_formatted_system_info() if fetch_system else None
+    number = int(names[-1][:-len(RING_SUFFIX)]) + 1 if names else 0
+    picks = random.sample(keys, missing) if missing <= len(keys) else [random.choice(keys) for _ in range(missing)]
+    cell_size = terminal_cell_size() if graphics else None
+    added = 0
+    for key in picks:
+        data = cache.entry(key) if isinstance(cache, binary_cache.IndexedCache) else cache[key]
+        record_display(cache_file, key)
+        if is_evicted(data): data = restore_evicted(cache_file, key) or data
+        if not has_art(data): continue
+        header = "" if silent else f"Random: {key}\nCategory: {data.get('category', 'N/A')} ({data.get('num_lines', '?')} lines)\n"
+        # No graphics session: a frame can be shown in any terminal, so kitty images are always sent
+        frame = header + render_entry(data, sys_info_lines, encoding, columns, graphics, None, cell_size)
+        path = os.path.join(ring, f"{number:010d}{RING_SUFFIX}")
+        tmp_file = f"{path}.tmp{os.getpid()}" # Not a frame name, so --emit-next never sees it half written
+        with open(tmp_file, "wb") as f: f.write(frame.encode("utf-8"))
+        os.replace(tmp_file, path)
+        number += 1; added += 1
+    return added
+
+def save_ring_args(cache_file, argv):
+    """Remembers the --prerender command line (and where it ran) for the refills started by --emit-next."""
+    ring = ring_path(cache_file)
+    with open(os.path.join(ring, "args.tmp"), "w", encoding="utf-8") as f: f.write("\n".join([os.getcwd()] + argv) + "\n")
+    os.replace(os.path.join(ring, "args.tmp"), os.path.join(ring, "args"))
+
+def refill_ring(ring):
+    """Reruns the saved --prerender in the background, for the terminal width of this one."""
+    try:
+        with open(os.path.join(ring, "args"), encoding="utf-8") as f: cwd, *argv = f.read().splitlines()
+    except (OSError, ValueError): return # Never prerendered: nothing to repeat
+    env = dict(os.environ)
+    columns = terminal_columns()
+    if columns: env["COLUMNS"] = str(columns) # The detached process has no terminal to ask
+    spawn_background(argv, os.path.join(ring, "lock"), env=env, cwd=cwd)
+
+def patch_live_fields(frame):
+    """Returns frame (bytes) with the values of its live sysinfo fields refetched."""
+    text = frame.decode("utf-8")
+    width = info_label_width()
+    prefixes = {label: info_line_prefix(label, width) for label in system_info_labels()
+                if label not in config.SYS_INFO_TTL and label != "Color Palette"}
+    prefixes = {label: prefix for label, prefix in prefixes.items() if prefix in text}
+    if not prefixes: return frame
+    values = fetch_system_info_values(list(prefixes))
+    lines = text.split("\n")
+    for i, line in enumerate(lines):
+        for label, prefix in prefixes.items():
+            start = line.find(prefix)
+            if start < 0: continue
+            value = str(values[label]).split("\n")[0] # The panel has its rows: only the first of a multi-line value fits
+            lines[i] = f"{line[:start + len(prefix)]}{config.SYS_INFO_VALUE_COLOR}{value}{config.RESET_COLOR}"
+            break
+    return "\n".join(lines).encode("utf-8")
+
+@timed_phase("emit")
+def emit_next(cache_file):
+    """Prints the oldest frame of the ring and removes it, refilling the ring if it runs low. Returns False if it was empty."""
+    ring = ring_path(cache_file)
+    names = ring_frames(ring)
+    frame, left = None, len(names)
+    for name in names:
+        left -= 1
+        path = os.path.join(ring, name)
+        claimed = f"{path}.{os.getpid()}"
+        try: os.rename(path, claimed) # Atomic, so two shells starting at once never show the same frame
+        except OSError: continue
+        try:
+            with open(claimed, "rb") as f: frame = f.read()
+        finally: os.remove(claimed)
+        break
+    if left < config.PRERENDER_LOW: refill_ring(ring)
+    if frame is None: return False
+    if config.PRERENDER_LIVE_FIELDS: frame = patch_live_fields(frame)
+    sys.stdout.flush()
+    sys.stdout.buffer.write(frame)
+    record_bytes(len(frame))
+    return True
+
+# --- Resident Daemon ---
+# `--serve` keeps the parsed cache, its category index and formatted system info in
+# memory and answers one request per connection on a UNIX socket:
+#   request:  "random [small] [medium] [large] [extra-large] [sysinfo] [silent] [encoding=<encoding_key>] [columns=<n>]
+#              [frame=<n>] [scale=<n>] [graphics=<protocol> [session=<name>] [cell=<w>x<h>]]\n"
+#             (frame and scale render from the pixel atlas; graphics draws the image, see render_graphics)
+#   response: "OK\n" followed by the rendered frame, or "ERR <message>\n"
+# `--random --via-daemon` is the client; any UNIX socket client (e.g. socat) works too.
+DAEMON_CATEGORIES = ("small", "medium", "large", "extra-large")
+
+class ArtDaemon:
+    """State shared by the --serve request handlers."""
+
+    def __init__(self, cache_file):
+        import threading
+        self.cache_file = cache_file
+        self.lock = threading.Lock()
+        self.cache, self.index, self.cache_stamp = None, {}, None
+        self.sys_info_lines, self.sys_info_time, self.sys_info_refreshing = None, 0, False
+        self.reload_cache()
+        self.start_sys_info_refresh() # Warm up before the first --sysinfo request
+
+    def reload_cache(self):
+        """Loads the cache again if its file changed since the last load (e.g. after --refresh)."""
+        stamp = []
+        for path in (self.cache_file, journal_path(self.cache_file)): # A journal that grows is picked up too
+            try: st = os.stat(path); stamp.append((st.st_mtime_ns, st.st_size, st.st_ino))
+            except OSError: stamp.append(None)
+        with self.lock:
+            if self.cache is not None and stamp == self.cache_stamp: return
+            # A replaced IndexedCache is left to the garbage collector: other handlers may still be reading it
+            self.cache = load_cache(self.cache_file)
+            self.index = {cat: [k for k, _ in entries] for cat, entries in cache_category_index(self.cache).items() if cat != "invalid"}
+            self.cache_stamp = stamp
+
+    def start_sys_info_refresh(self):
+        import threading
+        with self.lock:
+            if self.sys_info_refreshing: return
+            self.sys_info_refreshing = True
+        threading.Thread(target=self._refresh_sys_info, daemon=True).start()
+
+    def _refresh_sys_info(self):
+        try: lines = get_formatted_system_info()
+        finally: self.sys_info_refreshing = False
+        self.sys_info_lines, self.sys_info_time = lines, time.monotonic()
+
+    def get_sys_info(self):
+        """Formatted system info; refreshed in the background once older than DAEMON_SYSINFO_REFRESH."""
+        if self.sys_info_lines is None: self._refresh_sys_info()
+        elif time.monotonic() - self.sys_info_time > config.DAEMON_SYSINFO_REFRESH: self.start_sys_info_refresh()
+        return self.sys_info_lines
+
+    def handle_request(self, line):
+        words = line.split()
+        if not words or words[0] != "random": return f"ERR Unknown request: {line.strip()!r}\n"
+        self.reload_cache()
+        with self.lock: cache, index = self.cache, self.index
+        categories = [w for w in words[1:] if w in DAEMON_CATEGORIES] or list(index)
+        keys = [k for cat in categories for k in index.get(cat, ())]
+        if not keys: return "ERR No cached images match criteria.\n"
+        key = random.choice(keys)
+        encoding = next((w.partition("=")[2] for w in words if w.startswith("encoding=")), "truecolor")
+        encoding = encoding_key(*parse_encoding_key(encoding))
+        columns = next((int(w.partition("=")[2]) for w in words if w.startswith("columns=")), None)
+        frame = next((int(w.partition("=")[2]) for w in words if w.startswith("frame=")), None)
+        scale = next((int(w.partition("=")[2]) for w in words if w.startswith("scale=")), 1)
+        graphics = next((w.partition("=")[2] for w in words if w.startswith("graphics=")), None)
+        if graphics is not None and graphics not in GRAPHICS_PROTOCOLS: return f"ERR Unknown graphics protocol: {graphics}\n"
+        session = next((w.partition("=")[2] for w in words if w.startswith("session=")), None) # Without one, kitty images are always sent
+        cell_size = next((tuple(int(v) for v in w.partition("=")[2].split("x")) for w in words if w.startswith("cell=")), None)
+        sys_info_lines = self.get_sys_info() if "sysinfo" in words else None
+        data = atlas_entry(self.cache_file, key, frame or 0, scale, encoding) if frame is not None or scale > 1 else None
+        if data is None and isinstance(cache, binary_cache.IndexedCache):
+            data = cache.entry(key, with_meta=encoding != "truecolor" or graphics is not None)
+            if needs_variant(data, max_art_width(sys_info_lines, columns)): data = cache.entry(key) # Variants live in the meta
+        elif data is None: data = cache[key]
+        if is_evicted(data): return f"ERR The art of {key} was evicted\n" # The client converts it in-process
+        if not has_art(data): return f"ERR Invalid data in cache for {key}\n"
+        record_display(self.cache_file, key)
+        header = "" if "silent" in words else f"Random: {key}\nCategory: {data.get('category', 'N/A')} ({data.get('num_lines', '?')} lines)\n"
+        return "OK\n" + header + render_entry(data, sys_info_lines, encoding, columns, graphics, session, cell_size)
+
+def serve(cache_file, socket_path):
+    """Runs the --serve daemon on socket_path until interrupted."""
+    import signal
+    import socket
+    import socketserver
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            print(f"Error: A daemon is already listening on {socket_path}", file=sys.stderr); sys.exit(1)
+        except OSError: os.remove(socket_path) # Left behind by a daemon that was killed
+        finally: probe.close()
+
+    daemon = ArtDaemon(cache_file)
+    if not daemon.cache: print(f"Warning: Cache {cache_file} is empty, serving anyway.", file=sys.stderr)
+
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            line = self.rfile.readline(4096).decode("utf-8", "replace")
+            try: response = daemon.handle_request(line)
+            except Exception as e: response = f"ERR {e}\n"
+            self.wfile.write(response.encode("utf-8"))
+
+    old_umask = os.umask(0o177) # Socket is only accessible to the current user
+    try: server = socketserver.ThreadingUnixStreamServer(socket_path, RequestHandler)
+    finally: os.umask(old_umask)
+    server.daemon_threads = True
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Serving {len(daemon.cache)} cached images on {socket_path}", file=sys.stderr)
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    finally:
+        server.server_close()
+        try: os.remove(socket_path)
+        except OSError: pass
+
+def fetch_from_daemon(request, socket_path, timeout):
+    """Sends one request to a --serve daemon. Returns the rendered frame, or None if it didn't answer with one.
+
+    Uses the low-level _socket module: importing `socket` (and enum with it) costs
+    more than the round-trip this is meant to save.
+    """
+    try:
+        import _socket
+        sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    except (ImportError, AttributeError, OSError): return None
+    chunks = []
+    try:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(request.encode("utf-8") + b"\n")
+        while True:
+            chunk = sock.recv(1 << 16)
+            if not chunk: break
+            chunks.append(chunk)
+    except OSError: return None
+    finally: sock.close()
+    status, _, body = b"".join(chunks).partition(b"\n")
+    return body if status == b"OK" else None
+
 # --- Main Execution ---
 # (Keep main function largely the same - it orchestrates calls to other functions)
-def main():
+# --- Command Line ---
+# Options are declared as data so that parse_args_fast can handle the common
+# shell-startup invocations (e.g. --random --small --silent) without importing argparse.
+CLI_OPTIONS = [
+    (("--rsc-dir",), dict(default=config.DEFAULT_RSC_DIR, help="Directory containing image files.")),
+    (("--cache",), dict(default=config.DEFAULT_CACHE_FILE, help="Path to JSON cache file.")),
+    (("file",), dict(nargs="?", help="Specific image file to process. If omitted, processes compatible files in --rsc-dir.")),
+    (("--refresh",), dict(action="store_true", help="Force reprocessing images even if cached.")),
+    (("--random",), dict(action="store_true", help="Display a random cached image, honoring category filters.")),
+    (("--fetch-system", "--sysinfo"), dict(action="store_true", help="Display system information alongside the image.")),
+    (("--animate",), dict(action="store_true", help="Play animated GIFs in place. Builds cache every frame (as per-frame deltas) for images processed with this flag.")),
+    (("--loops",), dict(type=int, default=1, help="How many times --animate plays an animation (0 = until Ctrl-C).")),
+    (("--refresh-sysinfo",), dict(action="store_true", help="Refetch the cached system info fields (see SYS_INFO_TTL in config.py) and exit.")),
+    (("--cache-info",), dict(action="store_true", help="Display cache statistics and exit.")),
+    (("--compression",), dict(choices=("keep", "none") + ART_CODECS, default=config.CACHE_COMPRESSION or "keep", help="How art is stored when the cache is saved (keep: as each entry already is). Entries are decompressed only when printed.")),
+    (("--encoding",), dict(choices=OUTPUT_ENCODINGS, default=config.OUTPUT_ENCODING, help="How art is printed: truecolor, combined (one escape per color change), 256 or 16 colors. Directory runs also cache it for every image.")),
+    (("--palette",), dict(type=int, default=config.OUTPUT_PALETTE, metavar="N", help="Quantize each image to N colors before encoding (fewer color changes).")),
+    (("--graphics",), dict(choices=("none", "auto") + GRAPHICS_PROTOCOLS, default=config.GRAPHICS_PROTOCOL, help="Draw still images with a terminal graphics protocol instead of half blocks (auto guesses it from $TERM). Directory runs also cache the payload for every image.")),
+    (("--progressive",), dict(action="store_true", help="With --random --sysinfo, print the art at once and fill in system info in place as it arrives (see PROGRESSIVE_BUDGET in config.py).")),
+    (("--atlas",), dict(action="store_true", help="Also keep every frame of every cached image as pixels in <cache>.atlas, for --frame and --scale.")),
+    (("--frame",), dict(type=int, metavar="N", help="With --random, show frame N of the image (wraps around), rendered from the pixel atlas.")),
+    (("--scale",), dict(type=int, default=1, metavar="N", help="With --random, show the image reduced N times, rendered from the pixel atlas.")),
+    (("--prerender",), dict(type=int, metavar="N", help="Top <cache>.ring up to N complete --random outputs, rendered with the other display flags, for --emit-next.")),
+    (("--emit-next",), dict(action="store_true", help="Print the next output from <cache>.ring (rendering one like --random if it is empty) and refill the ring in the background when it runs low.")),
+    (("--convert-cache",), dict(metavar="DEST", help=f"Write the cache to DEST and exit. DEST ending in '{binary_cache.BINARY_CACHE_SUFFIX}' uses the indexed binary format, anything else JSON.")),
+    (("--jobs", "-j"), dict(type=int, default=1, help="Number of worker processes used to convert images when building the cache (0 = all cores).")),
+    (("--serve",), dict(action="store_true", help="Run as a resident daemon that keeps the cache and system info in memory and serves --via-daemon requests.")),
+    (("--via-daemon",), dict(action="store_true", help="With --random, ask the --serve daemon for the frame (it uses its own --cache). Falls back to rendering in-process.")),
+    (("--socket",), dict(default=config.DAEMON_SOCKET, help="UNIX socket used by --serve and --via-daemon.")),
+    (("--timings",), dict(action="store_true", help="Write a JSON record of phase durations, sysinfo field latencies, bytes written and peak RSS to stderr on exit (or set RW_FETCH_TIMINGS).")),
+    (("--timings-file",), dict(metavar="PATH", help="Append the --timings record to PATH instead of writing it to stderr.")),
+    (("--silent",), dict(action="store_true", help="Suppress log output (like file/category info) when displaying.")),
+    (("--small",), dict(dest="filter_small", action="store_true", help="Filter for small images.")),
+    (("--medium",), dict(dest="filter_medium", action="store_true", help="Filter for medium images.")),
+    (("--large",), dict(dest="filter_large", action="store_true", help="Filter for large images.")),
+    (("--extra-large",), dict(dest="filter_xl", action="store_true", help="Filter for extra-large images.")),
+]
+
+def build_arg_parser():
+    import argparse
     parser = argparse.ArgumentParser(
         description="Convert images to ANSI art with caching, categorization, and optional system info (Python API backend).",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter
     )
-    # (Arguments remain the same as before)
-    parser.add_argument("--rsc-dir", default=config.DEFAULT_RSC_DIR, help="Directory containing image files.")
-    parser.add_argument("--cache", default=config.DEFAULT_CACHE_FILE, help="Path to JSON cache file.")
-    parser.add_argument("file", nargs="?", help="Specific image file to process. If omitted, processes compatible files in --rsc-dir.")
-    parser.add_argument("--refresh", action="store_true", help="Force reprocessing images even if cached.")
-    parser.add_argument("--random", action="store_true", help="Display a random cached image, honoring category filters.")
-    parser.add_argument("--fetch-system", "--sysinfo", action="store_true", help="Display system information alongside the image.")
-    parser.add_argument("--cache-info", action="store_true", help="Display cache statistics and exit.")
-    parser.add_argument("--silent", action="store_true", help="Suppress log output (like file/category info) when displaying.")
-    parser.add_argument("--small", dest="filter_small", action="store_true", help="Filter for small images.")
-    parser.add_argument("--medium", dest="filter_medium", action="store_true", help="Filter for medium images.")
-    parser.add_argument("--large", dest="filter_large", action="store_true", help="Filter for large images.")
-    parser.add_argument("--extra-large", dest="filter_xl", action="store_true", help="Filter for extra-large images.")
-
-    args = parser.parse_args()
-    cache = load_cache(args.cache)
+    for flags, kwargs in CLI_OPTIONS: parser.add_argument(*flags, **kwargs)
+    return parser
 
-    if args.cache_info: get_cache_info(args.cache, cache); sys.exit(0)
+class FastArgs:
+    def __init__(self, **values): self.__dict__.update(values)
 
+def parse_args_fast(argv):
+    """Parses argv without argparse if it only uses known flags and `--option value` pairs.
+
+    Returns None for anything else (positionals, --opt=value, -h, bad values) so
+    argparse can handle it, including its error messages.
+    """
+    values, options = {}, {}
+    for flags, kwargs in CLI_OPTIONS:
+        if not flags[0].startswith("-"): values[flags[0]] = kwargs.get("default"); continue
+        dest = kwargs.get("dest") or flags[0].lstrip("-").replace("-", "_")
+        values[dest] = False if kwargs.get("action") == "store_true" else kwargs.get("default")
+        for flag in flags: options[flag] = (dest, kwargs)
+    tokens = iter(argv)
+    for token in tokens:
+        if token not in options: return None
+        dest, kwargs = options[token]
+        if kwargs.get("action") == "store_true": values[dest] = True; continue
+        value = next(tokens, None)
+        if value is None or value.startswith("-"): return None
+        try: value = kwargs.get("type", str)(value)
+        except ValueError: return None
+        if "choices" in kwargs and value not in kwargs["choices"]: return None
+        values[dest] = value
+    return FastArgs(**values)
+
+def main():
+    parse_start = time.perf_counter()
+    args = parse_args_fast(sys.argv[1:]) or build_arg_parser().parse_args()
+    start_timings(args.timings_file or ("-" if args.timings else os.environ.get("RW_FETCH_TIMINGS")))
+    record_phase("parse_args", time.perf_counter() - parse_start)
+    if args.refresh_sysinfo: refresh_sysinfo_cache(); sys.exit(0)
+    if args.serve: serve(args.cache, args.socket); sys.exit(0)
+    if args.emit_next:
+        if emit_next(args.cache): sys.exit(0)
+        args.random = True # Empty ring: render one in-process instead
     selected_categories = set()
     if args.filter_small: selected_categories.add("small")
     if args.filter_medium: selected_categories.add("medium")
@@ -471,19 +2570,90 @@ def main():
     if args.filter_xl: selected_categories.add("extra-large")
     filter_categories = len(selected_categories) > 0
 
+    columns = terminal_columns() if config.FIT_TO_TERMINAL else None
+    graphics = detect_graphics() if args.graphics == "auto" else args.graphics
+    if graphics == "none": graphics = None
+    # Ask a running --serve daemon first; without one, fall through to the in-process path
+    if args.random and args.via_daemon and not args.animate:
+        request = " ".join(["random"] + sorted(selected_categories) + ["sysinfo"] * args.fetch_system + ["silent"] * args.silent
+                           + [f"encoding={encoding_key(args.encoding, args.palette)}"] * (args.encoding != "truecolor" or bool(args.palette))
+                           + [f"columns={columns}"] * bool(columns)
+                           + [f"frame={args.frame}"] * (args.frame is not None) + [f"scale={args.scale}"] * (args.scale > 1))
+        if graphics:
+            session = graphics_session()
+            request += f" graphics={graphics} cell={'x'.join(map(str, terminal_cell_size()))}" + f" session={session}" * bool(session)
+        with timed_phase("daemon"): frame = fetch_from_daemon(request, args.socket, config.DAEMON_TIMEOUT)
+        if frame is not None: sys.stdout.flush(); sys.stdout.buffer.write(frame); record_bytes(len(frame)); sys.exit(0)
+
+    compression = None if args.compression == "none" else args.compression
+    encoding = encoding_key(args.encoding, args.palette)
+    try: cache_encodings = sorted(({encoding_key(*parse_encoding_key(name)) for name in config.CACHE_ENCODINGS} | {encoding}) - {"truecolor"})
+    except ValueError as e: print(f"Error: CACHE_ENCODINGS in config.py: {e}", file=sys.stderr); sys.exit(1)
+    unknown = set(config.CACHE_GRAPHICS) - set(GRAPHICS_PROTOCOLS)
+    if unknown: print(f"Error: CACHE_GRAPHICS in config.py: unknown protocol(s) {', '.join(sorted(unknown))}", file=sys.stderr); sys.exit(1)
+    cache_encodings += sorted(set(config.CACHE_GRAPHICS) | ({graphics} if graphics else set()))
+    # Runs that update the cache lock it first, so the cache they load is the one they write back
+    journal = None if args.random or args.cache_info or args.convert_cache or args.prerender is not None else CacheJournal(args.cache, compression, args.silent)
+    cache = load_cache_shared(args.cache) if args.random else load_cache(args.cache)
+
+    if args.cache_info: get_cache_info(args.cache, cache); sys.exit(0)
+    if args.convert_cache:
+        if not cache: print("Cache is empty.", file=sys.stderr); sys.exit(1)
+        save_cache(cache, args.convert_cache, compression)
+        if not args.silent: print(f"Wrote {len(cache)} entries to {args.convert_cache}")
+        sys.exit(0)
+
+    if args.prerender is not None:
+        if not cache: print("Cache is empty.", file=sys.stderr); sys.exit(1)
+        valid_keys = [ k for cat, entries in cache_category_index(cache).items() if cat != "invalid" and \
+                       (not filter_categories or cat in selected_categories) for k, _ in entries ]
+        if not valid_keys: print("No cached images match criteria.", file=sys.stderr); sys.exit(1)
+        try:
+            added = prerender(args.cache, cache, valid_keys, args.prerender, args.fetch_system, args.silent, encoding, columns, graphics)
+            save_ring_args(args.cache, sys.argv[1:])
+        finally:
+            try: os.remove(os.path.join(ring_path(args.cache), "lock")) # Taken by the --emit-next that started this run
+            except OSError: pass
+        if not args.silent: print(f"Prerendered {added} outputs into {ring_path(args.cache)}")
+        sys.exit(0)
+
     # Handle --random first (no need to scan dir if random)
     if args.random:
         if not cache: print("Cache is empty.", file=sys.stderr); sys.exit(1)
-        valid_keys = [ k for k, d in cache.items() if isinstance(d, dict) and "category" in d and \
-                       (not filter_categories or d["category"] in selected_categories) ]
+        select_start = time.perf_counter()
+        valid_keys = [ k for cat, entries in cache_category_index(cache).items() if cat != "invalid" and \
+                       (not filter_categories or cat in selected_categories) for k, _ in entries ]
         if not valid_keys: print("No cached images match criteria.", file=sys.stderr); sys.exit(1)
         random_key = random.choice(valid_keys)
-        data = cache[random_key]
-        if not isinstance(data, dict) or "ansi_art" not in data:
+        # Without --animate or --encoding only the art is printed, so skip decoding the entry's metadata
+        progressive = (args.progressive or config.PROGRESSIVE_SYSINFO) and args.fetch_system and not args.animate and sys.stdout.isatty()
+        # Cached encodings, payloads and the scaled variants (for a panel that isn't known yet) live in the metadata
+        with_meta = args.animate or encoding != "truecolor" or bool(graphics) or progressive
+        data = None
+        if args.frame is not None or args.scale > 1:
+            data = atlas_entry(args.cache, random_key, args.frame or 0, args.scale, encoding)
+            if data is None: print(f"Warning: {random_key} is not in the pixel atlas (build it with --atlas), showing the cached art.", file=sys.stderr)
+            else: with_meta = True # Nothing more to load
+        if data is None: data = cache.entry(random_key, with_meta=with_meta) if isinstance(cache, binary_cache.IndexedCache) else cache[random_key]
+        record_phase("select", time.perf_counter() - select_start)
+        record_display(args.cache, random_key) # So the next save keeps it
+        if is_evicted(data):
+            data = restore_evicted(args.cache, random_key, args.animate, cache_encodings)
+            if data is None: print(f"Error: The art of {random_key} was evicted and its source can't be converted.", file=sys.stderr); sys.exit(1)
+        if not has_art(data):
              print(f"Error: Invalid data in cache for {random_key}", file=sys.stderr); sys.exit(1)
+        if args.animate and "animation" not in data and data.get("n_frames") != 1 and os.path.isfile(random_key):
+            # Cache was built without frames: convert this one now and keep it
+            animated_data = process_image(random_key, animate=True)
+            if animated_data:
+                append_journal(args.cache, random_key, animated_data) # The cache was read outside the lock: don't save it
+                data = animated_data
         if not args.silent: print(f"Random: {random_key}\nCategory: {data.get('category', 'N/A')} ({data.get('num_lines', '?')} lines)")
-        if args.fetch_system: sys_info = get_formatted_system_info(); display_art_and_info(data["ansi_art"], sys_info)
-        else: print(data["ansi_art"])
+        if progressive: display_progressive(data, encoding, columns, graphics); sys.exit(0)
+        sys_info = get_formatted_system_info() if args.fetch_system else None
+        if isinstance(cache, binary_cache.IndexedCache) and not with_meta and needs_variant(data, max_art_width(sys_info, columns)):
+            data = cache.entry(random_key) # Too wide for the terminal: the scaled variants are in the metadata
+        display_entry(data, sys_info, args.animate, args.loops, encoding, columns, graphics)
         sys.exit(0)
 
     # Process specific file or directory
@@ -506,24 +2676,85 @@ def main():
 
     processed_count = 0
     cache_updated = False
+    # Images an interrupted --refresh already converted are kept instead of converted again
+    resumed = journal.refreshed_keys() if args.refresh else set()
+    if resumed and not args.silent: print(f"Resuming interrupted --refresh ({len(resumed)} images already converted).")
+
+    # A directory scan is authoritative for what still exists: drop entries whose source is gone
+    retired = []
+    if not args.file:
+        for key in [k for k in cache if not os.path.isfile(k)]:
+            if not args.silent: print(f"Dropping (source missing): {key}")
+            retired.append(cache[key]) # Still matched by content: the image may just have moved
+            journal.record(cache, key, None); cache_updated = True
+    sources = SourceIndex(None if args.refresh else cache, retired)
     # Pre-fetch sys info once if needed (now faster due to Python APIs)
     sys_info = get_formatted_system_info() if args.fetch_system else None
 
+    # With --jobs, convert everything that isn't cached up front in a process pool
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    prebuilt = {}
+    if jobs > 1:
+        pending, pending_hashes = [], set()
+        for file_path in files_to_process:
+            key = os.path.abspath(file_path)
+            refresh = args.refresh and key not in resumed
+            cached_data, updated = (None, False) if refresh else validate_cache_entry(cache.get(key), key, args.animate, cache_encodings)
+            if cached_data is None and not refresh and not args.file:
+                evicted, updated = evicted_up_to_date(cache.get(key), key)
+                if evicted:
+                    if updated: journal.record(cache, key, cache[key]); cache_updated = True
+                    continue # Skipped below
+            if cached_data is None:
+                cached_data, source = sources.lookup(key, args.animate, cache_encodings)
+                if cached_data is not None:
+                    prebuilt[key] = cached_data # Recorded here only, the loop below just shows it
+                    journal.record(cache, key, cached_data, refreshed=args.refresh); cache_updated = True
+                    if not args.silent: print(f"Reused (same content as a cached image): {os.path.basename(file_path)}")
+                elif source is None or source["sha256"] not in pending_hashes: # Duplicates reuse the first one's art below
+                    pending.append(file_path)
+                    if source: pending_hashes.add(source["sha256"])
+            elif updated: journal.record(cache, key, cached_data); cache_updated = True
+        if len(pending) > 1:
+            if not args.silent: print(f"Converting {len(pending)} images with {jobs} workers...")
+            with timed_phase("convert"):
+                for file_path, processed_data in process_images_parallel(pending, jobs, args.silent, args.animate, cache_encodings):
+                    key = os.path.abspath(file_path)
+                    prebuilt[key] = processed_data
+                    if processed_data:
+                        journal.record(cache, key, processed_data, refreshed=args.refresh); sources.add(processed_data); cache_updated = True
+
     for file_path in files_to_process:
         key = os.path.abspath(file_path)
         data = None
-        if not args.refresh and key in cache:
-             cached_data = cache[key]
-             if isinstance(cached_data, dict) and "ansi_art" in cached_data and "category" in cached_data:
+        if (not args.refresh or key in resumed) and key in cache and key not in prebuilt:
+             cached_data, updated = validate_cache_entry(cache[key], key, args.animate, cache_encodings)
+             if cached_data is not None:
                  data = cached_data
+                 if updated: journal.record(cache, key, data); cache_updated = True
                  if not args.silent: print(f"Cached: {os.path.basename(file_path)}")
-             elif not args.silent: print(f"Invalid cache for {os.path.basename(file_path)}. Reprocessing.", file=sys.stderr)
+             elif is_evicted(cache[key]):
+                 evicted, updated = (False, False) if args.file else evicted_up_to_date(cache[key], key)
+                 if evicted:
+                     if updated: journal.record(cache, key, cache[key]); cache_updated = True
+                     if not args.silent: print(f"Skipping (art evicted, CACHE_MAX_BYTES): {os.path.basename(file_path)}")
+                     continue
+                 if not args.silent: print(f"Art evicted (CACHE_MAX_BYTES), converting again: {os.path.basename(file_path)}")
+             elif not args.silent: print(f"Stale or invalid cache for {os.path.basename(file_path)}. Reprocessing.", file=sys.stderr)
 
         if data is None:
-            if not args.silent: print(f"Processing: {os.path.basename(file_path)}")
-            processed_data = process_image(file_path)
+            if key in prebuilt: processed_data = prebuilt[key]
+            else:
+                processed_data, _ = sources.lookup(key, args.animate, cache_encodings)
+                if processed_data is not None:
+                    if not args.silent: print(f"Reused (same content as a cached image): {os.path.basename(file_path)}")
+                else:
+                    if not args.silent: print(f"Processing: {os.path.basename(file_path)}")
+                    processed_data = process_image(file_path, args.animate, cache_encodings)
             if processed_data:
-                data = processed_data; cache[key] = data; cache_updated = True
+                data = processed_data
+                if key not in prebuilt:
+                    journal.record(cache, key, data, refreshed=args.refresh); sources.add(data); cache_updated = True
             else:
                 if not args.silent: print(f"Skipping failed process: {os.path.basename(file_path)}", file=sys.stderr)
                 continue
@@ -532,7 +2763,7 @@ def main():
         if filter_categories and current_category not in selected_categories:
             if not args.silent: print(f"Skipping (filter): {os.path.basename(file_path)} ({current_category})")
             continue
-        if current_category == "empty" and not data.get("ansi_art"):
+        if current_category == "empty" and not entry_art(data):
             if not args.silent: print(f"Skipping (empty result): {os.path.basename(file_path)}")
             continue
 
@@ -541,16 +2772,16 @@ def main():
             print(f"\n--- File: {os.path.basename(file_path)} ---")
             print(f"Category: {current_category} ({data.get('num_lines', '?')} lines)")
 
-        if args.fetch_system: display_art_and_info(data["ansi_art"], sys_info)
-        else: print(data["ansi_art"])
+        # A directory run only stores the frames: playing every GIF would take as long as the GIFs themselves
+        display_entry(data, sys_info, args.animate and bool(args.file) and not args.silent, args.loops, encoding, columns, graphics)
 
     if processed_count == 0 and not args.silent and (files_to_process or args.file):
          print("No images were displayed (check filters/errors).")
 
-    if cache_updated:
-        if not args.silent: print("\nSaving updated cache...")
-        save_cache(cache, args.cache)
+    if (args.atlas or config.PIXEL_ATLAS) and not args.file: update_atlas(args.cache, cache, args.silent)
+    if (cache_updated or journal.recompresses(cache)) and not args.silent: print("\nSaving updated cache...")
     elif not args.silent and (files_to_process or args.file): print("\nCache up to date.")
+    journal.close(cache, completed=not args.file) # Only a directory run finishes an interrupted --refresh
 
 
 if __name__ == "__main__":
@@ -0,0 +1,101 @@
+"""Tests for the art budget (CACHE_MAX_BYTES): least recently shown art is evicted first and restored when shown again.
+
+Run from the repository root: python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config # noqa: E402
+import rw_fetch # noqa: E402
+from PIL import Image # noqa: E402
+
+IMAGES = {"a.png": ((255, 0, 0, 255), 6), "b.png": ((0, 255, 0, 255), 8), "c.png": ((0, 0, 255, 255), 10)}
+
+
+class ArtBudgetTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = {} # a -> .../a.png
+        for name, (color, size) in IMAGES.items():
+            self.paths[name[0]] = os.path.join(self.tmp.name, name)
+            Image.new("RGBA", (size, size), color).save(self.paths[name[0]])
+        self.entries = {path: rw_fetch.process_image(path) for path in self.paths.values()}
+        patcher = mock.patch.object(config, "CACHE_MAX_BYTES", 1 << 30) # Displays are only logged with a budget
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def load(self, cache_name):
+        cache_file = os.path.join(self.tmp.name, cache_name)
+        rw_fetch.save_cache(dict(self.entries), cache_file)
+        cache = rw_fetch.load_cache(cache_file)
+        if hasattr(cache, "close"): self.addCleanup(cache.close)
+        return cache_file, cache
+
+    def show(self, cache_file, *names):
+        for stamp, name in enumerate(names, 1):
+            with mock.patch.object(rw_fetch.time, "time", return_value=float(stamp)): rw_fetch.record_display(cache_file, self.paths[name])
+
+    def evict(self, cache, cache_file, keep):
+        """Runs evict_art with a budget just big enough for the art of the keep entries."""
+        budget = sum(rw_fetch.entry_stored_bytes(cache, self.paths[name]) for name in keep)
+        with mock.patch.object(config, "CACHE_MAX_BYTES", budget): return rw_fetch.evict_art(cache, cache_file)
+
+    def evicted(self, cache):
+        return sorted(os.path.basename(key) for key in cache if rw_fetch.is_evicted(cache[key]))
+
+    def test_least_recently_shown_goes_first(self):
+        for cache_name in ("cache.json", "cache.rwc"):
+            with self.subTest(cache=cache_name):
+                cache_file, cache = self.load(cache_name)
+                self.show(cache_file, "c", "a", "b") # c is the least recently shown
+                self.assertEqual(self.evict(cache, cache_file, ["a", "b"]), 1)
+                self.assertEqual(self.evicted(cache), ["c.png"])
+                self.assertEqual(self.evict(cache, cache_file, ["b"]), 1)
+                self.assertEqual(self.evicted(cache), ["a.png", "c.png"])
+                # The metadata stays, so --random can still pick it
+                data = cache[self.paths["c"]]
+                self.assertEqual((data["category"], data["num_lines"]), (self.entries[self.paths["c"]]["category"], self.entries[self.paths["c"]]["num_lines"]))
+
+    def test_never_shown_goes_before_shown(self):
+        cache_file, cache = self.load("cache.json")
+        self.show(cache_file, "b", "a")
+        self.evict(cache, cache_file, ["a", "b"])
+        self.assertEqual(self.evicted(cache), ["c.png"])
+
+    def test_within_budget_nothing_is_evicted(self):
+        cache_file, cache = self.load("cache.json")
+        self.assertEqual(self.evict(cache, cache_file, ["a", "b", "c"]), 0)
+        self.assertEqual(self.evicted(cache), [])
+
+    def test_shown_again_is_restored_from_source(self):
+        cache_file, cache = self.load("cache.json")
+        self.show(cache_file, "c", "a", "b")
+        self.evict(cache, cache_file, ["a", "b"])
+        rw_fetch.save_cache(cache, cache_file)
+        self.assertTrue(rw_fetch.is_evicted(rw_fetch.load_cache(cache_file)[self.paths["c"]]))
+
+        data = rw_fetch.restore_evicted(cache_file, self.paths["c"]) # What a later --random pick of c does
+        self.assertEqual(data["ansi_art"], self.entries[self.paths["c"]]["ansi_art"])
+        self.assertEqual(rw_fetch.load_cache(cache_file)[self.paths["c"]]["ansi_art"], data["ansi_art"]) # Journaled
+
+        # Now that c was shown last, a (the least recent) is evicted instead
+        self.show(cache_file, "a", "b", "c")
+        cache = rw_fetch.load_cache(cache_file)
+        self.evict(cache, cache_file, ["b", "c"])
+        self.assertEqual(self.evicted(cache), ["a.png"])
+
+    def test_restore_without_source(self):
+        cache_file, _ = self.load("cache.json")
+        os.remove(self.paths["a"])
+        self.assertIsNone(rw_fetch.restore_evicted(cache_file, self.paths["a"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
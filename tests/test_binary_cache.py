@@ -0,0 +1,110 @@
+"""Tests for the indexed binary cache format (binary_cache.py).
+
+Run from the repository root: python -m unittest discover tests
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import binary_cache # noqa: E402
+
+ART = "\x1b[38;2;1;2;3m▀▀\x1b[0m\n\x1b[48;2;4;5;6m ▄\x1b[0m"
+COMPRESSED = zlib.compress("compressed ▀ art".encode("utf-8"))
+
+CACHE = {
+    "/imgs/plain.gif": {"ansi_art": ART, "category": "small", "num_lines": 2, "art_width": 2,
+                        "source": {"size": 10, "mtime_ns": 1, "sha256": "ab"}, "converter_version": 3},
+    "/imgs/copy of plain.gif": {"ansi_art": ART, "category": "small", "num_lines": 2, "art_width": 2}, # Same art: shared
+    "/imgs/ünïcødé 画像.gif": {"ansi_art": "ü", "category": "small", "num_lines": 1},
+    "/imgs/100%\tdone\n.gif": {"ansi_art": "%", "category": "small", "num_lines": 1},
+    "/imgs/%25 literal.gif": {"ansi_art": "x", "category": "small", "num_lines": 1},
+    "/imgs/evicted.gif": {"category": "large", "num_lines": 40, "source": {"size": 5, "mtime_ns": 2, "sha256": "cd"}},
+    "/imgs/zlib.gif": {"ansi_art_z": COMPRESSED, "art_codec": "zlib", "art_size": 19, "category": "medium", "num_lines": 20},
+}
+
+
+class BinaryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.tmp.name, "cache.rwc")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open_cache(self):
+        cache = binary_cache.IndexedCache(self.cache_file)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_round_trip(self):
+        binary_cache.write_cache(CACHE, self.cache_file)
+        self.assertTrue(binary_cache.is_binary_cache(self.cache_file))
+        cache = self.open_cache()
+        self.assertEqual(sorted(cache), sorted(CACHE))
+        for key, data in CACHE.items(): self.assertEqual(cache[key], data, key)
+
+    def test_round_trip_from_indexed_cache(self):
+        # Unmodified entries are copied as raw blobs, a modified one is encoded again
+        binary_cache.write_cache(CACHE, self.cache_file)
+        cache = self.open_cache()
+        cache["/imgs/ünïcødé 画像.gif"] = {"ansi_art": "new", "category": "small", "num_lines": 1}
+        del cache["/imgs/%25 literal.gif"]
+        copy_file = os.path.join(self.tmp.name, "copy.rwc")
+        binary_cache.write_cache(cache, copy_file)
+        with binary_cache.IndexedCache(copy_file) as copy:
+            expected = dict(CACHE, **{"/imgs/ünïcødé 画像.gif": {"ansi_art": "new", "category": "small", "num_lines": 1}})
+            del expected["/imgs/%25 literal.gif"]
+            self.assertEqual({key: copy[key] for key in copy}, expected)
+
+    def test_evicted_entry(self):
+        binary_cache.write_cache(CACHE, self.cache_file)
+        cache = self.open_cache()
+        self.assertFalse(cache.stored_art("/imgs/evicted.gif"))
+        self.assertTrue(cache.stored_art("/imgs/plain.gif"))
+        self.assertEqual(cache.stored_size("/imgs/evicted.gif"), len(binary_cache._dumps({"source": CACHE["/imgs/evicted.gif"]["source"]}))) # Meta only
+        self.assertEqual(cache.peek("/imgs/evicted.gif"), {"category": "large", "num_lines": 40})
+
+    def test_shared_art(self):
+        binary_cache.write_cache(CACHE, self.cache_file)
+        cache = self.open_cache()
+        entries, blobs, saved = cache.art_sharing()
+        self.assertEqual(entries, len(CACHE))
+        self.assertEqual(saved, len(ART.encode("utf-8"))) # The copy points at the same blob
+        self.assertEqual(blobs, len(CACHE) - 1)
+        self.assertEqual(cache.raw_blob("/imgs/plain.gif")[0], cache.raw_blob("/imgs/copy of plain.gif")[0])
+
+    def test_compressed_entry(self):
+        binary_cache.write_cache(CACHE, self.cache_file)
+        cache = self.open_cache()
+        self.assertEqual(cache.peek("/imgs/zlib.gif"), {"category": "medium", "num_lines": 20, "art_codec": "zlib", "art_size": 19})
+        self.assertEqual(zlib.decompress(cache["/imgs/zlib.gif"]["ansi_art_z"]).decode("utf-8"), "compressed ▀ art")
+        stored, uncompressed = cache.storage_sizes()
+        self.assertEqual(uncompressed - stored, 19 - len(COMPRESSED) + len(ART.encode("utf-8"))) # Compression and sharing
+
+    def test_category_index(self):
+        binary_cache.write_cache(CACHE, self.cache_file)
+        index = self.open_cache().category_index()
+        self.assertEqual(sorted(index), ["large", "medium", "small"])
+        self.assertIn(("/imgs/100%\tdone\n.gif", 1), index["small"])
+
+    def test_version_1_index(self):
+        # Version 1: JSON index by category, meta right after each art blob
+        art, meta = ART.encode("utf-8"), json.dumps({"source": {"size": 1}}).encode("utf-8")
+        index = json.dumps({"categories": {
+            "small": [["/imgs/ü%.gif", 0, len(art), 2, len(meta)]],
+            "medium": [["/imgs/z.gif", len(art) + len(meta), len(COMPRESSED), 20, 0, "zlib", 19]],
+        }}).encode("utf-8")
+        with open(self.cache_file, "wb") as f:
+            f.write(binary_cache._HEADER.pack(binary_cache.MAGIC, 1, len(index)) + index + art + meta + COMPRESSED)
+        cache = self.open_cache()
+        self.assertEqual(cache["/imgs/ü%.gif"], {"ansi_art": ART, "category": "small", "num_lines": 2, "source": {"size": 1}})
+        self.assertEqual(cache["/imgs/z.gif"], {"ansi_art_z": COMPRESSED, "art_codec": "zlib", "art_size": 19,
+                                                "category": "medium", "num_lines": 20})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Tests for the cache journal (crash safety, --refresh resume, journals of read-only runs).
+
+Run from the repository root: python -m unittest discover tests
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+import rw_fetch # noqa: E402
+from PIL import Image # noqa: E402
+
+
+def entry(name, lines=3):
+    return {"ansi_art": "\n".join(f"{name}{i}" for i in range(lines)), "category": "small", "num_lines": lines}
+
+
+def read_cache_file(cache_file):
+    """The cache file alone, without replaying the journal like load_cache does."""
+    with open(cache_file, encoding="utf-8") as f: return json.load(f)
+
+
+def run_rw_fetch(*args):
+    return subprocess.run([sys.executable, os.path.join(REPO_DIR, "rw_fetch.py"), *args],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+
+
+class CacheJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.tmp.name, "cache.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_replay_after_kill_between_checkpoints(self):
+        # A run checkpoints after two entries, journals a third and dies without closing
+        script = (
+            "import os, sys\n"
+            f"sys.path.insert(0, {REPO_DIR!r})\n"
+            "import config, rw_fetch\n"
+            "config.CACHE_CHECKPOINT_EVERY = 2\n"
+            f"cache_file = {self.cache_file!r}\n"
+            "journal = rw_fetch.CacheJournal(cache_file, silent=True)\n"
+            "cache = rw_fetch.load_cache(cache_file)\n"
+            "for name in ('a', 'b', 'c'):\n"
+            "    journal.record(cache, name, {'ansi_art': name, 'category': 'small', 'num_lines': 1})\n"
+            "os._exit(9)\n")
+        self.assertEqual(subprocess.run([sys.executable, "-c", script]).returncode, 9)
+        self.assertEqual(sorted(read_cache_file(self.cache_file)), ["a", "b"])
+        # A line cut short by the kill is skipped
+        with open(rw_fetch.journal_path(self.cache_file), "ab") as f: f.write(b'["d", {"ansi_art": "d", "categ')
+        self.assertEqual(sorted(rw_fetch.load_cache(self.cache_file)), ["a", "b", "c"])
+
+        # The next run that takes the lock folds the journal into the cache file
+        journal = rw_fetch.CacheJournal(self.cache_file, silent=True)
+        cache = rw_fetch.load_cache(self.cache_file)
+        self.assertTrue(journal.close(cache))
+        self.assertEqual(sorted(read_cache_file(self.cache_file)), ["a", "b", "c"])
+        self.assertFalse(os.path.exists(rw_fetch.journal_path(self.cache_file)))
+
+    def test_journaled_removal(self):
+        rw_fetch.save_cache({"a": entry("a"), "b": entry("b")}, self.cache_file)
+        journal = rw_fetch.CacheJournal(self.cache_file, silent=True)
+        cache = rw_fetch.load_cache(self.cache_file)
+        journal.record(cache, "a", None)
+        self.assertEqual(sorted(rw_fetch.load_cache(self.cache_file)), ["b"])
+        journal.close(cache)
+        self.assertEqual(sorted(read_cache_file(self.cache_file)), ["b"])
+
+    def test_refresh_resumes_from_progress_file(self):
+        rsc_dir = os.path.join(self.tmp.name, "rsc")
+        os.makedirs(rsc_dir)
+        for name, color in (("done.png", (255, 0, 0, 255)), ("todo.png", (0, 0, 255, 255))):
+            Image.new("RGBA", (6, 6), color).save(os.path.join(rsc_dir, name))
+        run_rw_fetch("--cache", self.cache_file, "--rsc-dir", rsc_dir, "--jobs", "1", "--silent")
+
+        # Mark both entries, as if an interrupted --refresh had already converted done.png
+        cache = read_cache_file(self.cache_file)
+        for data in cache.values(): data["marker"] = True
+        rw_fetch.save_cache(cache, self.cache_file)
+        done, todo = (os.path.join(rsc_dir, name) for name in ("done.png", "todo.png"))
+        with open(rw_fetch.refresh_progress_path(self.cache_file), "w", encoding="utf-8") as f: f.write(done + "\n")
+
+        result = run_rw_fetch("--cache", self.cache_file, "--rsc-dir", rsc_dir, "--jobs", "1", "--refresh")
+        self.assertIn("Resuming interrupted --refresh (1 images already converted)", result.stdout)
+        cache = read_cache_file(self.cache_file)
+        self.assertTrue(cache[done].get("marker")) # Kept
+        self.assertNotIn("marker", cache[todo]) # Converted again
+        self.assertFalse(os.path.exists(rw_fetch.refresh_progress_path(self.cache_file))) # Completed
+
+    def test_append_journal_merged_by_next_locked_run(self):
+        rw_fetch.save_cache({"a": entry("a")}, self.cache_file)
+        rw_fetch.append_journal(self.cache_file, "b", entry("b")) # A --random run, outside the lock
+        self.assertEqual(sorted(read_cache_file(self.cache_file)), ["a"])
+        self.assertEqual(sorted(rw_fetch.load_cache(self.cache_file)), ["a", "b"])
+
+        journal = rw_fetch.CacheJournal(self.cache_file, silent=True)
+        cache = rw_fetch.load_cache(self.cache_file)
+        journal.record(cache, "c", entry("c"))
+        self.assertTrue(journal.close(cache))
+        self.assertEqual(read_cache_file(self.cache_file)["b"], entry("b"))
+        self.assertEqual(sorted(read_cache_file(self.cache_file)), ["a", "b", "c"])
+        self.assertFalse(os.path.exists(rw_fetch.journal_path(self.cache_file)))
+
+
+if __name__ == "__main__":
+    unittest.main()
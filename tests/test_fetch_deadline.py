@@ -0,0 +1,55 @@
+"""Tests that each system info fetch kills its shell fallbacks at its own deadline, even when fetches overlap (--serve).
+
+Run from the repository root: python -m unittest discover tests
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import rw_fetch # noqa: E402
+
+COMMANDS = {
+    "Slow": (0, "sleep 3; echo late"),
+    "Quick": (0.2, "sleep 0.5; echo done"), # Some Python work first, then the command
+}
+
+
+def fake_fetcher(label):
+    delay, command = COMMANDS[label]
+    time.sleep(delay)
+    return rw_fetch.fetch_shell_command(command)
+
+
+@unittest.skipUnless(os.path.exists("/bin/sh"), "needs a POSIX shell")
+class FetchDeadlineTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(rw_fetch, "fetch_info_value", side_effect=fake_fetcher)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_command_killed_at_deadline(self):
+        start = time.monotonic()
+        pool, futures = rw_fetch.submit_fetchers(["Slow"], 0.3)
+        try: value = futures["Slow"].result(timeout=5) # The fetcher itself returns once its command is killed
+        finally: rw_fetch.finish_fetchers(pool)
+        self.assertIn("Timeout", value)
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_overlapping_fetches_keep_their_deadlines(self):
+        results = {}
+        quick = threading.Thread(target=lambda: results.update(rw_fetch.fetch_system_info_values(["Quick"], deadline=5)))
+        quick.start()
+        time.sleep(0.05)
+        results.update(rw_fetch.fetch_system_info_values(["Slow"], deadline=0.3)) # Started while Quick runs its Python part
+        quick.join(10)
+        self.assertIn("Timeout", results["Slow"])
+        self.assertEqual(results["Quick"], "done")
+        self.assertEqual(rw_fetch._fetch_deadlines, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""Tests that the vectorized converter (image_to_ansi_numpy) matches the scalar one byte for byte.
+
+Run from the repository root: python -m unittest discover tests
+"""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import rw_fetch # noqa: E402
+from PIL import Image # noqa: E402
+
+CLEAR = (0, 0, 0, 0)
+RED, BLUE = (255, 0, 0, 255), (0, 0, 255, 255)
+
+
+def image_from_rows(rows):
+    """An RGBA image from rows of RGBA tuples."""
+    image = Image.new("RGBA", (len(rows[0]), len(rows)))
+    image.putdata([pixel for row in rows for pixel in row])
+    return image
+
+
+@unittest.skipUnless(rw_fetch.numpy_available(), "numpy is not installed")
+class ImageToAnsiTest(unittest.TestCase):
+    def assertSameOutput(self, image):
+        scalar = rw_fetch.image_to_ansi_scalar(image)
+        self.assertEqual(rw_fetch.image_to_ansi_numpy(image).encode("utf-8"), scalar.encode("utf-8"))
+        return scalar
+
+    def test_odd_height(self):
+        # The last row of cells has only a top half
+        for height in (1, 3, 5):
+            with self.subTest(height=height):
+                self.assertSameOutput(image_from_rows([[RED, BLUE, RED]] * height))
+
+    def test_fully_transparent_cells(self):
+        self.assertSameOutput(image_from_rows([
+            [RED, CLEAR, CLEAR, BLUE],
+            [RED, CLEAR, CLEAR, BLUE],
+            [CLEAR, CLEAR, CLEAR, CLEAR],
+            [CLEAR, CLEAR, CLEAR, RED],
+        ]))
+
+    def test_fully_transparent_image(self):
+        self.assertEqual(self.assertSameOutput(Image.new("RGBA", (4, 4), CLEAR)), rw_fetch.image_to_ansi_scalar(Image.new("RGBA", (1, 1), CLEAR)))
+
+    def test_half_transparent_cells(self):
+        # Only one half of each cell is opaque, and alpha 127/128 sits right at the cutoff
+        self.assertSameOutput(image_from_rows([
+            [RED, CLEAR, (10, 20, 30, 128), (10, 20, 30, 127), BLUE],
+            [CLEAR, BLUE, (10, 20, 30, 127), (10, 20, 30, 128), BLUE],
+            [(1, 2, 3, 200), (1, 2, 3, 200), CLEAR, RED, RED],
+            [CLEAR, CLEAR, (1, 2, 3, 200), RED, CLEAR],
+        ]))
+
+    def test_transparent_pixels_keep_their_color_out_of_the_output(self):
+        # Same visible pixels, different RGB under alpha 0: same art
+        a = image_from_rows([[RED, (9, 9, 9, 0)], [(8, 8, 8, 0), BLUE]])
+        b = image_from_rows([[RED, CLEAR], [CLEAR, BLUE]])
+        self.assertEqual(self.assertSameOutput(a), self.assertSameOutput(b))
+
+    def test_runs_and_noise(self):
+        rng = random.Random(0)
+        palette = [RED, BLUE, CLEAR, (0, 255, 0, 255), (0, 255, 0, 100)]
+        for width, height in ((1, 1), (7, 9), (16, 15)):
+            with self.subTest(size=(width, height)):
+                self.assertSameOutput(image_from_rows([[rng.choice(palette) for _ in range(width)] for _ in range(height)]))
+
+    def test_other_modes(self):
+        self.assertSameOutput(Image.new("RGB", (3, 3), (12, 34, 56)))
+        self.assertSameOutput(Image.new("P", (2, 5)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""Tests for the native Linux fetchers in rw_fetch.py, run against a fake /proc and /sys tree.
+
+Run from the repository root: python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import rw_fetch # noqa: E402
+
+# Fake root: {path: content}. A path ending in "/" is an empty directory.
+FIXTURE_TREE = {
+    "proc/uptime": "12345.67 2345.60\n",
+    "proc/meminfo": "MemTotal:       16000000 kB\nMemFree:         1000000 kB\nMemAvailable:   12000000 kB\nBuffers:          500000 kB\n",
+    # One bridge, then two display controllers: the first one by name wins
+    "sys/bus/pci/devices/0000:00:01.0/class": "0x060400\n",
+    "sys/bus/pci/devices/0000:00:01.0/vendor": "0x8086\n",
+    "sys/bus/pci/devices/0000:00:01.0/device": "0x1234\n",
+    "sys/bus/pci/devices/0000:00:02.0/class": "0x030000\n",
+    "sys/bus/pci/devices/0000:00:02.0/vendor": "0x8086\n",
+    "sys/bus/pci/devices/0000:00:02.0/device": "0x5917\n",
+    "sys/bus/pci/devices/0000:01:00.0/class": "0x030200\n",
+    "sys/bus/pci/devices/0000:01:00.0/vendor": "0x10de\n",
+    "sys/bus/pci/devices/0000:01:00.0/device": "0x2684\n",
+    "usr/share/hwdata/pci.ids": (
+        "# pci.ids\n#\n"
+        "10de  NVIDIA Corporation\n\t1f08  TU106 [GeForce RTX 2060 Rev. A]\n\t\t1043 8676  ROG\n"
+        "# comment\n"
+        "8086  Intel Corporation\n\t1234  Something\n\t5917  UHD Graphics 620\n"
+        "8088  Winbond\n\t5917  Wrong\n"
+        "C 00  Unclassified device\n"),
+    "usr/share/misc/pci.ids": "10de  NVIDIA Corporation\n\t2684  AD102 [GeForce RTX 4090]\n", # Newer device, second file
+    "sys/class/drm/card0/dev": "226:0\n", # Not a connector
+    "sys/class/drm/card0-eDP-1/status": "connected\n",
+    "sys/class/drm/card0-eDP-1/modes": "2560x1440\n1920x1080\n",
+    "sys/class/drm/card0-DP-2/status": "disconnected\n",
+    "sys/class/drm/card0-DP-2/modes": "",
+    "sys/class/drm/card0-HDMI-A-1/status": "connected\n",
+    "sys/class/drm/card0-HDMI-A-1/modes": "1920x1080\n1280x720\n",
+    "var/lib/dpkg/status": (
+        "Package: a\nStatus: install ok installed\n\n"
+        "Package: b\nStatus: deinstall ok config-files\n\n"
+        "Package: c\nStatus: install ok installed\n\n"
+        "Package: d\nStatus: install ok half-configured\n\n"
+        "Package: e\nStatus: purge ok not-installed\n"),
+    "var/lib/snapd/snaps/core_1.snap": "",
+    "var/lib/snapd/snaps/core_2.snap": "", # Two revisions of one snap
+    "var/lib/snapd/snaps/firefox_9.snap": "",
+    "var/lib/snapd/snaps/x.partial": "",
+    "var/lib/flatpak/app/org.gimp.GIMP/": "",
+    "var/lib/flatpak/app/com.spotify.Client/": "",
+}
+
+
+def write_tree(root, tree):
+    for path, content in tree.items():
+        full_path = os.path.join(root, path)
+        os.makedirs(full_path if path.endswith("/") else os.path.dirname(full_path), exist_ok=True)
+        if path.endswith("/"): continue
+        with open(full_path, "w", encoding="utf-8") as f: f.write(content)
+
+
+class NativeFetchersTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        write_tree(self.root, FIXTURE_TREE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def remove(self, path):
+        os.remove(os.path.join(self.root, path))
+
+    def test_uptime(self):
+        self.assertEqual(rw_fetch.linux_uptime(self.root), 12345.67)
+
+    def test_uptime_unreadable(self):
+        write_tree(self.root, {"proc/uptime": "garbage\n"})
+        self.assertIsNone(rw_fetch.linux_uptime(self.root))
+        self.remove("proc/uptime")
+        self.assertIsNone(rw_fetch.linux_uptime(self.root))
+
+    def test_memory_uses_available(self):
+        self.assertEqual(rw_fetch.linux_memory(self.root), ((16000000 - 12000000) * 1024, 16000000 * 1024))
+
+    def test_memory_without_available(self):
+        # Kernels before 3.14: free + buffers + cached
+        write_tree(self.root, {"proc/meminfo": "MemTotal: 1000 kB\nMemFree: 100 kB\nBuffers: 50 kB\nCached: 250 kB\nSwapCached: 9 kB\n"})
+        self.assertEqual(rw_fetch.linux_memory(self.root), (600 * 1024, 1000 * 1024))
+
+    def test_memory_without_total(self):
+        write_tree(self.root, {"proc/meminfo": "MemFree: 100 kB\n"})
+        self.assertIsNone(rw_fetch.linux_memory(self.root))
+
+    def test_pci_names(self):
+        self.assertEqual(rw_fetch.pci_names("8086", "5917", self.root), ("Intel Corporation", "UHD Graphics 620"))
+        self.assertEqual(rw_fetch.pci_names("8088", "5917", self.root), ("Winbond", "Wrong"))
+
+    def test_pci_names_device_in_later_file(self):
+        self.assertEqual(rw_fetch.pci_names("10de", "2684", self.root), ("NVIDIA Corporation", "AD102 [GeForce RTX 4090]"))
+
+    def test_pci_names_device_missing(self):
+        # A subsystem line (two tabs) isn't a device of the vendor
+        self.assertEqual(rw_fetch.pci_names("10de", "1043", self.root), ("NVIDIA Corporation", None))
+
+    def test_pci_names_vendor_missing(self):
+        self.assertEqual(rw_fetch.pci_names("abcd", "5917", self.root), (None, None))
+
+    def test_pci_names_no_database(self):
+        self.remove("usr/share/hwdata/pci.ids")
+        self.remove("usr/share/misc/pci.ids")
+        self.assertEqual(rw_fetch.pci_names("8086", "5917", self.root), (None, None))
+
+    def test_gpu(self):
+        self.assertEqual(rw_fetch.linux_gpu(self.root), "Intel Corporation UHD Graphics 620")
+
+    def test_gpu_unknown_ids(self):
+        write_tree(self.root, {"sys/bus/pci/devices/0000:00:02.0/vendor": "0xabcd\n"})
+        self.assertEqual(rw_fetch.linux_gpu(self.root), "Vendor abcd Device 5917")
+
+    def test_gpu_no_display_controller(self):
+        for name in ("0000:00:02.0", "0000:01:00.0"): write_tree(self.root, {f"sys/bus/pci/devices/{name}/class": "0x0c0330\n"})
+        self.assertEqual(rw_fetch.linux_gpu(self.root), "N/A")
+
+    def test_resolution_preferred_modes_of_connected_outputs(self):
+        # Sorted by connector name, first (preferred) mode of each
+        self.assertEqual(rw_fetch.linux_resolution(self.root), "1920x1080, 2560x1440")
+
+    def test_resolution_nothing_connected(self):
+        for name in ("card0-eDP-1", "card0-HDMI-A-1"): write_tree(self.root, {f"sys/class/drm/{name}/status": "disconnected\n"})
+        self.assertIsNone(rw_fetch.linux_resolution(self.root))
+
+    def test_packages(self):
+        # Only "install ok installed" counts; snap revisions of one snap count once
+        self.assertEqual(rw_fetch.linux_packages(self.root), "apt (2), snap (2), flatpak (2)")
+
+    def test_packages_rpm_without_sqlite_database(self):
+        self.remove("var/lib/dpkg/status")
+        write_tree(self.root, {"var/lib/rpm/Packages": ""})
+        self.assertIsNone(rw_fetch.linux_packages(self.root)) # Left to the rpm fallback command
+
+    def test_packages_none_found(self):
+        self.tmp.cleanup()
+        os.makedirs(self.root)
+        self.assertEqual(rw_fetch.linux_packages(self.root), "N/A")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""Tests for purge_cache.py against small synthetic JSON and binary caches.
+
+Run from the repository root: python -m unittest discover tests
+"""
+import contextlib
+import fcntl
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+import binary_cache # noqa: E402
+import purge_cache # noqa: E402
+
+
+def entry(category, num_lines, art="▀▀"):
+    return {"ansi_art": art, "category": category, "num_lines": num_lines, "source": {"size": 1}}
+
+
+class PurgeCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.images = os.path.join(self.dir, "imgs")
+        os.makedirs(self.images)
+        for name in ("tiny.gif", "cat.png"): open(os.path.join(self.images, name), "w").close() # gone.gif is missing
+        self.cache = {
+            os.path.join(self.images, "tiny.gif"): entry("small", 3),
+            os.path.join(self.images, "cat.png"): entry("medium", 20, "ü" * 10),
+            os.path.join(self.images, "gone.gif"): entry("large", 40),
+            os.path.join(self.dir, "other", "big.gif"): entry("extra-large", 90),
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name="cache.json"):
+        cache_file = os.path.join(self.dir, name)
+        if binary_cache.is_binary_cache_path(cache_file): binary_cache.write_cache(self.cache, cache_file)
+        else:
+            with open(cache_file, "w", encoding="utf-8") as f: json.dump(self.cache, f)
+        return cache_file
+
+    def purge(self, cache_file, *args):
+        return subprocess.run([sys.executable, os.path.join(REPO_DIR, "purge_cache.py"), "--cache", cache_file, *args],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+    def remaining(self, cache_file):
+        if binary_cache.is_binary_cache(cache_file):
+            with binary_cache.IndexedCache(cache_file) as cache: names = list(cache)
+        else:
+            with open(cache_file, encoding="utf-8") as f: names = list(json.load(f))
+        return sorted(os.path.basename(key) for key in names)
+
+    def check(self, args, remaining):
+        for name in ("cache.json", "cache.rwc"):
+            with self.subTest(cache=name, args=args):
+                cache_file = self.write(name)
+                result = self.purge(cache_file, *args)
+                self.assertEqual(result.returncode, 0, result.stderr)
+                self.assertEqual(self.remaining(cache_file), remaining)
+
+    def test_categories(self):
+        self.check(["small", "LARGE"], ["big.gif", "cat.png"])
+
+    def test_path(self):
+        self.check(["--path", "*.png"], ["big.gif", "gone.gif", "tiny.gif"]) # File name only
+        self.check(["--path", "*/other/*"], ["cat.png", "gone.gif", "tiny.gif"]) # Whole path
+        self.check(["--path", "tiny*", "--path", "gone*"], ["big.gif", "cat.png"])
+
+    def test_line_range(self):
+        self.check(["--min-lines", "20", "--max-lines", "40"], ["big.gif", "tiny.gif"])
+        self.check(["--max-lines", "19"], ["big.gif", "cat.png", "gone.gif"])
+        self.check(["--min-lines", "41"], ["cat.png", "gone.gif", "tiny.gif"])
+
+    def test_missing_source(self):
+        self.check(["--missing-source"], ["cat.png", "tiny.gif"])
+
+    def test_any_and_all(self):
+        self.check(["large", "--missing-source"], ["cat.png", "tiny.gif"]) # big.gif is missing too
+        self.check(["large", "--missing-source", "--all"], ["big.gif", "cat.png", "tiny.gif"])
+
+    def test_no_predicate(self):
+        result = self.purge(self.write())
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("give at least one predicate", result.stderr)
+
+    def test_dry_run(self):
+        for name in ("cache.json", "cache.rwc"):
+            with self.subTest(cache=name):
+                cache_file = self.write(name)
+                with open(cache_file, "rb") as f: before = f.read()
+                result = self.purge(cache_file, "small", "--min-lines", "30", "--dry-run")
+                self.assertEqual(result.returncode, 0, result.stderr)
+                with open(cache_file, "rb") as f: self.assertEqual(f.read(), before)
+                self.assertIn("Entries purged: 3", result.stdout)
+                self.assertIn("Remaining entries: 1", result.stdout)
+                self.assertIn("Dry run: cache not modified.", result.stdout)
+
+    def test_sizes_match_between_formats(self):
+        json_cache = dict(self.cache)
+        with binary_cache.IndexedCache(self.write("cache.rwc")) as binary:
+            for key in self.cache:
+                self.assertEqual(purge_cache.entry_info(json_cache, key), purge_cache.entry_info(binary, key), key)
+        _, _, size = purge_cache.entry_info(json_cache, os.path.join(self.images, "cat.png"))
+        self.assertEqual(size, len(("ü" * 10).encode("utf-8")) + len(binary_cache._dumps({"source": {"size": 1}})))
+
+    def test_wait_message_goes_to_stderr(self):
+        cache_file = self.write()
+        with open(f"{cache_file}.lock", "a") as held:
+            fcntl.flock(held, fcntl.LOCK_EX) # rw_fetch.py updating the cache
+            stdout, stderr = io.StringIO(), io.StringIO()
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                waiter = threading.Thread(target=lambda: purge_cache.lock_cache(cache_file).close())
+                waiter.start()
+                time.sleep(0.2)
+                fcntl.flock(held, fcntl.LOCK_UN)
+                waiter.join(5)
+        self.assertIn("Waiting for rw_fetch.py to finish updating", stderr.getvalue())
+        self.assertEqual(stdout.getvalue(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+"""Tests for single_flight (concurrent shell launches sharing one result).
+
+Run from the repository root: python -m unittest discover tests
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config # noqa: E402
+import rw_fetch # noqa: E402
+
+
+def read(path):
+    with open(path) as f: return f.read() or None
+
+
+def write(value, path):
+    with open(path + ".tmp", "w") as f: f.write(value)
+    os.replace(path + ".tmp", path)
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return process.pid
+
+
+class SingleFlightTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.result_file = os.path.join(self.tmp.name, "result")
+        self.lock_file = self.result_file + ".lock"
+        self.computed = 0
+        for name, value in (("SINGLE_FLIGHT_DIR", self.tmp.name), ("SINGLE_FLIGHT_TTL", 2), ("SINGLE_FLIGHT_WAIT", 5)):
+            patcher = mock.patch.object(config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def compute(self):
+        self.computed += 1
+        return "computed"
+
+    def single_flight(self):
+        start = time.monotonic()
+        value = rw_fetch.single_flight(self.result_file, self.compute, read, write)
+        return value, time.monotonic() - start
+
+    def plant_lock(self, content):
+        with open(self.lock_file, "w") as f: f.write(content)
+
+    def test_alone(self):
+        self.assertEqual(self.single_flight()[0], "computed")
+        self.assertFalse(os.path.exists(self.result_file)) # Nobody was waiting
+        self.assertFalse(os.path.exists(self.lock_file))
+
+    def test_fresh_result_is_reused(self):
+        write("shared", self.result_file)
+        self.assertEqual(self.single_flight()[0], "shared")
+        self.assertEqual(self.computed, 0)
+
+    def test_stale_lock_is_taken_over(self):
+        self.plant_lock(str(dead_pid()))
+        value, elapsed = self.single_flight()
+        self.assertEqual((value, self.computed), ("computed", 1))
+        self.assertLess(elapsed, 1)
+        self.assertFalse(os.path.exists(self.lock_file))
+
+    def test_empty_lock_of_a_dead_holder_is_taken_over(self):
+        self.plant_lock("")
+        old = time.time() - config.SINGLE_FLIGHT_WAIT - 1
+        os.utime(self.lock_file, (old, old))
+        self.assertLess(self.single_flight()[1], 1)
+        self.assertFalse(os.path.exists(self.lock_file))
+
+    @unittest.skipIf(os.getuid() == 0, "root may signal any process")
+    def test_pid_of_another_user_counts_as_dead(self):
+        self.plant_lock("1") # init: os.kill raises PermissionError
+        self.assertLess(self.single_flight()[1], 1)
+
+    @unittest.skipUnless(os.getuid() == 0, "needs root to plant a file owned by another user")
+    def test_lock_of_another_user_is_not_waited_on(self):
+        self.plant_lock(str(os.getpid()))
+        os.chown(self.lock_file, 12345, 12345)
+        value, elapsed = self.single_flight()
+        self.assertEqual(value, "computed")
+        self.assertLess(elapsed, 1)
+        self.assertTrue(os.path.exists(self.lock_file)) # Left alone
+        self.assertFalse(os.path.exists(self.result_file + ".wanted"))
+
+    @unittest.skipUnless(os.getuid() == 0, "needs root to plant a file owned by another user")
+    def test_result_of_another_user_is_ignored(self):
+        write("planted", self.result_file)
+        os.chown(self.result_file, 12345, 12345)
+        self.assertEqual(self.single_flight()[0], "computed")
+
+    def test_waits_for_the_live_holder(self):
+        self.plant_lock(str(os.getpid())) # Another launch of ours, still computing
+
+        def holder():
+            while not os.path.exists(self.result_file + ".wanted"): time.sleep(0.01)
+            write("shared", self.result_file) # Someone is waiting: publish
+            os.remove(self.lock_file)
+
+        thread = threading.Thread(target=holder)
+        thread.start()
+        value, elapsed = self.single_flight()
+        thread.join(5)
+        self.assertEqual((value, self.computed), ("shared", 0))
+        self.assertLess(elapsed, config.SINGLE_FLIGHT_WAIT)
+
+    def test_wait_is_bounded(self):
+        self.plant_lock(str(os.getpid())) # Alive, but never publishes
+        with mock.patch.object(config, "SINGLE_FLIGHT_WAIT", 0.2):
+            value, elapsed = self.single_flight()
+        self.assertEqual(value, "computed")
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 2)
+
+    def test_leader_publishes_only_when_wanted(self):
+        open(self.result_file + ".wanted", "w").close()
+        self.assertEqual(self.single_flight()[0], "computed")
+        self.assertEqual(read(self.result_file), "computed")
+        self.assertFalse(os.path.exists(self.result_file + ".wanted"))
+
+
+if __name__ == "__main__":
+    unittest.main()